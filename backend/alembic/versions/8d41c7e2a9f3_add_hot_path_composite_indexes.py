@@ -0,0 +1,57 @@
+"""add_hot_path_composite_indexes
+
+Revision ID: 8d41c7e2a9f3
+Revises: 6b24678ce533
+Create Date: 2026-10-18 10:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d41c7e2a9f3'
+down_revision: Union[str, None] = '6b24678ce533'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (索引名, 表名, 列)
+INDEXES = [
+    # 按 now_version 名称查版本 / 按版本号取最新版本
+    ('ix_document_version_node_id_version', 'document_version', ['node_id', 'version']),
+    # 版本列表按创建时间倒序
+    ('ix_document_version_node_id_create_at', 'document_version', ['node_id', sa.text('create_at DESC')]),
+    # 知识点按知识库 + 启用状态过滤
+    ('ix_knowledge_chunk_kb_id_enabled', 'knowledge_chunk', ['kb_id', 'enabled']),
+    # 作品列表按更新时间倒序
+    ('ix_work_update_at', 'work', [sa.text('update_at DESC')]),
+    # Agent 按名称查找
+    ('ix_agents_manager_name', 'agents_manager', ['name']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY 不能在事务中执行, 且不阻塞线上写入
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _columns in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
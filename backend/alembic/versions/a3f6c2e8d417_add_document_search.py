@@ -0,0 +1,49 @@
+"""add_document_search
+
+Revision ID: a3f6c2e8d417
+Revises: d9a4e7b1c358
+Create Date: 2026-10-18 21:04:37.519260
+
+已有文档的索引由 backend/scripts/reindex_search.py 回填。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f6c2e8d417'
+down_revision: Union[str, None] = 'd9a4e7b1c358'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 复合 GIN 索引中的 uuid 列需要 btree_gin (PG13+ 为可信扩展, 库所有者即可创建)
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+    op.create_table(
+        'document_search',
+        sa.Column('node_id', sa.Uuid(), nullable=False),
+        sa.Column('work_id', sa.Uuid(), nullable=False),
+        sa.Column('version_id', sa.Uuid(), nullable=False),
+        sa.Column('search_vector', postgresql.TSVECTOR(), nullable=False),
+        sa.Column('update_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['node_id'], ['node.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['version_id'], ['document_version.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['work_id'], ['work.id']),
+        sa.PrimaryKeyConstraint('node_id'),
+    )
+    op.create_index(
+        'ix_document_search_work_id_vector', 'document_search', ['work_id', 'search_vector'],
+        postgresql_using='gin',
+    )
+    # 版本删除时按 version_id 级联
+    op.create_index('ix_document_search_version_id', 'document_search', ['version_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_document_search_version_id', table_name='document_search')
+    op.drop_index('ix_document_search_work_id_vector', table_name='document_search')
+    op.drop_table('document_search')
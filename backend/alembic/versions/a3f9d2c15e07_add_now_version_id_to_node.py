@@ -0,0 +1,54 @@
+"""add_now_version_id_to_node
+
+Revision ID: a3f9d2c15e07
+Revises: 8d41c7e2a9f3
+Create Date: 2026-10-18 11:05:47.218934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f9d2c15e07'
+down_revision: Union[str, None] = '8d41c7e2a9f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('node', sa.Column('now_version_id', sa.Uuid(), nullable=True))
+    op.create_foreign_key(
+        'fk_node_now_version_id',
+        'node',
+        'document_version',
+        ['now_version_id'],
+        ['id'],
+        ondelete='SET NULL',
+    )
+    op.create_index('ix_node_now_version_id', 'node', ['now_version_id'])
+
+    # 回填: 优先匹配 now_version 名称, 否则取版本号最大的版本 (与旧的读取逻辑一致)
+    op.execute(
+        """
+        UPDATE node AS n
+        SET now_version_id = picked.id
+        FROM (
+            SELECT DISTINCT ON (dv.node_id) dv.node_id, dv.id
+            FROM document_version AS dv
+            JOIN node AS n2 ON n2.id = dv.node_id
+            ORDER BY dv.node_id, (dv.version = n2.now_version) DESC NULLS LAST, dv.version DESC
+        ) AS picked
+        WHERE picked.node_id = n.id
+          AND n.node_type = 'document'
+          AND n.now_version_id IS NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_node_now_version_id', table_name='node')
+    op.drop_constraint('fk_node_now_version_id', 'node', type_='foreignkey')
+    op.drop_column('node', 'now_version_id')
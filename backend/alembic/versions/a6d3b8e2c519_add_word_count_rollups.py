@@ -0,0 +1,58 @@
+"""add_word_count_rollups
+
+Revision ID: a6d3b8e2c519
+Revises: f1c9e5a3b274
+Create Date: 2026-10-18 16:25:48.210733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes  # noqa: F401
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d3b8e2c519'
+down_revision: Union[str, None] = 'f1c9e5a3b274'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('node', sa.Column('word_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('work', sa.Column('word_count', sa.Integer(), server_default='0', nullable=False))
+
+    # 按闭包表汇总各节点子树内文档当前版本的字数
+    op.execute(
+        """
+        UPDATE node AS n
+        SET word_count = t.total
+        FROM (
+            SELECT c.ancestor_id, COALESCE(SUM(v.word_count), 0) AS total
+            FROM node_closure c
+            JOIN node d ON d.id = c.descendant_id
+            LEFT JOIN document_version v ON v.id = d.now_version_id
+            GROUP BY c.ancestor_id
+        ) AS t
+        WHERE n.id = t.ancestor_id
+        """
+    )
+    op.execute(
+        """
+        UPDATE work AS w
+        SET word_count = t.total
+        FROM (
+            SELECT n.work_id, COALESCE(SUM(v.word_count), 0) AS total
+            FROM node n
+            JOIN document_version v ON v.id = n.now_version_id
+            GROUP BY n.work_id
+        ) AS t
+        WHERE w.id = t.work_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('work', 'word_count')
+    op.drop_column('node', 'word_count')
@@ -0,0 +1,31 @@
+"""add_revision_counters
+
+Revision ID: b7e4c1f8d260
+Revises: a6d3b8e2c519
+Create Date: 2026-10-18 17:08:39.551902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes  # noqa: F401
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4c1f8d260'
+down_revision: Union[str, None] = 'a6d3b8e2c519'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('work', sa.Column('revision', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('node', sa.Column('revision', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('document_version', sa.Column('revision', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('document_version', 'revision')
+    op.drop_column('node', 'revision')
+    op.drop_column('work', 'revision')
@@ -0,0 +1,36 @@
+"""add_document_version_delta_storage
+
+Revision ID: c5e1a8b47d92
+Revises: a3f9d2c15e07
+Create Date: 2026-10-18 12:20:09.551307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e1a8b47d92'
+down_revision: Union[str, None] = 'a3f9d2c15e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 现有数据全部视为关键帧; 转换为增量链使用 backend/scripts/convert_document_versions.py
+    op.add_column('document_version', sa.Column('storage_type', sa.String(), nullable=False, server_default='full'))
+    op.add_column('document_version', sa.Column('base_version_id', sa.Uuid(), nullable=True))
+    op.add_column('document_version', sa.Column('delta', sa.JSON(), nullable=True))
+    op.add_column('document_version', sa.Column('chain_depth', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index('ix_document_version_base_version_id', 'document_version', ['base_version_id'])
+
+
+def downgrade() -> None:
+    # 降级前需先执行 convert_document_versions.py --materialize 还原为完整内容
+    op.drop_index('ix_document_version_base_version_id', table_name='document_version')
+    op.drop_column('document_version', 'chain_depth')
+    op.drop_column('document_version', 'delta')
+    op.drop_column('document_version', 'base_version_id')
+    op.drop_column('document_version', 'storage_type')
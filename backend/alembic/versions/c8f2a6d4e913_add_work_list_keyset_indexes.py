@@ -0,0 +1,45 @@
+"""add_work_list_keyset_indexes
+
+Revision ID: c8f2a6d4e913
+Revises: b7e4c1f8d260
+Create Date: 2026-10-18 17:46:03.127765
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f2a6d4e913'
+down_revision: Union[str, None] = 'b7e4c1f8d260'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (索引名, 表名, 列)
+INDEXES = [
+    # 作品列表按 (update_at, id) 倒序键集分页
+    ('ix_work_update_at_id', 'work', [sa.text('update_at DESC'), sa.text('id DESC')]),
+    # 按状态过滤后分页
+    ('ix_work_state_update_at_id', 'work', ['state', sa.text('update_at DESC'), sa.text('id DESC')]),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        # 被 (update_at, id) 复合索引覆盖
+        op.drop_index('ix_work_update_at', table_name='work', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_work_update_at', 'work', [sa.text('update_at DESC')],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        for name, table, _columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
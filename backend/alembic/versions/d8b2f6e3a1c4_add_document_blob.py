@@ -0,0 +1,73 @@
+"""add_document_blob
+
+Revision ID: d8b2f6e3a1c4
+Revises: c5e1a8b47d92
+Create Date: 2026-10-18 13:41:26.770342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes  # noqa: F401
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b2f6e3a1c4'
+down_revision: Union[str, None] = 'c5e1a8b47d92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'document_blob',
+        sa.Column('hash', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('content', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('create_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('hash'),
+    )
+    op.add_column('document_version', sa.Column('blob_hash', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+
+    # 将现有关键帧的内联正文去重搬入 blob 表 (与 content_hash() 使用相同的 sha256/UTF-8)
+    op.execute(
+        """
+        INSERT INTO document_blob (hash, content, size, ref_count, create_at)
+        SELECT h.hash, MIN(h.full_text), MIN(octet_length(h.full_text)), COUNT(*), now()
+        FROM (
+            SELECT encode(sha256(convert_to(full_text, 'UTF8')), 'hex') AS hash, full_text
+            FROM document_version
+            WHERE storage_type = 'full'
+        ) AS h
+        GROUP BY h.hash
+        """
+    )
+    op.execute(
+        """
+        UPDATE document_version
+        SET blob_hash = encode(sha256(convert_to(full_text, 'UTF8')), 'hex'),
+            full_text = ''
+        WHERE storage_type = 'full'
+        """
+    )
+    op.create_foreign_key(
+        'document_version_blob_hash_fkey', 'document_version', 'document_blob', ['blob_hash'], ['hash']
+    )
+    op.create_index('ix_document_version_blob_hash', 'document_version', ['blob_hash'])
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        UPDATE document_version AS dv
+        SET full_text = b.content
+        FROM document_blob AS b
+        WHERE dv.blob_hash = b.hash
+        """
+    )
+    op.drop_index('ix_document_version_blob_hash', table_name='document_version')
+    op.drop_constraint('document_version_blob_hash_fkey', 'document_version', type_='foreignkey')
+    op.drop_column('document_version', 'blob_hash')
+    op.drop_table('document_blob')
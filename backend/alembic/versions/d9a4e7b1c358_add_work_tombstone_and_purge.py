@@ -0,0 +1,51 @@
+"""add_work_tombstone_and_purge
+
+Revision ID: d9a4e7b1c358
+Revises: c8f2a6d4e913
+Create Date: 2026-10-18 18:35:12.408193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes  # noqa: F401
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a4e7b1c358'
+down_revision: Union[str, None] = 'c8f2a6d4e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('work', sa.Column('deleted_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.create_table(
+        'work_purge',
+        sa.Column('work_id', sa.Uuid(), nullable=False),
+        sa.Column('work_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('phase', sa.String(), nullable=False),
+        sa.Column('total_nodes', sa.Integer(), nullable=True),
+        sa.Column('total_versions', sa.Integer(), nullable=True),
+        sa.Column('deleted_closure_rows', sa.Integer(), nullable=False),
+        sa.Column('deleted_relationships', sa.Integer(), nullable=False),
+        sa.Column('deleted_versions', sa.Integer(), nullable=False),
+        sa.Column('deleted_nodes', sa.Integer(), nullable=False),
+        sa.Column('batches', sa.Integer(), nullable=False),
+        sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('requested_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('update_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('finished_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('work_id'),
+    )
+    op.create_index(
+        'ix_work_purge_pending', 'work_purge', ['update_at'],
+        postgresql_where=sa.text('finished_at IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_work_purge_pending', table_name='work_purge')
+    op.drop_table('work_purge')
+    op.drop_column('work', 'deleted_at')
@@ -0,0 +1,66 @@
+"""add_node_closure_table
+
+Revision ID: e4a7c2d91b36
+Revises: d8b2f6e3a1c4
+Create Date: 2026-10-18 15:02:11.418207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes  # noqa: F401
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c2d91b36'
+down_revision: Union[str, None] = 'd8b2f6e3a1c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 回填时的最大深度, 防止历史数据中的环导致递归不终止
+MAX_BACKFILL_DEPTH = 64
+
+
+def upgrade() -> None:
+    op.create_table(
+        'node_closure',
+        sa.Column('ancestor_id', sa.Uuid(), nullable=False),
+        sa.Column('descendant_id', sa.Uuid(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.Column('work_id', sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['node.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['descendant_id'], ['node.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['work_id'], ['work.id']),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id'),
+    )
+
+    # 由 node_relationship 的父子边递归展开全部 (祖先, 子孙) 对
+    op.execute(
+        f"""
+        INSERT INTO node_closure (ancestor_id, descendant_id, depth, work_id)
+        WITH RECURSIVE paths (ancestor_id, descendant_id, depth, work_id) AS (
+            SELECT id, id, 0, work_id FROM node
+            UNION ALL
+            SELECT p.ancestor_id, r.to_node_id, p.depth + 1, p.work_id
+            FROM paths p
+            JOIN node_relationship r ON r.from_node_id = p.descendant_id
+            WHERE p.depth < {MAX_BACKFILL_DEPTH}
+        )
+        SELECT p.ancestor_id, p.descendant_id, MIN(p.depth), MIN(p.work_id::text)::uuid
+        FROM paths p
+        JOIN node n ON n.id = p.descendant_id
+        GROUP BY p.ancestor_id, p.descendant_id
+        """
+    )
+
+    op.create_index('ix_node_closure_work_id', 'node_closure', ['work_id'])
+    op.create_index('ix_node_closure_descendant_id_depth', 'node_closure', ['descendant_id', 'depth'])
+    op.create_index('ix_node_closure_ancestor_id_depth', 'node_closure', ['ancestor_id', 'depth'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_node_closure_ancestor_id_depth', table_name='node_closure')
+    op.drop_index('ix_node_closure_descendant_id_depth', table_name='node_closure')
+    op.drop_index('ix_node_closure_work_id', table_name='node_closure')
+    op.drop_table('node_closure')
@@ -0,0 +1,47 @@
+"""add_node_sort_order
+
+Revision ID: f1c9e5a3b274
+Revises: e4a7c2d91b36
+Create Date: 2026-10-18 15:40:27.903114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes  # noqa: F401
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c9e5a3b274'
+down_revision: Union[str, None] = 'e4a7c2d91b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('node', sa.Column('sort_order', sa.Integer(), server_default='0', nullable=False))
+
+    # 按创建时间为同一父节点(或作品根)下的兄弟节点编号
+    op.execute(
+        """
+        UPDATE node AS n
+        SET sort_order = o.rn - 1
+        FROM (
+            SELECT n2.id,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY n2.work_id, r.from_node_id
+                       ORDER BY n2.create_at, n2.id
+                   ) AS rn
+            FROM node n2
+            LEFT JOIN node_relationship r ON r.to_node_id = n2.id
+        ) AS o
+        WHERE n.id = o.id
+        """
+    )
+    op.create_index('ix_node_work_id_sort_order_id', 'node', ['work_id', 'sort_order', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_node_work_id_sort_order_id', table_name='node')
+    op.drop_column('node', 'sort_order')
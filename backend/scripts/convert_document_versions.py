@@ -0,0 +1,107 @@
+"""
+文档版本存储转换工具
+
+将已有的 document_version 按节点、按创建时间顺序转换为"关键帧(内容寻址 blob) + 增量"链,
+或使用 --materialize 全部还原为完整内容(降级迁移前执行)。
+
+用法:
+    python scripts/convert_document_versions.py [--dry-run] [--batch 200]
+    python scripts/convert_document_versions.py --materialize
+"""
+import sys
+import argparse
+import asyncio
+from pathlib import Path
+
+# Add backend/src to sys.path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from sqlalchemy import select
+
+from common.config import settings
+from infrastructure.pg.pg_client import dispose_engines, job_session
+from infrastructure.pg.pg_models import DocumentVersionSQLEntity
+from services.node.version_store import DocumentVersionStore, get_version_storage_stats
+
+
+async def _node_ids(batch: int, after):
+    async with job_session() as session:
+        stmt = select(DocumentVersionSQLEntity.node_id)\
+            .distinct()\
+            .order_by(DocumentVersionSQLEntity.node_id)\
+            .limit(batch)
+        if after is not None:
+            stmt = stmt.where(DocumentVersionSQLEntity.node_id > after)
+        result = await session.execute(stmt)
+        return list(result.scalars().all())
+
+
+async def _storage_bytes() -> int:
+    async with job_session() as session:
+        stats = await get_version_storage_stats(session)
+    return stats["inline_bytes"] + stats["blob_bytes"]
+
+
+async def convert(batch: int, dry_run: bool, materialize: bool):
+    before_bytes = await _storage_bytes()
+    logical_bytes = 0
+    nodes = 0
+    versions = 0
+    after = None
+
+    while True:
+        node_ids = await _node_ids(batch, after)
+        if not node_ids:
+            break
+        after = node_ids[-1]
+
+        async with job_session() as session:
+            store = DocumentVersionStore(session)
+            stmt = select(DocumentVersionSQLEntity)\
+                .where(DocumentVersionSQLEntity.node_id.in_(node_ids))\
+                .order_by(DocumentVersionSQLEntity.node_id, DocumentVersionSQLEntity.create_at)
+            result = await session.execute(stmt)
+            rows = list(result.scalars().all())
+
+            # 先还原全部内容, 再改写存储
+            texts = [await store.get_text(v) for v in rows]
+            logical_bytes += sum(len(text.encode("utf-8")) for text in texts)
+
+            by_node: dict = {}
+            for v, text in zip(rows, texts):
+                by_node.setdefault(v.node_id, []).append((v, text))
+            for items in by_node.values():
+                if materialize:
+                    for v, text in items:
+                        await store.materialize(v, text)
+                else:
+                    await store.rechain(items)
+
+            nodes += len(by_node)
+            versions += len(rows)
+            if dry_run:
+                await session.rollback()
+            else:
+                await store.flush()
+                await session.commit()
+        print(f"已处理 {nodes} 个文档, {versions} 个版本")
+
+    after_bytes = await _storage_bytes()
+    ratio = (after_bytes / logical_bytes) if logical_bytes else 1.0
+    mode = "还原为完整内容" if materialize else f"转换为增量链 (关键帧间隔 {settings.DOCUMENT_VERSION_KEYFRAME_INTERVAL})"
+    print("=" * 60)
+    print(f"{mode}{' [dry-run]' if dry_run else ''}")
+    print(f"文档: {nodes}, 版本: {versions}")
+    print(f"正文逻辑大小: {logical_bytes} bytes")
+    print(f"实际存储: {before_bytes} -> {after_bytes} bytes (为逻辑大小的 {ratio:.1%})")
+    print("=" * 60)
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="文档版本存储转换")
+    parser.add_argument("--batch", type=int, default=200, help="每批处理的文档数")
+    parser.add_argument("--dry-run", action="store_true", help="只统计不提交")
+    parser.add_argument("--materialize", action="store_true", help="全部还原为完整内容")
+    args = parser.parse_args()
+    asyncio.run(convert(args.batch, args.dry_run, args.materialize))
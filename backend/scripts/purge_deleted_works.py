@@ -0,0 +1,53 @@
+"""
+已删除作品清除工具
+
+在应用之外手动执行后台清除 (与应用内的清除任务可同时运行, 认领互不阻塞):
+逐批删除全部已置墓碑作品的数据, 直到没有未完成的清除任务。
+
+用法:
+    python scripts/purge_deleted_works.py [--batch 2000]
+"""
+import sys
+import argparse
+import asyncio
+from pathlib import Path
+
+# Add backend/src to sys.path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from sqlalchemy import select
+
+from infrastructure.pg.pg_client import dispose_engines, job_session
+from infrastructure.pg.pg_models import WorkPurgeSQLEntity
+from services.work.purger import WorkPurger
+
+
+async def purge(batch: int):
+    batches = 0
+    while True:
+        async with job_session() as session:
+            purger = WorkPurger(session, batch_size=batch)
+            if not await purger.step():
+                break
+            progress = await session.get(WorkPurgeSQLEntity, purger.work_id)
+        batches += 1
+        print(
+            f"[{progress.work_name}] 阶段={progress.phase}, 节点 {progress.deleted_nodes}/{progress.total_nodes}, "
+            f"版本 {progress.deleted_versions}/{progress.total_versions}"
+        )
+
+    async with job_session() as session:
+        pending = (await session.execute(
+            select(WorkPurgeSQLEntity.work_id).where(WorkPurgeSQLEntity.finished_at.is_(None))
+        )).scalars().all()
+    print("=" * 60)
+    print(f"执行批次: {batches}, 剩余未完成任务: {len(pending)} (被其他进程占用时会在其完成后结束)")
+    print("=" * 60)
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="清除已删除作品")
+    parser.add_argument("--batch", type=int, default=2000, help="每批删除的行数")
+    args = parser.parse_args()
+    asyncio.run(purge(args.batch))
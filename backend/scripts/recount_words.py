@@ -0,0 +1,102 @@
+"""
+字数回填工具
+
+按当前统计口径 (common.utils.word_count) 重新统计全部文档版本的 word_count:
+主进程按版本 ID 分批读取正文, 进程池并行计数, 只改写数值有变化的版本,
+最后对涉及的作品重算节点与作品的字数汇总。
+
+用法:
+    python scripts/recount_words.py [--dry-run] [--batch 500] [--workers 4]
+"""
+import sys
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add backend/src to sys.path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from sqlalchemy import select, update
+
+from common.utils.word_count import count_many
+from infrastructure.pg.pg_client import dispose_engines, job_session
+from infrastructure.pg.pg_models import DocumentVersionSQLEntity, NodeSQLEntity
+from services.node.version_store import DocumentVersionStore
+from services.node.word_count_rollup import WordCountRollup
+
+
+async def _count(pool: ProcessPoolExecutor, workers: int, texts: list) -> list:
+    """将一批正文均分给各工作进程计数, 结果保持原顺序."""
+    loop = asyncio.get_running_loop()
+    size = max(1, -(-len(texts) // workers))
+    chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+    results = await asyncio.gather(*(loop.run_in_executor(pool, count_many, chunk) for chunk in chunks))
+    return [count for chunk in results for count in chunk]
+
+
+async def recount(batch: int, workers: int, dry_run: bool):
+    started = time.monotonic()
+    versions = 0
+    changed = 0
+    total_delta = 0
+    work_ids = set()
+    after = None
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            async with job_session() as session:
+                dv = DocumentVersionSQLEntity
+                stmt = select(dv.id, dv.node_id, dv.word_count).order_by(dv.id).limit(batch)
+                if after is not None:
+                    stmt = stmt.where(dv.id > after)
+                rows = (await session.execute(stmt)).all()
+                if not rows:
+                    break
+                after = rows[-1].id
+
+                texts = await DocumentVersionStore(session).get_texts([row.id for row in rows])
+                counts = await _count(pool, workers, [texts.get(row.id) or "" for row in rows])
+
+                updates = []
+                node_ids = set()
+                for row, count in zip(rows, counts):
+                    if count != row.word_count:
+                        updates.append({"id": row.id, "word_count": count})
+                        node_ids.add(row.node_id)
+                        total_delta += count - row.word_count
+                if node_ids:
+                    work_ids.update((await session.execute(
+                        select(NodeSQLEntity.work_id).where(NodeSQLEntity.id.in_(node_ids)).distinct()
+                    )).scalars().all())
+                if updates and not dry_run:
+                    await session.execute(update(DocumentVersionSQLEntity), updates)
+                    await session.commit()
+
+            versions += len(rows)
+            changed += len(updates)
+            print(f"已统计 {versions} 个版本, 其中 {changed} 个字数有变化")
+
+    if not dry_run:
+        for work_id in work_ids:
+            async with job_session() as session:
+                await WordCountRollup(session).recompute_work(work_id)
+                await session.commit()
+
+    print("=" * 60)
+    print(f"字数回填{' [dry-run]' if dry_run else ''} (进程数 {workers}, 耗时 {time.monotonic() - started:.1f}s)")
+    print(f"版本: {versions}, 字数变化: {changed} (合计 {total_delta:+d})")
+    print(f"重算汇总的作品: {len(work_ids)}")
+    print("=" * 60)
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按当前口径重新统计文档版本字数")
+    parser.add_argument("--batch", type=int, default=500, help="每批读取的版本数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="计数进程数")
+    parser.add_argument("--dry-run", action="store_true", help="只统计不提交")
+    args = parser.parse_args()
+    asyncio.run(recount(args.batch, max(1, args.workers), args.dry_run))
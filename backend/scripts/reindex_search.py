@@ -0,0 +1,92 @@
+"""
+正文检索索引重建工具
+
+为作品内全部文档的当前版本重建 document_search (上线检索功能后回填, 或分词规则变化后重建):
+逐作品按节点 ID 分批读取当前版本正文并写入索引, 最后删除本次未写入的旧行 (已无正文的文档)。
+
+用法:
+    python scripts/reindex_search.py [--work-id <uuid>] [--batch 200]
+"""
+import sys
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+# Add backend/src to sys.path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from sqlalchemy import delete, select
+
+from common.enums import NodeTypeEnum
+from common.utils.utils import get_now_time
+from infrastructure.pg.pg_client import dispose_engines, job_session
+from infrastructure.pg.pg_models import DocumentSearchSQLEntity, NodeSQLEntity, WorkSQLEntity
+from services.node.search_index import DocumentSearchIndex
+from services.node.version_store import DocumentVersionStore
+
+
+async def _reindex_work(work_id, batch: int) -> int:
+    started = get_now_time()
+    documents = 0
+    after = None
+    while True:
+        async with job_session() as session:
+            stmt = select(NodeSQLEntity.id, NodeSQLEntity.now_version_id)\
+                .where(
+                    NodeSQLEntity.work_id == work_id,
+                    NodeSQLEntity.node_type == NodeTypeEnum.DOCUMENT.value,
+                    NodeSQLEntity.now_version_id.is_not(None),
+                )\
+                .order_by(NodeSQLEntity.id)\
+                .limit(batch)
+            if after is not None:
+                stmt = stmt.where(NodeSQLEntity.id > after)
+            rows = (await session.execute(stmt)).all()
+            if not rows:
+                break
+            after = rows[-1].id
+
+            texts = await DocumentVersionStore(session).get_texts([row.now_version_id for row in rows])
+            await DocumentSearchIndex(session).update_many(work_id, [
+                (row.id, row.now_version_id, texts.get(row.now_version_id) or "") for row in rows
+            ])
+            await session.commit()
+        documents += len(rows)
+
+    async with job_session() as session:
+        await session.execute(
+            delete(DocumentSearchSQLEntity).where(
+                DocumentSearchSQLEntity.work_id == work_id, DocumentSearchSQLEntity.update_at < started
+            )
+        )
+        await session.commit()
+    return documents
+
+
+async def reindex(work_id: str | None, batch: int):
+    async with job_session() as session:
+        stmt = select(WorkSQLEntity.id, WorkSQLEntity.name).where(WorkSQLEntity.deleted_at.is_(None))
+        if work_id:
+            stmt = stmt.where(WorkSQLEntity.id == work_id)
+        works = (await session.execute(stmt.order_by(WorkSQLEntity.id))).all()
+
+    total = 0
+    for work in works:
+        started = time.monotonic()
+        documents = await _reindex_work(work.id, batch)
+        total += documents
+        print(f"[{work.name}] 文档 {documents}, 耗时 {time.monotonic() - started:.1f}s")
+
+    print("=" * 60)
+    print(f"作品: {len(works)}, 文档: {total}")
+    print("=" * 60)
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="重建正文检索索引")
+    parser.add_argument("--work-id", default=None, help="只重建指定作品")
+    parser.add_argument("--batch", type=int, default=200, help="每批处理的文档数")
+    args = parser.parse_args()
+    asyncio.run(reindex(args.work_id, args.batch))
@@ -14,12 +14,16 @@ from api.error_handler import register_exception_handlers
 from api.routes.file.router import router as file_router
 from api.routes.node.router import router as node_router
 from api.routes.plugin.router import router as plugin_router
+from api.routes.system.router import router as system_router
 from api.routes.work.router import router as work_router
 from common.config import settings
 from common.log.log import logger
-from infrastructure.pg.pg_client import async_session, engine
-from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from infrastructure.pg.pg_checkpoint import close_checkpointer, init_checkpointer
+from infrastructure.pg.pg_client import dispose_engines, job_session
 from core.plugin.runtime import PluginInternalRegistry, PluginManager
+from services.node.autosave import autosave_buffer
+from services.node.collab import collab_hub
+from services.work.purger import work_purge_worker
 
 
 async def _run_migrations() -> None:
@@ -36,15 +40,8 @@ async def lifespan(app: FastAPI):
     
     # Initialize checkpointer tables
     try:
-        # 初始化langgraph的checkpoint
-        conn_string = settings.SQLALCHEMY_DATABASE_URI
-        if "postgresql+asyncpg://" in conn_string:
-            conn_string = conn_string.replace("postgresql+asyncpg://", "postgresql://")
-        
-
-        async with AsyncPostgresSaver.from_conn_string(conn_string) as checkpointer:
-            await checkpointer.setup()
-            
+        # 初始化langgraph的checkpoint: 应用级共享, 底层为连接池
+        await init_checkpointer()
         logger.info("langgraph的checkpoint表已完成初始化")
     except Exception as e:
         logger.error(f"Failed to initialize checkpointer tables: {e}")
@@ -60,19 +57,29 @@ async def lifespan(app: FastAPI):
     app.state.internal_plugin_registry = internal_registry
     logger.info(f"已加载: {len(internal_registry.get_plugin_list())} 个内部插件定义")
     logger.info(f"已预实例化: {internal_registry}")
-    async with async_session() as session:
+    async with job_session() as session:
         manager = PluginManager(session)
         for plugin_def in internal_registry.get_plugin_list():
             await manager.add_plugin_with_register(plugin_def)
         removed = await manager.cleanup_stale_internal_plugins(internal_registry.get_plugin_list())
         if removed:
             logger.info(f"已清理 {removed} 条过期内部插件记录")
+    # 后台清除已删除作品 (含上次未完成的任务)
+    work_purge_worker.start()
     yield
     
+    await collab_hub.close_all()
+    logger.info("协同编辑通道已写回并关闭")
+    await autosave_buffer.flush_all()
+    logger.info("自动保存缓冲已提交")
+    await work_purge_worker.stop()
+    logger.info("作品清除任务已停止")
     # 清理插件管理器
     # await plugin_manager.cleanup()
     logger.info("Plugin manager cleaned up")
-    await engine.dispose()
+    await close_checkpointer()
+    logger.info("checkpoint连接池关闭")
+    await dispose_engines()
     logger.info("数据库连接关闭")
 
 def create_app() -> FastAPI:
@@ -93,12 +100,15 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # 条件请求与分页游标通过响应头返回, 需对前端脚本可见
+        expose_headers=["ETag", "X-Next-Cursor", "Content-Disposition"],
     )
 
     app.include_router(plugin_router, prefix=settings.API_V1_STR)
     app.include_router(work_router, prefix=settings.API_V1_STR)
     app.include_router(node_router, prefix=settings.API_V1_STR)
     app.include_router(file_router, prefix=settings.API_V1_STR)
+    app.include_router(system_router, prefix=settings.API_V1_STR)
 
     # Mount static files
     # Resolve absolute path to static directory: src/static
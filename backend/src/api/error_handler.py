@@ -28,7 +28,13 @@ async def base_error_handler(_: Request, exc: BaseError) -> JSONResponse:
     status_code = 500
     
     # 根据错误码映射 HTTP 状态码
-    if exc.code == 40400 or str(exc.code).startswith("520"): # 520x are not found errors in common/errors.py
+    if exc.code == 41200:
+        status_code = 412
+    elif exc.code == 41300:
+        status_code = 413
+    elif exc.code in (5204, 5205, 5206):  # 目录结构 / 正文修改校验失败
+        status_code = 400
+    elif exc.code == 40400 or str(exc.code).startswith("520"): # 520x are not found errors in common/errors.py
         status_code = 404
     elif str(exc.code).startswith("4"): # Assuming 4xxxx codes are client errors
         status_code = 400
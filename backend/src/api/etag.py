@@ -0,0 +1,53 @@
+"""ETag / 条件请求工具.
+
+ETag 由资源的修订号(revision)组成, 例如作品为 "12", 文档为 "节点修订号.版本修订号"。
+- If-None-Match 命中时返回 304, 调用方只需读取修订号, 无需加载正文;
+- If-Match 用于 PATCH 的乐观并发, 解析出期望的修订号交由服务层做条件更新。
+"""
+from typing import List, Optional
+
+from fastapi import Response as HTTPResponse
+
+from common.errors import PreconditionFailedError
+
+
+def make_etag(*revisions: int) -> str:
+    """由修订号生成强 ETag."""
+    return '"' + ".".join(str(r) for r in revisions) + '"'
+
+
+def _parse_etags(header: str) -> List[str]:
+    tags = []
+    for raw in header.split(","):
+        tag = raw.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag:
+            tags.append(tag)
+    return tags
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中 (弱比较)."""
+    if not if_none_match:
+        return False
+    tags = _parse_etags(if_none_match)
+    return "*" in tags or etag in tags
+
+
+def expected_revision(if_match: Optional[str], part: int = 0) -> Optional[int]:
+    """解析 If-Match 中期望的修订号; part 为复合 ETag 中的位置. 未提供或为 * 时返回 None."""
+    if not if_match:
+        return None
+    tags = _parse_etags(if_match)
+    if not tags or "*" in tags:
+        return None
+    try:
+        return int(tags[0].strip('"').split(".")[part])
+    except (IndexError, ValueError):
+        raise PreconditionFailedError(if_match)
+
+
+def not_modified(etag: str) -> HTTPResponse:
+    """304 响应 (不含正文)."""
+    return HTTPResponse(status_code=304, headers={"ETag": etag})
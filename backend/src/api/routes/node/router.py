@@ -1,28 +1,50 @@
-from fastapi import APIRouter, Depends
+import json
+import logging
+import os
+import tempfile
+from typing import List
+
+from fastapi import APIRouter, Depends, File, Form, Header, Query, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi import Response as HTTPResponse
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.base import Response
+from api.etag import etag_matches, expected_revision, make_etag, not_modified
 from api.routes.node.schema import (
     CreateNodeDTO,
     DocumentCreateRequest,
     DocumentDetailResponse,
+    DocumentPatchRequest,
+    DocumentPatchResponse,
     DocumentResponse,
+    DocumentSearchResponse,
     DocumentUploadRequest,
     DocumentVersionUploadRequest,
     DocumentVersionCreateRequest,
     DocumentVersionResponse,
+    NodeChildrenResponse,
     NodeCreateRequest,
+    NodeDeleteResponse,
+    NodeOutlineItem,
     NodeResponse,
     NodeUpdateRequest,
+    OutlineBatchRequest,
+    OutlineBatchResponse,
     # RelationshipResponse,
     UpdateNodeDTO,
 )
+from common.config import settings
 from common.enums import NodeTypeEnum
-from infrastructure.pg.pg_client import get_session
+from common.errors import BaseError, ImportFileTooLargeError
+from infrastructure.pg.pg_client import get_session, job_session
+from services.node.collab import collab_hub
+from services.node.importer import NovelImporter
 from services.node.service import NodeService
 # from services.work.service import WorkService
 
 router = APIRouter(tags=["nodes"])
+logger = logging.getLogger(__name__)
 
 def get_node_service(session: AsyncSession = Depends(get_session)) -> NodeService:
     return NodeService(session)
@@ -74,30 +96,31 @@ async def create_document(
         from_node_id=data.parent_node_id
     ))
 
-@router.delete("/work/{work_id}/document/{document_id}", response_model=Response[None])
+@router.delete("/work/{work_id}/document/{document_id}", response_model=Response[NodeDeleteResponse])
 async def delete_document(
     work_id: str,
     document_id: str,
     service: NodeService = Depends(get_node_service)
-) -> Response[None]:
+) -> Response[NodeDeleteResponse]:
     """删除文档."""
-    await service.delete_node(document_id)
-    return Response.ok()
+    data = await service.delete_node(document_id)
+    return Response.ok(data=data)
 
 @router.patch("/work/{work_id}/document/{document_id}", response_model=Response[None])
 async def update_document(
     work_id: str,
     document_id: str,
     request: DocumentUploadRequest,
+    if_match: str | None = Header(None),
     service: NodeService = Depends(get_node_service)
 ) -> Response[None]:
-    """更新文档基础信息 (Title, Description, Parent)."""
+    """更新文档基础信息 (Title, Description, Parent), If-Match 校验节点修订号."""
     req = UpdateNodeDTO(
         name=request.title,
         description=request.description,
         parent_node_id=request.from_node_id
     )
-    await service.update_node(document_id, req)
+    await service.update_node(document_id, req, expected_revision(if_match, 0))
     return Response.ok()
 
 @router.get("/work/{work_id}/document/{document_id}/version", response_model=Response[DocumentVersionResponse])
@@ -115,10 +138,22 @@ async def get_document_version_detail(
     work_id: str,
     document_id: str,
     version_id: str,
+    response: HTTPResponse,
+    if_none_match: str | None = Header(None),
     service: NodeService = Depends(get_node_service)
 ) -> Response[DocumentDetailResponse]:
-    """获取指定文档的指定版本的详情,并切换当前的版本为指定version的版本."""
+    """获取指定文档的指定版本的详情,并切换当前的版本为指定version的版本.
+
+    ETag 为 "节点修订号.版本修订号"; If-None-Match 命中且该版本已是当前版本时直接返回 304, 不加载正文。
+    """
+    if if_none_match:
+        stamp = await service.get_document_stamp(document_id, version_id)
+        if stamp is not None and stamp.version_id is not None and stamp.now_version_id == stamp.version_id:
+            etag = make_etag(stamp.node_revision, stamp.version_revision)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
     data = await service.get_document_version_detail_and_switch(document_id, version_id)
+    response.headers["ETag"] = make_etag(data.node_revision, data.version_revision)
     return Response.ok(data=DocumentDetailResponse(
         id=data.id,
         work_id=data.work_id,
@@ -127,7 +162,9 @@ async def get_document_version_detail(
         from_node_id=data.from_node_id,
         full_text=data.full_text,
         now_version=data.now_version,
-        now_version_id=data.now_version_id # Map service current_version_id to response now_version_id
+        now_version_id=data.now_version_id, # Map service current_version_id to response now_version_id
+        node_revision=data.node_revision,
+        version_revision=data.version_revision,
     ))
 
 @router.post("/work/{work_id}/document/{document_id}/version", response_model=Response[None])
@@ -158,20 +195,77 @@ async def update_document_version_content(
     document_id: str,
     version_id: str,
     request: DocumentVersionUploadRequest,
+    response: HTTPResponse,
+    if_match: str | None = Header(None),
     service: NodeService = Depends(get_node_service)
 ) -> Response[DocumentDetailResponse]:
-    """更新指定版本的内容."""
-    data = await service.update_document_version_content(document_id, version_id, request.full_text)
+    """更新指定版本的内容 (编辑器自动保存, 经写后缓冲合并提交), If-Match 校验版本修订号 (ETag 的第二段)."""
+    data = await service.autosave_document_version_content(
+        document_id, version_id, request.full_text, expected_revision(if_match, 1)
+    )
+    response.headers["ETag"] = make_etag(data.node_revision, data.version_revision)
+    return Response.ok(data=data)
+
+@router.post("/work/{work_id}/document/{document_id}/version/{version_id}/patch", response_model=Response[DocumentPatchResponse])
+async def patch_document_version_content(
+    work_id: str,
+    document_id: str,
+    version_id: str,
+    request: DocumentPatchRequest,
+    service: NodeService = Depends(get_node_service)
+) -> Response[DocumentPatchResponse]:
+    """以区间操作增量修改指定版本的内容, base_revision 与当前修订号不一致时返回 412 (全部操作按 find 定位时不校验)."""
+    data = await service.patch_document_version_content(document_id, version_id, request)
     return Response.ok(data=data)
 
+@router.websocket("/work/{work_id}/document/{document_id}/version/{version_id}/collab")
+async def collaborate_document_version(
+    websocket: WebSocket,
+    work_id: str,
+    document_id: str,
+    version_id: str,
+):
+    """指定版本的协同编辑通道: 连接后收到快照, 之后以增量消息收发修改 (协议见 services.node.collab).
+
+    通道存续期间只在加载与写回快照时借用数据库连接。
+    """
+    await websocket.accept()
+
+    async def load():
+        async with job_session() as session:
+            return await NodeService(session).load_collab_state(document_id, version_id)
+
+    try:
+        channel, client = await collab_hub.join(document_id, version_id, websocket, load)
+    except BaseError as e:
+        await websocket.send_json({"type": "error", "code": e.code, "message": e.message, "client_seq": None})
+        await websocket.close(code=1008)
+        return
+    try:
+        while True:
+            await channel.receive(client, await websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await channel.leave(client)
+
 @router.get("/work/{work_id}/document/{document_id}", response_model=Response[DocumentDetailResponse])
 async def get_document_detail(
     work_id: str,
     document_id: str,
+    response: HTTPResponse,
+    if_none_match: str | None = Header(None),
     service: NodeService = Depends(get_node_service)
 ) -> Response[DocumentDetailResponse]:
-    """获取文档详情."""
+    """获取文档详情 (当前版本), ETag 为 "节点修订号.版本修订号"."""
+    if if_none_match:
+        stamp = await service.get_document_stamp(document_id)
+        if stamp is not None:
+            etag = make_etag(stamp.node_revision, stamp.version_revision)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
     data = await service.get_node_detail(document_id)
+    response.headers["ETag"] = make_etag(data.node_revision, data.version_revision)
     return Response.ok(data=DocumentDetailResponse(
         id=data.id,
         work_id=data.work_id,
@@ -180,7 +274,9 @@ async def get_document_detail(
         from_node_id=data.parent_node_id,
         full_text=data.content,
         now_version=str(data.now_version) if data.now_version else None,
-        now_version_id=data.now_version_id # Pass version_id
+        now_version_id=data.now_version_id, # Pass version_id
+        node_revision=data.node_revision,
+        version_revision=data.version_revision,
     ))
 
 # --- Nodes (Folders) ---
@@ -207,32 +303,148 @@ async def create_node(
         from_node_id=data.parent_node_id
     ))
 
-@router.delete("/work/{work_id}/node/{node_id}", response_model=Response[None])
+@router.delete("/work/{work_id}/node/{node_id}", response_model=Response[NodeDeleteResponse])
 async def delete_node(
     work_id: str,
     node_id: str,
     service: NodeService = Depends(get_node_service)
-) -> Response[None]:
-    """删除节点."""
-    await service.delete_node(node_id)
-    return Response.ok()
+) -> Response[NodeDeleteResponse]:
+    """删除节点及其子树."""
+    data = await service.delete_node(node_id)
+    return Response.ok(data=data)
 
 @router.patch("/work/{work_id}/node/{node_id}", response_model=Response[None])
 async def update_node(
     work_id: str,
     node_id: str,
     request: NodeUpdateRequest,
+    if_match: str | None = Header(None),
     service: NodeService = Depends(get_node_service)
 ) -> Response[None]:
-    """更新节点."""
+    """更新节点, If-Match 校验节点修订号."""
     req = UpdateNodeDTO(
         name=request.name,
         description=request.description,
-        parent_node_id=request.from_node_id
+        parent_node_id=request.from_node_id,
+        sort_order=request.sort_order,
     )
-    await service.update_node(node_id, req)
+    await service.update_node(node_id, req, expected_revision(if_match, 0))
     return Response.ok()
 
+# --- Outline ---
+
+@router.post("/work/{work_id}/outline/batch", response_model=Response[OutlineBatchResponse])
+async def apply_outline_batch(
+    work_id: str,
+    request: OutlineBatchRequest,
+    service: NodeService = Depends(get_node_service)
+) -> Response[OutlineBatchResponse]:
+    """批量创建/移动/重命名/删除节点, 整体校验后在一个事务内生效."""
+    data = await service.apply_outline_batch(work_id, request)
+    return Response.ok(data=data)
+
+_UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+async def _spool_upload(file: UploadFile, max_bytes: int) -> str:
+    """将上传文件分块落盘为临时文件 (请求结束后上传对象即关闭, 流式导入改读该文件)."""
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(file.filename or "")[1])
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(_UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ImportFileTooLargeError(max_bytes)
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+@router.post("/work/{work_id}/import")
+async def import_novel(
+    work_id: str,
+    file: UploadFile = File(..., description="txt/markdown 小说文件"),
+    parent_id: str | None = Form(None, description="导入到的文件夹, 为空则导入到作品根目录"),
+    encoding: str | None = Form(None, description="文件编码, 为空则自动识别 (UTF-8/GB18030)"),
+    session: AsyncSession = Depends(get_session)
+) -> StreamingResponse:
+    """流式导入小说: 按卷/章增量切割并批量建档, 以 NDJSON 逐批返回进度, 最后一行为 done 或 error."""
+    await NovelImporter(session).check_target(work_id, parent_id)
+    path = await _spool_upload(file, settings.NOVEL_IMPORT_MAX_BYTES)
+
+    async def progress_stream():
+        try:
+            # 导入为长事务, 使用独立的 JOB 连接池会话
+            async with job_session() as job:
+                async for event in NovelImporter(job).run(work_id, path, parent_id, encoding):
+                    yield json.dumps(event, ensure_ascii=False) + "\n"
+        except BaseError as e:
+            yield json.dumps({"event": "error", "code": e.code, "message": e.message}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.exception(f"[NovelImport] work_id={work_id} failed")
+            yield json.dumps({"event": "error", "code": 500, "message": str(e)}, ensure_ascii=False) + "\n"
+        finally:
+            os.remove(path)
+
+    return StreamingResponse(progress_stream(), media_type="application/x-ndjson")
+
+@router.get("/work/{work_id}/outline", response_model=Response[List[NodeOutlineItem]])
+async def get_work_outline(
+    work_id: str,
+    max_depth: int | None = Query(None, ge=0, description="最大深度, 根节点为 0"),
+    service: NodeService = Depends(get_node_service)
+) -> Response[List[NodeOutlineItem]]:
+    """获取作品目录 (扁平列表, 按深度排列)."""
+    data = await service.get_work_outline(work_id, max_depth)
+    return Response.ok(data=data)
+
+@router.get("/work/{work_id}/children", response_model=Response[NodeChildrenResponse])
+async def get_node_children(
+    work_id: str,
+    parent_id: str | None = Query(None, description="父节点ID, 为空时返回根节点"),
+    cursor: str | None = Query(None, description="上一页返回的 next_cursor"),
+    limit: int | None = Query(None, ge=1, le=settings.NODE_CHILDREN_MAX_PAGE_SIZE),
+    depth: int = Query(1, ge=1, le=settings.NODE_CHILDREN_MAX_DEPTH, description="展开深度, 1 为只取直接子节点"),
+    service: NodeService = Depends(get_node_service)
+) -> Response[NodeChildrenResponse]:
+    """按兄弟顺序分页获取子节点, 供大目录按需展开."""
+    data = await service.get_children(work_id, parent_id, cursor, limit, depth)
+    return Response.ok(data=data)
+
+@router.get("/work/{work_id}/search", response_model=Response[DocumentSearchResponse])
+async def search_work_documents(
+    work_id: str,
+    q: str = Query(..., min_length=1, max_length=settings.SEARCH_MAX_QUERY_CHARS, description="检索词, 多个词以空格分隔 (需同时出现)"),
+    cursor: str | None = Query(None, description="上一页返回的 next_cursor"),
+    limit: int | None = Query(None, ge=1, le=settings.SEARCH_MAX_PAGE_SIZE),
+    service: NodeService = Depends(get_node_service)
+) -> Response[DocumentSearchResponse]:
+    """在作品全部文档的当前版本中全文检索, 按相关度分页, 附带命中片段与高亮区间."""
+    data = await service.search_documents(work_id, q, cursor, limit)
+    return Response.ok(data=data)
+
+@router.get("/work/{work_id}/node/{node_id}/subtree", response_model=Response[List[NodeOutlineItem]])
+async def get_node_subtree(
+    work_id: str,
+    node_id: str,
+    max_depth: int | None = Query(None, ge=0, description="相对该节点的最大深度"),
+    service: NodeService = Depends(get_node_service)
+) -> Response[List[NodeOutlineItem]]:
+    """获取节点子树 (含自身)."""
+    data = await service.get_subtree(node_id, max_depth)
+    return Response.ok(data=data)
+
+@router.get("/work/{work_id}/node/{node_id}/ancestors", response_model=Response[List[NodeOutlineItem]])
+async def get_node_ancestors(
+    work_id: str,
+    node_id: str,
+    service: NodeService = Depends(get_node_service)
+) -> Response[List[NodeOutlineItem]]:
+    """获取节点祖先链 (从根到父节点)."""
+    data = await service.get_ancestors(node_id)
+    return Response.ok(data=data)
+
 # --- Relationships ---
 
 # 开发者: BackendAgent(python)
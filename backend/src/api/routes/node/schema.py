@@ -1,11 +1,11 @@
-from typing import List
+from typing import Any, List, Literal, Tuple
 from uuid import UUID
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from api.routes.work.schema import EdgeDTO, NodeDTO
-from common.enums import NodeTypeEnum
+from common.enums import ContentPatchOperationEnum, NodeTypeEnum, OutlineOperationEnum
 
 # --- Document Schemas ---
 
@@ -28,6 +28,37 @@ class DocumentUploadRequest(BaseModel):
 class DocumentVersionUploadRequest(BaseModel):
     full_text: str
 
+class DocumentPatchOperation(BaseModel):
+    """正文区间修改, 坐标均相对基准修订的正文 (Unicode 字符偏移, 左闭右开).
+
+    - replace: 以 text 替换 [start, end) 或 find 命中的片段;
+    - insert: 在 start 处插入 text;
+    - delete: 删除 [start, end) 或 find 命中的片段。
+    find 须在基准正文中恰好出现一次, 给出 find 时不再给出 start/end。
+    """
+    op: ContentPatchOperationEnum
+    start: int | None = Field(None, ge=0)
+    end: int | None = Field(None, ge=0)
+    text: str | None = None
+    find: str | None = None
+
+class DocumentPatchRequest(BaseModel):
+    base_revision: int = Field(..., ge=0)  # 基准版本修订号, 与当前修订号不一致时返回 412 (全部操作按 find 定位时不校验)
+    operations: List[DocumentPatchOperation] = Field(..., min_length=1)
+
+class DocumentPatchResponse(BaseModel):
+    version_id: UUID
+    version_revision: int
+    word_count: int
+    word_count_delta: int
+
+class CollabOpsMessage(BaseModel):
+    """协同编辑通道中客户端提交的一批修改 (坐标相对 base_revision 的正文)."""
+    type: Literal["ops"]
+    base_revision: int = Field(..., ge=0)
+    operations: List[DocumentPatchOperation] = Field(..., min_length=1)
+    client_seq: Any = None  # 客户端自定义序号, 原样回传于 ack/error
+
 class DocumentDetailResponse(BaseModel):
     id: UUID
     work_id:UUID
@@ -37,6 +68,8 @@ class DocumentDetailResponse(BaseModel):
     full_text: str | None = None
     now_version_id: UUID
     now_version: str | None = None # 当前版本名称
+    node_revision: int = 0
+    version_revision: int = 0
 
 class DocumentVersionCreateRequest(BaseModel):
     version_name: str | None = None
@@ -69,6 +102,7 @@ class NodeUpdateRequest(BaseModel):
     description: str | None = None
     type: NodeTypeEnum = NodeTypeEnum.FOLDER
     from_node_id: UUID | None = None
+    sort_order: int | None = None
 
 class RelationshipResponse(BaseModel):
     document: List[NodeDTO] = []
@@ -87,6 +121,76 @@ class UpdateNodeDTO(BaseModel):
     description: str | None = None
     parent_node_id: UUID | None = None
     content: str | None = None
+    sort_order: int | None = None
+
+class NodeOutlineItem(BaseModel):
+    """目录树条目 (扁平), 由 parent_node_id 还原层级."""
+    id: UUID
+    name: str
+    type: NodeTypeEnum
+    parent_node_id: UUID | None = None
+    depth: int = 0
+    sort_order: int = 0
+    word_count: int = 0
+    has_children: bool | None = None
+
+class NodeDeleteResponse(BaseModel):
+    """删除子树的统计."""
+    deleted_nodes: int = 0
+    deleted_relationships: int = 0
+    deleted_versions: int = 0
+
+class OutlineOperation(BaseModel):
+    """目录批量操作.
+
+    - create: name 必填, node_id 可由调用方预先生成以便后续操作引用;
+    - move: parent_node_id 为空表示移动为根节点;
+    - rename: 修改 name/description;
+    - delete: 删除节点及其子树。
+    sort_order 为空时追加到兄弟末尾。
+    """
+    op: OutlineOperationEnum
+    node_id: UUID | None = None
+    name: str | None = None
+    description: str | None = None
+    type: NodeTypeEnum = NodeTypeEnum.FOLDER
+    parent_node_id: UUID | None = None
+    sort_order: int | None = None
+
+class OutlineBatchRequest(BaseModel):
+    operations: List[OutlineOperation] = Field(..., min_length=1)
+
+class OutlineBatchResponse(BaseModel):
+    created_node_ids: List[UUID] = []
+    created: int = 0
+    moved: int = 0
+    renamed: int = 0
+    deleted: int = 0
+
+class NodeChildrenResponse(BaseModel):
+    """子节点分页结果: items 中 depth=1 为本页直接子节点, 更深的为其展开的子孙."""
+    items: List[NodeOutlineItem] = []
+    next_cursor: str | None = None
+
+class DocumentSearchSnippet(BaseModel):
+    """命中片段: text 为正文 [start, end) 的原文 (码点偏移), highlights 为其中查询词的区间 (相对 text)."""
+    start: int
+    end: int
+    text: str
+    highlights: List[Tuple[int, int]] = []
+
+class DocumentSearchHit(BaseModel):
+    node_id: UUID
+    version_id: UUID
+    title: str
+    rank: float
+    match_count: int = 0
+    snippets: List[DocumentSearchSnippet] = []
+
+class DocumentSearchResponse(BaseModel):
+    """检索结果分页: 按相关度倒序."""
+    items: List[DocumentSearchHit] = []
+    next_cursor: str | None = None
 
 class NodeDetailResponse(BaseModel):
     # Service returns this
@@ -101,3 +205,5 @@ class NodeDetailResponse(BaseModel):
     now_version: str | None = None
     now_version_id: UUID | None = None # 添加 version_id
     now_version: str | None = None
+    node_revision: int = 0
+    version_revision: int = 0
@@ -0,0 +1 @@
+"""System Routes package."""
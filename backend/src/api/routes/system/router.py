@@ -0,0 +1,16 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter
+
+from api.base import Response
+from infrastructure.pg.pg_checkpoint import get_checkpoint_pool_stats
+from infrastructure.pg.pg_client import get_pool_stats
+
+router = APIRouter(prefix="/system", tags=["system"])
+
+@router.get("/db/pool", response_model=Response[Dict[str, Dict[str, Any]]])
+async def get_db_pool_stats() -> Response[Dict[str, Dict[str, Any]]]:
+    """获取数据库连接池占用与等待统计(含 checkpointer 连接池)."""
+    stats = get_pool_stats()
+    stats["checkpoint"] = get_checkpoint_pool_stats()
+    return Response.ok(data=stats)
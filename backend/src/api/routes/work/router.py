@@ -1,17 +1,26 @@
 from typing import List
+from urllib.parse import quote
 # from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi import Response as HTTPResponse
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.base import Response
+from api.etag import etag_matches, expected_revision, make_etag, not_modified
 from api.routes.work.schema import (
     CreateWorkRequest,
     WorkDetailResponse,
     WorkMetaResponse,
     WorkMetaUpdateRequest,
+    WorkPurgeResponse,
 )
-from infrastructure.pg.pg_client import get_session
+from common.config import settings
+from common.enums import ExportFormatEnum, WorkStateCNEnum, WorkTypeEnum
+from infrastructure.pg.pg_client import get_session, job_session
+from services.work.exporter import FILE_EXTENSIONS, MEDIA_TYPES, WorkExporter
+from services.work.purger import work_purge_worker
 from services.work.service import WorkService
 
 router = APIRouter(prefix="/work", tags=["works"])
@@ -30,21 +39,29 @@ async def create_work(
 
 @router.get("", response_model=Response[List[WorkMetaResponse]])
 async def get_work_list(
+    response: HTTPResponse,
+    cursor: str | None = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    limit: int | None = Query(None, ge=1, le=settings.WORK_LIST_MAX_PAGE_SIZE),
+    state: WorkStateCNEnum | None = Query(None),
+    type: WorkTypeEnum | None = Query(None),
     service: WorkService = Depends(get_work_service)
 ) -> Response[List[WorkMetaResponse]]:
-    """获取作品列表."""
-    data = await service.get_work_list()
-    return Response.ok(data=data)
+    """获取作品列表 (按更新时间倒序分页); 还有下一页时通过响应头 X-Next-Cursor 返回游标."""
+    page = await service.get_work_list(cursor, limit, state, type)
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return Response.ok(data=page.items)
 
 
 @router.patch("/{work_id}", response_model=Response[None])
 async def update_work_meta(
     work_id: str,
     request: WorkMetaUpdateRequest,
+    if_match: str | None = Header(None),
     service: WorkService = Depends(get_work_service)
 ) -> Response[None]:
-    """更新作品元数据."""
-    await service.update_work_meta(work_id, request)
+    """更新作品元数据 (支持 If-Match 乐观并发)."""
+    await service.update_work_meta(work_id, request, expected_revision(if_match))
     return Response.ok()
 
 @router.delete("/{work_id}", response_model=Response[None])
@@ -52,18 +69,57 @@ async def delete_work(
     work_id: str,
     service: WorkService = Depends(get_work_service)
 ) -> Response[None]:
-    """删除作品."""
+    """删除作品: 立即隐藏并返回, 数据由后台分批清除 (进度见 GET /work/{work_id}/purge)."""
     await service.delete_work(work_id)
+    work_purge_worker.wake()
     return Response.ok()
 
+@router.get("/{work_id}/purge", response_model=Response[WorkPurgeResponse])
+async def get_work_purge(
+    work_id: str,
+    service: WorkService = Depends(get_work_service)
+) -> Response[WorkPurgeResponse]:
+    """获取已删除作品的后台清除进度."""
+    data = await service.get_work_purge(work_id)
+    return Response.ok(data=data)
+
 @router.get("/{work_id}", response_model=Response[WorkDetailResponse])
 async def get_work_detail(
     work_id: str,
+    response: HTTPResponse,
+    if_none_match: str | None = Header(None),
     service: WorkService = Depends(get_work_service)
 ) -> Response[WorkDetailResponse]:
-    """获取作品详情."""
+    """获取作品详情 (ETag 为作品修订号, If-None-Match 命中时返回 304)."""
+    if if_none_match:
+        revision = await service.get_work_revision(work_id)
+        if revision is not None and etag_matches(if_none_match, make_etag(revision)):
+            return not_modified(make_etag(revision))
     data = await service.get_work_detail(work_id)
+    response.headers["ETag"] = make_etag(data.meta.revision)
     return Response.ok(data=data)
+
+@router.get("/{work_id}/export")
+async def export_work(
+    work_id: str,
+    format: ExportFormatEnum = Query(ExportFormatEnum.TXT, description="导出格式"),
+    session: AsyncSession = Depends(get_session)
+) -> StreamingResponse:
+    """按目录顺序流式导出整部作品 (txt / markdown / epub)."""
+    work_name = await WorkExporter(session).get_work_name(work_id)
+
+    async def body():
+        # 响应体在请求依赖释放后才开始生成, 使用独立会话; 长时间顺序读取走 JOB 连接池
+        async with job_session() as job:
+            async for chunk in WorkExporter(job).export(work_id, work_name, format):
+                yield chunk
+
+    filename = quote(f"{work_name}.{FILE_EXTENSIONS[format]}")
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{filename}"},
+    )
     
 # 开发者: BackendAgent(python)
 # 当前版本: BE-DEP-20260224-03
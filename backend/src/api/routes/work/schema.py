@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from common.enums import (
     NodeTypeEnum,
     PluginFromTypeEnum,
+    WorkPurgePhaseEnum,
     WorkStateCNEnum,
     WorkTypeEnum,
 )
@@ -20,6 +21,8 @@ class WorkMetaDTO(BaseModel):
     summary: str | None = None
     state: WorkStateCNEnum = WorkStateCNEnum.UPDATING 
     type: WorkTypeEnum
+    word_count: int = 0
+    revision: int = 0
     create_at: datetime
     update_at: datetime
 
@@ -28,7 +31,8 @@ class NodeDTO(BaseModel):
     name: str
     description: str | None = None
     type: NodeTypeEnum
-    # now_version_id: UUID
+    word_count: int = 0
+    now_version_id: UUID | None = None
     now_version: str | None = None
 
 class EdgeDTO(BaseModel):
@@ -46,6 +50,28 @@ class CreateWorkRequest(BaseModel):
 class WorkMetaResponse(BaseModel):
     meta: WorkMetaDTO
 
+class WorkListPage(BaseModel):
+    """作品列表分页结果 (按 update_at, id 倒序)."""
+    items: List[WorkMetaResponse] = []
+    next_cursor: str | None = None
+
+class WorkPurgeResponse(BaseModel):
+    """已删除作品的后台清除进度."""
+    work_id: UUID
+    work_name: str
+    phase: WorkPurgePhaseEnum
+    total_nodes: int | None = None
+    total_versions: int | None = None
+    deleted_closure_rows: int = 0
+    deleted_relationships: int = 0
+    deleted_versions: int = 0
+    deleted_nodes: int = 0
+    batches: int = 0
+    last_error: str | None = None
+    requested_at: datetime
+    update_at: datetime
+    finished_at: datetime | None = None
+
 class WorkMetaUpdateRequest(BaseModel):
     cover_image_url: str | None = None
     name: str | None = None
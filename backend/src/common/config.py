@@ -64,6 +64,97 @@ class Settings(BaseSettings):
             url = url.replace("postgresql://", "postgresql+asyncpg://", 1)
         return url
 
+    # 只读副本: 配置后只读查询路由到该库, 为空则全部走主库
+    DATABASE_REPLICA_URL: Union[PostgresDsn, str, None] = None
+
+    @computed_field
+    @property
+    def SQLALCHEMY_REPLICA_URI(self) -> str | None:
+        if not self.DATABASE_REPLICA_URL:
+            return None
+        url = str(self.DATABASE_REPLICA_URL)
+        if url.startswith("postgresql://"):
+            url = url.replace("postgresql://", "postgresql+asyncpg://", 1)
+        return url
+
+    # 连接池配置: 按负载划分为 api(交互式接口) / agent(Agent流式) / job(后台任务) 三个池
+    # statement_timeout 单位为毫秒, 0 表示不限制
+    DB_POOL_TIMEOUT: float = 30.0
+
+    DB_API_POOL_SIZE: int = 10
+    DB_API_MAX_OVERFLOW: int = 10
+    DB_API_POOL_RECYCLE: int = 1800
+    DB_API_STATEMENT_TIMEOUT: int = 15000
+
+    DB_AGENT_POOL_SIZE: int = 5
+    DB_AGENT_MAX_OVERFLOW: int = 5
+    DB_AGENT_POOL_RECYCLE: int = 1800
+    DB_AGENT_STATEMENT_TIMEOUT: int = 60000
+
+    DB_JOB_POOL_SIZE: int = 2
+    DB_JOB_MAX_OVERFLOW: int = 2
+    DB_JOB_POOL_RECYCLE: int = 3600
+    DB_JOB_STATEMENT_TIMEOUT: int = 0
+
+    # 文档版本增量存储: 每隔 N 个版本存一次完整关键帧, 其余版本只存差异
+    DOCUMENT_VERSION_KEYFRAME_INTERVAL: int = 10
+    # 还原后的版本正文缓存条目数 (进程内 LRU)
+    DOCUMENT_VERSION_CACHE_SIZE: int = 256
+
+    # 编辑器自动保存写后缓冲: 停止输入后延迟提交的秒数 (0 表示不缓冲, 每次保存直接提交),
+    # 持续输入时距首次未提交保存的最长秒数, 全部缓冲正文的字符数上限 (超出即立即提交)
+    AUTOSAVE_DEBOUNCE_SECONDS: float = 1.5
+    AUTOSAVE_MAX_DELAY_SECONDS: float = 10.0
+    AUTOSAVE_MAX_BUFFER_CHARS: int = 20_000_000
+
+    # 协同编辑通道: 保留的操作日志条数 (更旧的基准修订需重新同步), 快照写回的间隔秒数与累计操作数,
+    # 每个连接待发送消息的队列上限 (超出视为消费过慢并断开), 单条消息的最大字符数
+    COLLAB_LOG_SIZE: int = 1000
+    COLLAB_SNAPSHOT_SECONDS: float = 5.0
+    COLLAB_SNAPSHOT_OPS: int = 200
+    COLLAB_CLIENT_QUEUE_SIZE: int = 256
+    COLLAB_MAX_MESSAGE_CHARS: int = 1_000_000
+
+    # 字数统计: 进程内缓存计数结果的段落数上限 (0 为不缓存)
+    WORD_COUNT_CACHE_PARAGRAPHS: int = 50_000
+
+    # 正文区间修改: 单次请求的最大操作数
+    CONTENT_PATCH_MAX_OPERATIONS: int = 500
+
+    # 目录子节点分页: 默认/最大每页条数, 单次展开的最大深度
+    NODE_CHILDREN_PAGE_SIZE: int = 100
+    NODE_CHILDREN_MAX_PAGE_SIZE: int = 500
+    NODE_CHILDREN_MAX_DEPTH: int = 5
+
+    # 作品列表分页: 默认/最大每页条数
+    WORK_LIST_PAGE_SIZE: int = 50
+    WORK_LIST_MAX_PAGE_SIZE: int = 200
+
+    # 正文检索: 默认/最大每页条数, 查询的最大字符数, 每条命中返回的片段数及命中词两侧的上下文字符数
+    SEARCH_PAGE_SIZE: int = 20
+    SEARCH_MAX_PAGE_SIZE: int = 100
+    SEARCH_MAX_QUERY_CHARS: int = 100
+    SEARCH_SNIPPETS_PER_HIT: int = 3
+    SEARCH_SNIPPET_CONTEXT_CHARS: int = 40
+
+    # 小说导入: 上传文件大小上限, 每批写入的章节数/字符数上限 (达到任一即落库并上报进度)
+    NOVEL_IMPORT_MAX_BYTES: int = 64 * 1024 * 1024
+    NOVEL_IMPORT_BATCH_CHAPTERS: int = 200
+    NOVEL_IMPORT_BATCH_CHARS: int = 2_000_000
+
+    # 作品后台清除: 每批删除的行数, 批次间隔(秒, 让出锁给其他写入), 无任务时的轮询间隔(秒)
+    WORK_PURGE_BATCH_SIZE: int = 2000
+    WORK_PURGE_BATCH_PAUSE: float = 0.05
+    WORK_PURGE_POLL_INTERVAL: float = 30.0
+
+    # 作品导出: 服务端游标每批读取的节点数, 响应输出缓冲达到该字节数即发送
+    WORK_EXPORT_BATCH_SIZE: int = 200
+    WORK_EXPORT_FLUSH_BYTES: int = 64 * 1024
+
+    # LangGraph checkpointer 连接池 (psycopg)
+    CHECKPOINT_POOL_MIN_SIZE: int = 1
+    CHECKPOINT_POOL_MAX_SIZE: int = 10
+
     # LLM 配置 (示例)
     OPENAI_API_KEY: str | None = None
     OPENAI_API_BASE: str | None = None
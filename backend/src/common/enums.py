@@ -20,12 +20,51 @@ class NodeTypeEnum(str, Enum):
     FOLDER = "folder"
     DOCUMENT = "document"
 
+class OutlineOperationEnum(str, Enum):
+    """目录批量操作类型."""
+    CREATE = "create"
+    MOVE = "move"
+    RENAME = "rename"
+    DELETE = "delete"
+
+class ContentPatchOperationEnum(str, Enum):
+    """文档正文区间修改操作类型."""
+    REPLACE = "replace"
+    INSERT = "insert"
+    DELETE = "delete"
+
+class WorkPurgePhaseEnum(str, Enum):
+    """作品后台清除阶段 (按顺序推进)."""
+    CLOSURE = "closure"  # 闭包行
+    RELATIONSHIPS = "relationships"  # 父子边
+    VERSIONS = "versions"  # 文档版本 (释放 blob 引用)
+    NODES = "nodes"  # 节点
+    FINALIZE = "finalize"  # 插件映射与作品行
+    DONE = "done"
+
+class ExportFormatEnum(str, Enum):
+    """作品导出格式."""
+    TXT = "txt"
+    MARKDOWN = "markdown"
+    EPUB = "epub"
+
 class PluginFromTypeEnum(str, Enum):
     """插件来源类型."""
     SYSTEM = "system"
     CUSTOM = "custom"
     OFFICIAL = "official"
 
+class DBPoolEnum(str, Enum):
+    """数据库连接池(按负载划分)."""
+    API = "api"  # 交互式接口(短事务 CRUD)
+    AGENT = "agent"  # Agent 流式对话(长时间占用)
+    JOB = "job"  # 后台任务(启动初始化/迁移/批处理)
+
+class VersionStorageEnum(str, Enum):
+    """文档版本存储方式."""
+    FULL = "full"  # 关键帧: full_text 存完整内容
+    DELTA = "delta"  # 增量: delta 存相对 base_version 的差异
+
 class MemoryTypeEnum(str, Enum):
     """记忆类型."""
     LONG_TERM = "long_term"  # 长期记忆
@@ -42,6 +42,51 @@ class DocumentNotFoundError(BaseError):
     def __init__(self, document_id: str):
         super().__init__(5202, message=f"文档不存在: {document_id}")
         self.document_id = document_id
+
+class DocumentVersionCorruptedError(BaseError):
+    """文档版本增量链损坏异常."""
+
+    def __init__(self, version_id: str):
+        super().__init__(5203, message=f"文档版本增量链损坏, 无法还原内容: {version_id}")
+        self.version_id = version_id
+
+class NodeCycleError(BaseError):
+    """节点移动成环异常."""
+
+    def __init__(self, node_id: str, parent_node_id: str):
+        super().__init__(5204, message=f"不能将节点移动到其自身或子孙节点下: {node_id} -> {parent_node_id}")
+        self.node_id = node_id
+        self.parent_node_id = parent_node_id
+
+class InvalidOutlineOperationError(BaseError):
+    """目录批量操作校验失败异常."""
+
+    def __init__(self, index: int, reason: str):
+        super().__init__(5205, message=f"第 {index + 1} 个目录操作无效: {reason}")
+        self.index = index
+
+class InvalidContentPatchError(BaseError):
+    """文档正文区间修改校验失败异常."""
+
+    def __init__(self, index: int, reason: str):
+        super().__init__(5206, message=f"第 {index + 1} 个正文修改操作无效: {reason}")
+        self.index = index
+
+class PreconditionFailedError(BaseError):
+    """If-Match 条件不满足 (资源已被修改) 异常."""
+    def __init__(self, resource: str):
+        super().__init__(41200, message=f"资源已被修改, 请刷新后重试: {resource}")
+
+class InvalidCursorError(BaseError):
+    """分页游标无效异常."""
+    def __init__(self, cursor: str):
+        super().__init__(40001, message=f"分页游标无效: {cursor}")
+
+class ImportFileTooLargeError(BaseError):
+    """导入文件超出大小上限异常."""
+    def __init__(self, max_bytes: int):
+        super().__init__(41300, message=f"导入文件过大, 上限为 {max_bytes // 1024 // 1024} MiB")
+
 class ResourceNotFoundError(BaseError):
     """资源不存在通用异常."""
     def __init__(self, message: str = "Resource not found"):
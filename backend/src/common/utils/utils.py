@@ -1,5 +1,6 @@
 """Utility & helper functions."""
 import os
+import re
 import uuid
 from datetime import datetime
 from typing import Union
@@ -11,6 +12,7 @@ from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 
 from common.config import settings
+from common.utils.word_count import ParagraphWordCounter
 
 # Try to import FakeListChatModel, define a fallback if missing
 try:
@@ -127,6 +129,31 @@ def get_now_time(timezone: str = "Asia/Shanghai") -> datetime:
 def format_time(time: datetime) -> str:
     """格式化时间."""
     return time.strftime("%Y-%m-%d %H:%M:%S")
+
+def encode_cursor(*values) -> str:
+    """将排序键编码为不透明的分页游标 (base64url JSON)."""
+    import base64
+    import json
+
+    raw = json.dumps(list(values), ensure_ascii=False, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """解码分页游标, 格式不符时抛出 InvalidCursorError."""
+    import base64
+    import binascii
+    import json
+
+    from common.errors import InvalidCursorError
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw.decode("utf-8"))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursorError(cursor) from e
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError(cursor)
+    return values
 """"""
 def normalize_region(region: str) -> str | None:
     """Normalize region aliases to standard values.
@@ -176,34 +203,14 @@ def get_message_text(msg: BaseMessage) -> str:
         return "".join(txts).strip()
 
 
-import re
+_word_counter = ParagraphWordCounter(settings.WORD_COUNT_CACHE_PARAGRAPHS)
 
 
 def count_words(text: str) -> int:
-    """后端标准字数统计：
-    1. 中文字符（含标点）计为 1。
-    2. 英文单词（以空白分隔）计为 1。
-    3. 剔除空白字符。.
-    """
-    if not text:
-        return 0
-    
-    # 移除首尾空白
-    text = text.strip()
-    if not text:
-        return 0
-
-    # 1. 统计中文字符 (CJK Unified Ideographs)
-    # 范围：\u4e00-\u9fa5
-    chinese_pattern = re.compile(r'[\u4e00-\u9fa5]')
-    chinese_count = len(chinese_pattern.findall(text))
-    
-    # 2. 统计非中文部分，先将中文替换为空格
-    text_no_chinese = chinese_pattern.sub(' ', text)
-    # 按空白分割，统计单词数
-    english_count = len(text_no_chinese.split())
-    
-    return chinese_count + english_count
+    """后端标准字数统计 (口径见 common.utils.word_count), 整篇统计时未改动的段落取缓存结果."""
+    return _word_counter.count(text)
+
+
 # 废弃
 def load_chat_model_with_env(
     node_name: str|None = None,
@@ -366,7 +373,7 @@ def _safe_to_dict(obj: Any) -> dict:
 支持按章节格式切割文档，并保留章节信息和行号
 """
 
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Optional
 
 from langchain_core.documents import Document
 
@@ -375,14 +382,68 @@ class DocumentTextSplitter:
     """按文档切割文档的文本分割器."""
     
     def __init__(self, 
-                 document_pattern: str = r'^第\d+章\s+.+$'):
+                 document_pattern: str = r'^第\d+章\s+.+$',
+                 volume_pattern: Optional[str] = None):
         """初始化文档文本分割器.
         
         Args:
             document_pattern: 文档标题的正则表达式模式
+            volume_pattern: 卷标题的正则表达式模式 (可选, 卷标题行不计入任何文档内容)
         """
         self.document_pattern = document_pattern
-     # 查找所有文档(行号标记)
+        self.volume_pattern = volume_pattern
+        self._document_re = re.compile(document_pattern)
+        self._volume_re = re.compile(volume_pattern) if volume_pattern else None
+
+    @staticmethod
+    def _chunk(title: Optional[str], volume: Optional[str], lines: List[str]) -> Dict:
+        return {
+            'content': '\n'.join(lines),
+            'metadata': {
+                'document_title': title,
+                'volume_title': volume,
+            }
+        }
+
+    def iter_documents(self, lines: Iterable[str], include_preamble: bool = False) -> Iterator[Dict]:
+        """逐行增量切割: 读到下一个标题时产出上一个文档块, 内存中只保留当前文档的行.
+
+        只有标题没有正文的文档也会产出 (content 为空); 无标题的前置内容只在非空白时产出。
+        
+        Args:
+            lines: 文本行 (可为文件对象等惰性迭代器, 行尾换行符会被去除)
+            include_preamble: 是否产出第一个标题之前、以及卷标题与该卷第一个文档标题之间的内容 (document_title 为 None)
+            
+        Returns:
+            文档块迭代器, 块结构与 split_by_documents 相同, metadata 额外包含 volume_title
+        """
+        title: Optional[str] = None
+        volume: Optional[str] = None
+        buffer: List[str] = []
+        started = include_preamble
+
+        for line in lines:
+            line = line.rstrip('\r\n')
+            stripped = line.strip()
+            is_volume = self._volume_re is not None and self._volume_re.match(stripped)
+            if is_volume or self._document_re.match(stripped):
+                if started and (title is not None or '\n'.join(buffer).strip()):
+                    yield self._chunk(title, volume, buffer)
+                buffer = []
+                if is_volume:
+                    volume, title = stripped, None
+                    started = include_preamble
+                else:
+                    title = stripped
+                    started = True
+                continue
+            if started:
+                buffer.append(line)
+
+        if started and (title is not None or '\n'.join(buffer).strip()):
+            yield self._chunk(title, volume, buffer)
+
+    # 查找所有文档(行号标记)
     def _find_documents(self, text: str) -> List[Dict]:
         """查找文档中的所有文档
         Args:
@@ -396,7 +457,7 @@ class DocumentTextSplitter:
         
         for i, line in enumerate(lines, 1):
             # 起始位置
-            if re.match(self.document_pattern, line.strip()):
+            if self._document_re.match(line.strip()):
                 documents.append({
                     'title': line.strip(),
                     'start_line': i,
@@ -439,35 +500,9 @@ class DocumentTextSplitter:
         Returns:
             切割后的文档块列表，每个块包含内容、元数据等信息
         """
-        # 读取文档内容
+        # 逐行读取, 不一次性载入全文
         with open(file_path, encoding='utf-8') as f:
-            text = f.read()
-        
-        # 查找所有文档
-        documents = self._find_documents(text)
-        
-        # 按章节处理
-        all_chunks = []
-        
-        for document_info in documents:
-            # 提取文档内容
-            document_content = self._extract_document_content(text, document_info)
-            
-            # 如果文档内容为空，跳过
-            if not document_content.strip():
-                continue
-    
-            # 为每个块添加元数据
-          
-            chunk_info = {
-                'content': document_content,
-                'metadata': {
-                    'document_title': document_info['title']
-                }
-            }
-            all_chunks.append(chunk_info)
-        
-        return all_chunks
+            return list(self.iter_documents(f))
 
     def to_docment(self, chunks: List[Dict]) -> List[Document]:
         """将切割后的块转换为 Document 类型.
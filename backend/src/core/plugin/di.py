@@ -16,5 +16,10 @@ def Inject(dependency: Optional[Callable[..., Any]] = None) -> Any:
     当前支持的上下文参数：
     - 'session': 数据库会话 (AsyncSession)
     - 'plugin_id': 当前插件ID (str)
+
+    数据库会话按负载选择连接池:
+    - Inject(get_session): 交互式接口池, 适用于短事务 CRUD
+    - Inject(get_agent_session): Agent 池, 适用于流式对话等长时间占用连接的操作
+    - Inject(get_job_session): 后台任务池
     """
     return DependencyInfo(dependency=dependency)
@@ -15,6 +15,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.plugin.runtime import PluginInternalRegistry
+from infrastructure.pg.pg_client import SessionProvider
 from infrastructure.pg.pg_models import AgentsManagerSQLEntity
 
 
@@ -109,7 +110,7 @@ async def _get_agent_tool_config(
 
 async def build_tools_from_plugins(
     registry: PluginInternalRegistry,
-    session: AsyncSession,
+    session_provider: SessionProvider,
     agent_name: str,
 ) -> List[BaseTool]:
     """
@@ -117,7 +118,7 @@ async def build_tools_from_plugins(
 
     Args:
         registry: 插件内部注册器（内存中的插件定义和 wrapper）
-        session: 数据库会话（用于读取 Agent 配置 + 调用插件操作）
+        session_provider: 会话提供者（读取 Agent 配置与每次调用插件操作时按需借用连接, 调用结束即归还）
         agent_name: Agent 名称（用于读取 per-Agent 工具开关配置）
 
     Returns:
@@ -133,7 +134,8 @@ async def build_tools_from_plugins(
         return []
 
     # 2. 读取 Agent 的工具开关配置
-    tool_config = await _get_agent_tool_config(session, agent_name)
+    async with session_provider() as session:
+        tool_config = await _get_agent_tool_config(session, agent_name)
 
     # 3. 构建工具
     tools: List[BaseTool] = []
@@ -206,13 +208,17 @@ async def build_tools_from_plugins(
                 # 延迟导入避免循环依赖
                 from services.plugin.service import PluginService
 
-                service = PluginService(session)
-                result = await service.invoke_plugin_operation(
-                    plugin_id=_pid,
-                    operation_name=_on,
-                    params=packed_kwargs,
-                    registry=_reg,
-                )
+                async with session_provider() as session:
+                    service = PluginService(session)
+                    result = await service.invoke_plugin_operation(
+                        plugin_id=_pid,
+                        operation_name=_on,
+                        params=packed_kwargs,
+                        registry=_reg,
+                    )
+                    # 流式结果需在归还连接前消费完毕
+                    if inspect.isasyncgen(result):
+                        result = [item async for item in result]
                 # 如果是 PluginOperationInvokeResponse，提取 payload
                 if hasattr(result, "payload"):
                     return result.payload
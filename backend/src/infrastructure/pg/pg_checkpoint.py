@@ -0,0 +1,68 @@
+"""LangGraph Checkpoint Module.
+
+应用级共享的 checkpointer: 在 app lifespan 中创建一次, 底层使用 psycopg 异步连接池,
+插件通过 `Inject(get_checkpoint)` 获取同一个实例, 不再为每次调用单独建立连接。
+"""
+from typing import Any, Dict, Optional
+
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from common.config import settings
+
+_checkpoint_pool: Optional[AsyncConnectionPool] = None
+_checkpointer: Optional[AsyncPostgresSaver] = None
+
+
+def _build_conn_string() -> str:
+    conn_string = settings.SQLALCHEMY_DATABASE_URI
+    if "postgresql+asyncpg://" in conn_string:
+        conn_string = conn_string.replace("postgresql+asyncpg://", "postgresql://")
+    return conn_string
+
+
+async def init_checkpointer() -> AsyncPostgresSaver:
+    """创建连接池与 checkpointer, 并初始化 checkpoint 表."""
+    global _checkpoint_pool, _checkpointer
+    if _checkpointer is not None:
+        return _checkpointer
+    pool = AsyncConnectionPool(
+        conninfo=_build_conn_string(),
+        min_size=settings.CHECKPOINT_POOL_MIN_SIZE,
+        max_size=settings.CHECKPOINT_POOL_MAX_SIZE,
+        timeout=settings.DB_POOL_TIMEOUT,
+        # AsyncPostgresSaver 要求 autocommit + dict_row, 关闭预编译以兼容 pgbouncer
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        name="checkpoint",
+        open=False,
+    )
+    await pool.open()
+    checkpointer = AsyncPostgresSaver(pool)
+    await checkpointer.setup()
+    _checkpoint_pool = pool
+    _checkpointer = checkpointer
+    return checkpointer
+
+
+async def close_checkpointer() -> None:
+    """关闭 checkpointer 连接池."""
+    global _checkpoint_pool, _checkpointer
+    if _checkpoint_pool is not None:
+        await _checkpoint_pool.close()
+    _checkpoint_pool = None
+    _checkpointer = None
+
+
+async def get_checkpoint() -> AsyncPostgresSaver:
+    """获取应用级共享的 checkpointer (用于插件 Inject)."""
+    if _checkpointer is None:
+        raise RuntimeError("checkpointer 尚未初始化, 请确认应用 lifespan 已执行 init_checkpointer")
+    return _checkpointer
+
+
+def get_checkpoint_pool_stats() -> Dict[str, Any]:
+    """获取 checkpointer 连接池统计."""
+    if _checkpoint_pool is None:
+        return {}
+    return dict(_checkpoint_pool.get_stats())
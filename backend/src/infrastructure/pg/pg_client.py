@@ -1,27 +1,280 @@
 """PostgreSQL Client Module."""
-from typing import AsyncGenerator
+import time
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Optional, Sequence, TypeVar
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import Row, Select, Table, event, func, update
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import ORMExecuteState, Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from common.config import settings
+from common.enums import DBPoolEnum
+from common.errors import PreconditionFailedError, ResourceNotFoundError
 
 # Database Setup
 DATABASE_URL = settings.SQLALCHEMY_DATABASE_URI
+REPLICA_DATABASE_URL = settings.SQLALCHEMY_REPLICA_URI
 
-engine = create_async_engine(DATABASE_URL, echo=False, future=True, pool_pre_ping=True)
-async_session = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
+# session.info 中的路由标记
+_REPLICA_READ_KEY = "replica_read_depth"
+_PRIMARY_STICKY_KEY = "primary_sticky"
+
+
+@dataclass
+class PoolSettings:
+    """单个连接池的配置."""
+    pool_size: int
+    max_overflow: int
+    pool_recycle: int
+    statement_timeout: int  # 毫秒, 0 表示不限制
+
+
+POOL_SETTINGS: Dict[DBPoolEnum, PoolSettings] = {
+    DBPoolEnum.API: PoolSettings(
+        pool_size=settings.DB_API_POOL_SIZE,
+        max_overflow=settings.DB_API_MAX_OVERFLOW,
+        pool_recycle=settings.DB_API_POOL_RECYCLE,
+        statement_timeout=settings.DB_API_STATEMENT_TIMEOUT,
+    ),
+    DBPoolEnum.AGENT: PoolSettings(
+        pool_size=settings.DB_AGENT_POOL_SIZE,
+        max_overflow=settings.DB_AGENT_MAX_OVERFLOW,
+        pool_recycle=settings.DB_AGENT_POOL_RECYCLE,
+        statement_timeout=settings.DB_AGENT_STATEMENT_TIMEOUT,
+    ),
+    DBPoolEnum.JOB: PoolSettings(
+        pool_size=settings.DB_JOB_POOL_SIZE,
+        max_overflow=settings.DB_JOB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_JOB_POOL_RECYCLE,
+        statement_timeout=settings.DB_JOB_STATEMENT_TIMEOUT,
+    ),
+}
+
+
+@dataclass
+class PoolWaitStats:
+    """连接获取(checkout)的等待统计."""
+    checkouts: int = 0
+    timeouts: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+# key 为 pool 的 logging_name, pool recreate 时会沿用该名称, 因此统计不会丢失
+_pool_wait_stats: Dict[str, PoolWaitStats] = {}
+
+
+class MeteredAsyncQueuePool(AsyncAdaptedQueuePool):
+    """在获取连接时记录等待时长的连接池."""
+
+    def _do_get(self) -> Any:
+        stats = _pool_wait_stats.setdefault(self._orig_logging_name or "default", PoolWaitStats())
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        stats.record(time.perf_counter() - start)
+        return conn
+
+
+def _create_pool_engine(pool: DBPoolEnum, url: str = DATABASE_URL, logging_name: str | None = None) -> AsyncEngine:
+    pool_settings = POOL_SETTINGS[pool]
+    logging_name = logging_name or pool.value
+    server_settings = {"application_name": f"novel_assistant_{logging_name}"}
+    if pool_settings.statement_timeout > 0:
+        server_settings["statement_timeout"] = str(pool_settings.statement_timeout)
+    return create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        pool_pre_ping=True,
+        poolclass=MeteredAsyncQueuePool,
+        pool_size=pool_settings.pool_size,
+        max_overflow=pool_settings.max_overflow,
+        pool_recycle=pool_settings.pool_recycle,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_logging_name=logging_name,
+        connect_args={"server_settings": server_settings},
+    )
+
+
+engines: Dict[DBPoolEnum, AsyncEngine] = {pool: _create_pool_engine(pool) for pool in DBPoolEnum}
+# 只读副本与交互式接口池使用相同的池配置, 未配置时为 None
+replica_engine: Optional[AsyncEngine] = (
+    _create_pool_engine(DBPoolEnum.API, url=REPLICA_DATABASE_URL, logging_name="replica")
+    if REPLICA_DATABASE_URL else None
 )
 
+
+class RoutingSession(Session):
+    """读写路由会话.
+
+    - 处于 replica_read 标记的方法内, 且本会话尚未写入时, 查询路由到只读副本;
+    - 一旦本会话发生过写入(flush/DML), 之后的所有查询固定走主库, 保证同一请求内读到自己的写入;
+    - 其余情况走主库(会话绑定的连接池引擎)。
+    """
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kw: Any) -> Any:
+        if (
+            replica_engine is not None
+            and self.info.get(_REPLICA_READ_KEY, 0) > 0
+            and not self.info.get(_PRIMARY_STICKY_KEY)
+            and not self._flushing
+        ):
+            return replica_engine.sync_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _stick_to_primary_after_flush(session: Session, _flush_context: Any) -> None:
+    session.info[_PRIMARY_STICKY_KEY] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _stick_to_primary_on_dml(orm_execute_state: ORMExecuteState) -> None:
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info[_PRIMARY_STICKY_KEY] = True
+
+
+session_makers: Dict[DBPoolEnum, sessionmaker] = {
+    pool: sessionmaker(pool_engine, class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False)
+    for pool, pool_engine in engines.items()
+}
+
+# 兼容旧代码: 默认使用交互式接口池
+engine = engines[DBPoolEnum.API]
+async_session = session_makers[DBPoolEnum.API]
+agent_session = session_makers[DBPoolEnum.AGENT]
+job_session = session_makers[DBPoolEnum.JOB]
+
+# 会话提供者: 每次调用返回一个新的 AsyncSession, 使用方通过 `async with provider() as session` 借用连接,
+# 退出即归还连接池。用于 Agent 工具等需要在长流程中按需短暂访问数据库的场景。
+SessionProvider = Callable[[], AsyncSession]
+
+
+def session_dependency(pool: DBPoolEnum) -> Callable[[], AsyncGenerator[AsyncSession, None]]:
+    """构建指定连接池的会话依赖, 可同时用于 FastAPI Depends 与插件 Inject."""
+    async def _get_session() -> AsyncGenerator[AsyncSession, None]:
+        async with session_makers[pool]() as session:
+            yield session
+    _get_session.__name__ = f"get_{pool.value}_session"
+    return _get_session
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Get database session."""
     async with async_session() as session:
         yield session
 
+get_agent_session = session_dependency(DBPoolEnum.AGENT)
+get_job_session = session_dependency(DBPoolEnum.JOB)
+
+
+T = TypeVar("T")
+
+
+def replica_read(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """标记只读方法: 方法内的查询优先路由到只读副本.
+
+    被装饰的方法所属对象需持有 `self.session` (AsyncSession)。
+    """
+    @wraps(func)
+    async def wrapper(self: Any, *args: Any, **kwargs: Any) -> T:
+        info = self.session.info
+        info[_REPLICA_READ_KEY] = info.get(_REPLICA_READ_KEY, 0) + 1
+        try:
+            return await func(self, *args, **kwargs)
+        finally:
+            info[_REPLICA_READ_KEY] -= 1
+    return wrapper
+
+
+async def fetch_projection(session: AsyncSession, stmt: Select) -> Sequence[Row]:
+    """Core 投影查询: 只取所需列, 直接返回行元组.
+
+    通过会话当前连接执行, 不构建 ORM 实体、不进入 identity map, 适用于只读列表。
+    连接仍由会话的 get_bind 决定, replica_read 路由照常生效。
+    """
+    conn = await session.connection()
+    result = await conn.execute(stmt)
+    return result.all()
+
+
+async def bump_revision(
+    session: AsyncSession, table: Table, row_id: Any, expected: Optional[int] = None, at_least: Optional[int] = None
+) -> int:
+    """递增行的 revision 并返回新值 (用作 ETag).
+
+    给定 expected 时仅当当前 revision 与之相等才更新 (If-Match 乐观并发): 条件 UPDATE 同时持有行锁,
+    并发写入者会在提交后重新判断条件而失败, 不满足时抛出 PreconditionFailedError。
+    at_least 用于一次写入合并了多次修改的场景 (自动保存缓冲): 新值不小于已对外公布的修订号。
+    """
+    revision = table.c.revision + 1
+    if at_least is not None:
+        revision = func.greatest(revision, at_least)
+    stmt = update(table)\
+        .where(table.c.id == row_id)\
+        .values(revision=revision)\
+        .returning(table.c.revision)
+    if expected is not None:
+        stmt = stmt.where(table.c.revision == expected)
+    revision = (await session.execute(stmt)).scalar_one_or_none()
+    if revision is None:
+        if expected is not None:
+            raise PreconditionFailedError(f"{table.name}:{row_id}")
+        raise ResourceNotFoundError(f"{table.name} not found: {row_id}")
+    return revision
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """获取各连接池的占用与等待统计, 用于池大小调优."""
+    stats: Dict[str, Dict[str, Any]] = {}
+    pool_engines: Dict[str, tuple[AsyncEngine, PoolSettings]] = {
+        pool.value: (pool_engine, POOL_SETTINGS[pool]) for pool, pool_engine in engines.items()
+    }
+    if replica_engine is not None:
+        pool_engines["replica"] = (replica_engine, POOL_SETTINGS[DBPoolEnum.API])
+    for name, (pool_engine, pool_settings) in pool_engines.items():
+        sa_pool = pool_engine.pool
+        wait = _pool_wait_stats.get(name, PoolWaitStats())
+        stats[name] = {
+            "pool_size": pool_settings.pool_size,
+            "max_overflow": pool_settings.max_overflow,
+            "checked_out": sa_pool.checkedout() if hasattr(sa_pool, "checkedout") else 0,
+            "checked_in": sa_pool.checkedin() if hasattr(sa_pool, "checkedin") else 0,
+            "overflow": sa_pool.overflow() if hasattr(sa_pool, "overflow") else 0,
+            "checkouts": wait.checkouts,
+            "timeouts": wait.timeouts,
+            "avg_wait_ms": round(wait.total_wait / wait.checkouts * 1000, 3) if wait.checkouts else 0.0,
+            "max_wait_ms": round(wait.max_wait * 1000, 3),
+        }
+    return stats
+
+
+async def dispose_engines() -> None:
+    """关闭所有连接池."""
+    for pool_engine in engines.values():
+        await pool_engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
+
 class PGClient:
     """PostgreSQL Client - Legacy/User Wrapper."""
-    
+
     def __init__(self, session: AsyncSession):
         """Initialize PostgresClient."""
         self.session = session
@@ -4,7 +4,8 @@ from typing import Dict, List
 from typing_extensions import runtime
 from uuid import UUID
 
-from sqlalchemy import JSON, TIMESTAMP, Column, String
+from sqlalchemy import JSON, TIMESTAMP, Column, ForeignKey, Index, String, Uuid, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlmodel import Field, Relationship, SQLModel
 
 from common.enums import (
@@ -12,8 +13,10 @@ from common.enums import (
     PluginFromTypeEnum,
     WorkTypeEnum,
     WorkStateEnum,
+    WorkPurgePhaseEnum,
     MemoryTypeEnum,
-    LoaderType
+    LoaderType,
+    VersionStorageEnum
 )
 from common.utils.utils import create_uuid, get_now_time
 
@@ -56,6 +59,11 @@ class PluginSQLEntity(SQLModel, table=True):
 class WorkSQLEntity(SQLModel, table=True):
     """作品表: 项目的核心实体（如一本小说）。."""
     __tablename__ = "work"
+    __table_args__ = (
+        # 作品列表按 (update_at, id) 倒序键集分页, 及按状态过滤后分页
+        Index("ix_work_update_at_id", text("update_at DESC"), text("id DESC")),
+        Index("ix_work_state_update_at_id", "state", text("update_at DESC"), text("id DESC")),
+    )
 
     id: UUID = Field(default_factory=create_uuid, primary_key=True, description="作品ID")
     # user_id removed
@@ -68,6 +76,10 @@ class WorkSQLEntity(SQLModel, table=True):
     work_type: str = Field(default=WorkTypeEnum.NOVEL.value, sa_column=Column(String), description="作品类型标识")
     
     state: str = Field(default=WorkStateEnum.UPDATING.value, sa_column=Column(String), description="状态: updating, completed")
+    word_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"}, description="全部文档当前版本字数合计 (增量维护)")
+    revision: int = Field(default=0, sa_column_kwargs={"server_default": "0"}, description="修订号, 作品元数据或目录变化时递增 (ETag)")
+    # 墓碑: 删除时只置该字段, 作品立即对外不可见, 数据由后台清除任务分批删除
+    deleted_at: datetime | None = Field(default=None, sa_type=TIMESTAMP(timezone=True), description="删除时间 (软删除墓碑)")
     
     create_at: datetime = Field(default_factory=get_now_time, sa_type=TIMESTAMP(timezone=True))
     update_at: datetime = Field(default_factory=get_now_time, sa_type=TIMESTAMP(timezone=True))
@@ -77,6 +89,30 @@ class WorkSQLEntity(SQLModel, table=True):
     nodes: List["NodeSQLEntity"] = Relationship(back_populates="work")
 
 
+class WorkPurgeSQLEntity(SQLModel, table=True):
+    """作品清除任务表: 记录已删除作品的后台分批清除进度 (作品行最后删除, 因此不设外键)。."""
+    __tablename__ = "work_purge"
+    __table_args__ = (
+        # 清除任务只扫描未完成的行, 按最久未推进认领
+        Index("ix_work_purge_pending", "update_at", postgresql_where=text("finished_at IS NULL")),
+    )
+
+    work_id: UUID = Field(primary_key=True, description="作品ID")
+    work_name: str = Field(default="", description="作品名称 (作品行删除后仍可查看)")
+    phase: str = Field(default=WorkPurgePhaseEnum.CLOSURE.value, sa_column=Column(String, nullable=False), description="当前阶段")
+    total_nodes: int | None = Field(default=None, description="开始清除时的节点数")
+    total_versions: int | None = Field(default=None, description="开始清除时的版本数")
+    deleted_closure_rows: int = Field(default=0)
+    deleted_relationships: int = Field(default=0)
+    deleted_versions: int = Field(default=0)
+    deleted_nodes: int = Field(default=0)
+    batches: int = Field(default=0, description="已执行的批次数")
+    last_error: str | None = Field(default=None, description="最近一次失败原因 (下次轮询重试)")
+    requested_at: datetime = Field(default_factory=get_now_time, sa_type=TIMESTAMP(timezone=True))
+    update_at: datetime = Field(default_factory=get_now_time, sa_type=TIMESTAMP(timezone=True))
+    finished_at: datetime | None = Field(default=None, sa_type=TIMESTAMP(timezone=True))
+
+
 class WorkPluginMappingSQLEntity(SQLModel, table=True):
     """作品-插件关联表: 记录某个作品启用了哪些插件，以及特定的配置。."""
     __tablename__ = "work_plugin_mapping"
@@ -104,6 +140,9 @@ class WorkPluginMappingSQLEntity(SQLModel, table=True):
 class AgentsManagerSQLEntity(SQLModel, table=True):
     """agent的管理模块."""
     __tablename__ = "agents_manager"   
+    __table_args__ = (
+        Index("ix_agents_manager_name", "name"),
+    )
 
     id: UUID = Field(default_factory=create_uuid, primary_key=True, description="agent的id")    
     name: str = Field(description="agent的名称")
@@ -138,6 +177,10 @@ class WorkTypeSQLEntity(SQLModel, table=True):
 class NodeSQLEntity(SQLModel, table=True):
     """节点表: 构成作品内容的原子单位（文档、文件夹、白板等）。."""
     __tablename__ = "node"
+    __table_args__ = (
+        # 根节点按兄弟顺序的键集分页
+        Index("ix_node_work_id_sort_order_id", "work_id", "sort_order", "id"),
+    )
 
     id: UUID = Field(default_factory=create_uuid, primary_key=True, description="节点ID")
     work_id: UUID = Field(foreign_key="work.id", index=True)
@@ -146,7 +189,21 @@ class NodeSQLEntity(SQLModel, table=True):
     description: str | None = Field(default=None, description="节点描述")
     node_type: str = Field(default=NodeTypeEnum.FOLDER.value, sa_column=Column(String), description="类型: document, folder, whiteboard...")
     
-    now_version: str | None = Field(default=None, description="当前版本ID")
+    now_version: str | None = Field(default=None, description="当前版本名称 (兼容旧数据, 以 now_version_id 为准)")
+    # 与 document_version.node_id 互相引用, 使用 use_alter 延后创建外键; 版本被删除时置空
+    now_version_id: UUID | None = Field(
+        default=None,
+        sa_column=Column(
+            Uuid,
+            ForeignKey("document_version.id", ondelete="SET NULL", use_alter=True, name="fk_node_now_version_id"),
+            nullable=True,
+            index=True,
+        ),
+        description="当前版本ID",
+    )
+    sort_order: int = Field(default=0, sa_column_kwargs={"server_default": "0"}, description="同一父节点下的兄弟顺序")
+    word_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"}, description="字数: 文档为当前版本字数, 文件夹为子树合计 (增量维护)")
+    revision: int = Field(default=0, sa_column_kwargs={"server_default": "0"}, description="修订号, 节点信息或当前版本变化时递增 (ETag)")
 
     create_at: datetime = Field(default_factory=get_now_time, sa_type=TIMESTAMP(timezone=True))
     update_at: datetime = Field(default_factory=get_now_time, sa_type=TIMESTAMP(timezone=True))
@@ -170,20 +227,75 @@ class NodeRelationshipSQLEntity(SQLModel, table=True):
     update_at: datetime = Field(default_factory=get_now_time, sa_type=TIMESTAMP(timezone=True))
 
 
+class NodeClosureSQLEntity(SQLModel, table=True):
+    """节点闭包表: 目录树中每一对(祖先, 子孙)一行, 含自身(depth=0), 用于单条 SQL 完成子树/祖先/深度查询。."""
+    __tablename__ = "node_closure"
+    __table_args__ = (
+        Index("ix_node_closure_descendant_id_depth", "descendant_id", "depth"),
+        Index("ix_node_closure_ancestor_id_depth", "ancestor_id", "depth"),
+    )
+
+    ancestor_id: UUID = Field(sa_column=Column(Uuid, ForeignKey("node.id", ondelete="CASCADE"), primary_key=True))
+    descendant_id: UUID = Field(sa_column=Column(Uuid, ForeignKey("node.id", ondelete="CASCADE"), primary_key=True))
+    depth: int = Field(default=0, description="祖先到子孙的层数, 自身为 0")
+    work_id: UUID = Field(foreign_key="work.id", index=True)
+
+
 class DocumentVersionSQLEntity(SQLModel, table=True):
     """文档版本表: 存储 Node (类型为 document) 的实际内容历史。."""
     __tablename__ = "document_version"
+    __table_args__ = (
+        Index("ix_document_version_node_id_version", "node_id", "version"),
+        Index("ix_document_version_node_id_create_at", "node_id", text("create_at DESC")),
+    )
 
     id: UUID = Field(default_factory=create_uuid, primary_key=True)
     node_id: UUID = Field(foreign_key="node.id", index=True)
     
     version: str = Field(default=1, description="版本号")
 
-    full_text: str = Field(default="", description="文档内容 (HTML/JSON/Markdown)")
+    full_text: str = Field(default="", description="文档内容 (HTML/JSON/Markdown), 仅旧数据内联存储, 新关键帧存于 document_blob")
     word_count: int = Field(default=0)
-    
-    create_at: datetime = Field(default_factory=get_now_time, sa_type=TIMESTAMP(timezone=True)) 
 
+    # 增量存储: storage_type=delta 时, 内容 = apply(base_version 的内容, delta)
+    storage_type: str = Field(default=VersionStorageEnum.FULL.value, sa_column=Column(String, nullable=False, server_default=VersionStorageEnum.FULL.value), description="存储方式: full, delta")
+    base_version_id: UUID | None = Field(default=None, index=True, description="增量的基准版本ID (同一节点内)")
+    delta: List | None = Field(default=None, sa_column=Column(JSON), description="相对基准版本的差异操作列表")
+    chain_depth: int = Field(default=0, sa_column_kwargs={"server_default": "0"}, description="距最近关键帧的增量层数")
+    revision: int = Field(default=0, sa_column_kwargs={"server_default": "0"}, description="修订号, 内容修改时递增 (ETag)")
+    # 关键帧内容: 指向按内容哈希寻址的 blob, 相同内容的版本共享同一行
+    blob_hash: str | None = Field(default=None, foreign_key="document_blob.hash", index=True, description="关键帧内容 blob 的哈希")
+
+    create_at: datetime = Field(default_factory=get_now_time, sa_type=TIMESTAMP(timezone=True))
+
+
+class DocumentBlobSQLEntity(SQLModel, table=True):
+    """文档内容 blob 表: 按内容 sha256 寻址, 引用计数归零后回收。."""
+    __tablename__ = "document_blob"
+
+    hash: str = Field(primary_key=True, description="内容 sha256 (hex)")
+    content: str = Field(description="完整内容")
+    size: int = Field(default=0, description="内容字节数")
+    ref_count: int = Field(default=0, description="引用该 blob 的版本数")
+    create_at: datetime = Field(default_factory=get_now_time, sa_type=TIMESTAMP(timezone=True))
+
+
+class DocumentSearchSQLEntity(SQLModel, table=True):
+    """文档检索表: 每个文档的当前版本一行, 正文分词后的 tsvector (见 services.node.search_index)。."""
+    __tablename__ = "document_search"
+    __table_args__ = (
+        # 作品内检索: 复合 GIN 索引 (需 btree_gin 扩展), 只匹配本作品的行
+        Index("ix_document_search_work_id_vector", "work_id", "search_vector", postgresql_using="gin"),
+    )
+
+    node_id: UUID = Field(sa_column=Column(Uuid, ForeignKey("node.id", ondelete="CASCADE"), primary_key=True))
+    work_id: UUID = Field(foreign_key="work.id")
+    version_id: UUID = Field(
+        sa_column=Column(Uuid, ForeignKey("document_version.id", ondelete="CASCADE"), nullable=False, index=True),
+        description="建立索引时的当前版本ID",
+    )
+    search_vector: str = Field(sa_column=Column(TSVECTOR, nullable=False))
+    update_at: datetime = Field(default_factory=get_now_time, sa_type=TIMESTAMP(timezone=True))
 
 # --- 7.4 知识库(Knowledge)(插件) ---
 
@@ -202,6 +314,9 @@ class KnowledgeBaseSQLEntity(SQLModel, table=True):
 
 class KnowledgeChunkSQLEntity(SQLModel, table=True):
     __tablename__ = "knowledge_chunk"
+    __table_args__ = (
+        Index("ix_knowledge_chunk_kb_id_enabled", "kb_id", "enabled"),
+    )
     
     id: UUID = Field(default_factory=create_uuid, primary_key=True)
     kb_id: UUID = Field(foreign_key="knowledge_base.id", index=True)    
@@ -52,8 +52,8 @@ async def call_model(
     model_name = context.get("model_name")
     api_key = context.get("api_key")
     base_url = context.get("base_url")
-    session = context.get("session")
-    if not model_name or not api_key or not base_url or session is None:
+    session_provider = context.get("session_provider")
+    if not model_name or not api_key or not base_url or session_provider is None:
         raise ValueError("document helper runtime context is incomplete")
     model = ChatOpenAI(
         model=model_name,
@@ -64,7 +64,7 @@ async def call_model(
     )
     builtin_tools = build_document_helper_tools(
         document_content=context.get("document_content", ""),
-        session=session,
+        session_provider=session_provider,
         document_title=context.get("document_title"),
         default_work_id=context.get("work_id"),
         default_document_id=context.get("document_id"),
@@ -115,12 +115,12 @@ async def tool_gate(
         # HITL removed
         pass
     context = _resolve_runtime_context(runtime, fallback_context)
-    session = context.get("session")
-    if session is None:
-        raise ValueError("document helper runtime session is missing")
+    session_provider = context.get("session_provider")
+    if session_provider is None:
+        raise ValueError("document helper runtime session_provider is missing")
     builtin_tools = build_document_helper_tools(
         document_content=context.get("document_content", ""),
-        session=session,
+        session_provider=session_provider,
         document_title=context.get("document_title"),
         default_work_id=context.get("work_id"),
         default_document_id=context.get("document_id"),
@@ -3,7 +3,7 @@ from langchain_core.tools import BaseTool
 from langgraph.graph import add_messages
 from common.model.base_agent import BaseAgentRuntime
 from common.utils.utils import create_uuid
-from sqlalchemy.ext.asyncio import AsyncSession
+from infrastructure.pg.pg_client import SessionProvider
 from typing import Annotated, Any, List, Optional, TypedDict
 
 class DocumentHelpAgentRuntime(BaseAgentRuntime):
@@ -12,7 +12,7 @@ class DocumentHelpAgentRuntime(BaseAgentRuntime):
     user_prompt: str
     document_content: str
     document_title: Optional[str]
-    session: AsyncSession
+    session_provider: SessionProvider
     work_id: Optional[str]
     document_id: Optional[str]
     version_id: Optional[str]
@@ -3,16 +3,17 @@ from typing import Literal, Optional
 from uuid import UUID
 
 from langchain_core.tools import tool
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.routes.node.schema import CreateNodeDTO, UpdateNodeDTO
-from common.enums import NodeTypeEnum
+from api.routes.node.schema import CreateNodeDTO, DocumentPatchOperation, DocumentPatchRequest, UpdateNodeDTO
+from common.enums import ContentPatchOperationEnum, NodeTypeEnum
+from common.errors import BaseError, InvalidContentPatchError, PreconditionFailedError, ResourceNotFoundError
+from infrastructure.pg.pg_client import SessionProvider
 from services.node.service import NodeService
 
 
 def build_document_helper_tools(
     document_content: str,
-    session: AsyncSession,
+    session_provider: SessionProvider,
     document_title: Optional[str] = None,
     default_work_id: Optional[str] = None,
     default_document_id: Optional[str] = None,
@@ -21,7 +22,7 @@ def build_document_helper_tools(
     normalized_content = document_content or ""
     first_line = normalized_content.strip().splitlines()[0] if normalized_content.strip() else "未命名文档"
     resolved_title = document_title or first_line
-    node_service = NodeService(session)
+    # 工具只在每次数据库调用期间借用连接, 调用结束即归还连接池, 不在等待 LLM 期间占用连接
 
     @tool("read_document_info")
     async def read_document_info(version: str = "current") -> dict:
@@ -47,7 +48,8 @@ def build_document_helper_tools(
         resolved_document_id = default_document_id
         resolved_version_id = default_version_id
         if resolved_document_id and not resolved_version_id:
-            detail = await node_service.get_node_detail(resolved_document_id)
+            async with session_provider() as session:
+                detail = await NodeService(session).get_node_detail(resolved_document_id)
             resolved_version_id = str(detail.now_version_id) if detail.now_version_id else None
         return {
             "version": version,
@@ -67,6 +69,7 @@ def build_document_helper_tools(
         reason: str,
         document_id: Optional[str] = None,
         version_id: Optional[str] = None,
+        find_text: Optional[str] = None,
     ) -> dict:
         """修改文档标题与正文内容（真实写库）。
 
@@ -83,32 +86,55 @@ def build_document_helper_tools(
         - new_content: 要写入的新内容。
         - reason: 修改原因，便于审计与追踪。
         - document_id/version_id: 可选；不传则使用运行时默认上下文。
+        - find_text: 可选；给出时只将正文中该原文片段替换为 new_content（片段须在正文中恰好出现一次），
+          不给出时 new_content 替换整篇正文。
 
         使用规则:
         - 先确认用户意图再写入，避免无授权改动。
         - 当 patch_type 包含 body 时，必须保证可解析到 version_id。
+        - 只改局部段落时优先传 find_text，避免重写全文；片段不存在或不唯一时会返回 error，需重新读取后再试。
         - 返回 status=success 才表示数据库写入完成。
         """
         resolved_document_id = document_id or default_document_id
         if not resolved_document_id:
             return {"status": "error", "message": "缺少 document_id，无法执行文档修改"}
         resolved_version_id = version_id or default_version_id
-        if not resolved_version_id:
-            detail = await node_service.get_node_detail(resolved_document_id)
-            resolved_version_id = str(detail.now_version_id) if detail.now_version_id else None
-        if patch_type in {"title", "title_and_body"}:
-            await node_service.update_node(
-                resolved_document_id,
-                UpdateNodeDTO(name=new_content),
-            )
-        if patch_type in {"body", "title_and_body"}:
+        async with session_provider() as session:
+            node_service = NodeService(session)
             if not resolved_version_id:
-                return {"status": "error", "message": "缺少 version_id，无法执行正文修改"}
-            await node_service.update_document_version_content(
-                resolved_document_id,
-                resolved_version_id,
-                new_content,
-            )
+                detail = await node_service.get_node_detail(resolved_document_id)
+                resolved_version_id = str(detail.now_version_id) if detail.now_version_id else None
+            if patch_type in {"title", "title_and_body"}:
+                await node_service.update_node(
+                    resolved_document_id,
+                    UpdateNodeDTO(name=new_content),
+                )
+            if patch_type in {"body", "title_and_body"}:
+                if not resolved_version_id:
+                    return {"status": "error", "message": "缺少 version_id，无法执行正文修改"}
+                if find_text is None:
+                    await node_service.update_document_version_content(
+                        resolved_document_id,
+                        resolved_version_id,
+                        new_content,
+                    )
+                else:
+                    try:
+                        # 只按片段定位的修改不校验基准修订号, 无需预先读取
+                        await node_service.patch_document_version_content(
+                            resolved_document_id,
+                            resolved_version_id,
+                            DocumentPatchRequest(
+                                base_revision=0,
+                                operations=[DocumentPatchOperation(
+                                    op=ContentPatchOperationEnum.REPLACE, find=find_text, text=new_content,
+                                )],
+                            ),
+                        )
+                    except ResourceNotFoundError:
+                        return {"status": "error", "message": "版本不存在，无法执行正文修改"}
+                    except (InvalidContentPatchError, PreconditionFailedError) as e:
+                        return {"status": "error", "message": e.message}
         return {
             "status": "success",
             "operation": "patch_document_content",
@@ -163,24 +189,27 @@ def build_document_helper_tools(
             except Exception:
                 payload_data = {"name": payload}
         if action == "delete":
-            await node_service.delete_node(node_id)
-            return {"status": "success", "operation": "manage_outline", "action": action, "node_id": node_id, "reason": reason}
+            async with session_provider() as session:
+                deleted = await NodeService(session).delete_node(node_id)
+            return {"status": "success", "operation": "manage_outline", "action": action, "node_id": node_id, "deleted": deleted.model_dump(), "reason": reason}
         if action == "move":
             parent_id_value = payload_data.get("parent_node_id")
             parent_uuid = UUID(parent_id_value) if parent_id_value else None
-            await node_service.update_node(node_id, UpdateNodeDTO(parent_node_id=parent_uuid))
+            async with session_provider() as session:
+                await NodeService(session).update_node(node_id, UpdateNodeDTO(parent_node_id=parent_uuid))
             return {"status": "success", "operation": "manage_outline", "action": action, "node_id": node_id, "parent_node_id": parent_id_value, "reason": reason}
         if action == "update":
             parent_id_value = payload_data.get("parent_node_id")
             parent_uuid = UUID(parent_id_value) if parent_id_value else None
-            await node_service.update_node(
-                node_id,
-                UpdateNodeDTO(
-                    name=payload_data.get("name"),
-                    description=payload_data.get("description"),
-                    parent_node_id=parent_uuid,
-                ),
-            )
+            async with session_provider() as session:
+                await NodeService(session).update_node(
+                    node_id,
+                    UpdateNodeDTO(
+                        name=payload_data.get("name"),
+                        description=payload_data.get("description"),
+                        parent_node_id=parent_uuid,
+                    ),
+                )
             return {"status": "success", "operation": "manage_outline", "action": action, "node_id": node_id, "reason": reason}
         if action == "add":
             if not resolved_work_id:
@@ -189,15 +218,16 @@ def build_document_helper_tools(
             parent_uuid = UUID(parent_id_value) if parent_id_value else None
             node_type_raw = str(payload_data.get("type", "folder")).lower()
             node_type = NodeTypeEnum.DOCUMENT if node_type_raw == "document" else NodeTypeEnum.FOLDER
-            created = await node_service.create_node(
-                resolved_work_id,
-                CreateNodeDTO(
-                    name=payload_data.get("name") or "新目录项",
-                    description=payload_data.get("description"),
-                    type=node_type,
-                    parent_node_id=parent_uuid,
-                ),
-            )
+            async with session_provider() as session:
+                created = await NodeService(session).create_node(
+                    resolved_work_id,
+                    CreateNodeDTO(
+                        name=payload_data.get("name") or "新目录项",
+                        description=payload_data.get("description"),
+                        type=node_type,
+                        parent_node_id=parent_uuid,
+                    ),
+                )
             return {
                 "status": "success",
                 "operation": "manage_outline",
@@ -214,46 +244,233 @@ def build_document_helper_tools(
             "message": f"不支持的 action: {action}",
         }
 
+    @tool("batch_manage_outline")
+    async def batch_manage_outline(operations: str, reason: str, work_id: Optional[str] = None) -> dict:
+        """一次性批量调整目录（新增/移动/重命名/删除多个节点），全部校验通过后在一个事务内生效。
+
+        调用时机:
+        - 需要连续调整多个节点时（如批量新建章节、重排整卷、拆分合并卷）优先使用本工具，
+          而不是多次调用 manage_outline。
+
+        参数说明:
+        - operations: JSON 数组字符串，按顺序执行，每项字段:
+          - op: "create" | "move" | "rename" | "delete"
+          - node_id: 目标节点ID；create 时可自行生成 UUID 以便后续操作引用该新节点。
+          - name / description / type("folder"|"document", 默认 folder): create、rename 使用。
+          - parent_node_id: create、move 的父节点，不传表示根节点。
+          - sort_order: 可选，不传则追加到同级末尾。
+          示例: [{"op":"create","node_id":"<uuid>","name":"第三卷","type":"folder"},
+                 {"op":"move","node_id":"<chapter uuid>","parent_node_id":"<uuid>"}]
+        - reason: 操作原因，便于链路追踪。
+
+        返回字段:
+        - created_node_ids: 新建节点ID（按操作顺序）。
+        - created / moved / renamed / deleted: 各类变更数量。
+        任一操作无效时全部不生效并返回 status=error。
+        """
+        from pydantic import ValidationError
+
+        from api.routes.node.schema import OutlineBatchRequest
+
+        resolved_work_id = work_id or default_work_id
+        if not resolved_work_id:
+            return {"status": "error", "message": "无法确定作品ID，请明确提供或在支持的作品上下文中调用"}
+        try:
+            request = OutlineBatchRequest(operations=json.loads(operations))
+        except (ValueError, ValidationError) as e:
+            return {"status": "error", "operation": "batch_manage_outline", "message": f"operations 格式错误: {e}"}
+
+        try:
+            async with session_provider() as session:
+                result = await NodeService(session).apply_outline_batch(resolved_work_id, request)
+        except BaseError as e:
+            return {"status": "error", "operation": "batch_manage_outline", "message": e.message}
+        return {
+            "status": "success",
+            "operation": "batch_manage_outline",
+            "work_id": resolved_work_id,
+            "created_node_ids": [str(i) for i in result.created_node_ids],
+            "created": result.created,
+            "moved": result.moved,
+            "renamed": result.renamed,
+            "deleted": result.deleted,
+            "reason": reason,
+        }
+
     @tool("read_work_outline")
-    async def read_work_outline(work_id: Optional[str] = None) -> dict:
+    async def read_work_outline(
+        work_id: Optional[str] = None,
+        root_id: Optional[str] = None,
+        max_depth: Optional[int] = None,
+    ) -> dict:
         """读取整个作品的目录结构（卷、章、大盘信息）。
 
         调用时机:
         - 当你需要了解作品的整体组织架构、有哪些卷、哪些章节时调用。
         - 当你需要确认某个章节所属的卷，或者寻找特定名称的章节ID时调用。
 
+        参数说明:
+        - root_id: 可选，只读取该节点下的子树（含自身）。
+        - max_depth: 可选，限制读取深度（整部作品时根节点为 0；指定 root_id 时相对该节点）。
+
         返回字段:
         - work_name: 作品名称。
         - tree: 递归的树状结构，包含 id, name, type (folder/document), children。
         """
-        from services.work.service import WorkService
-        
+        from sqlalchemy import select
+
+        from infrastructure.pg.pg_models import WorkSQLEntity
+
         resolved_work_id = work_id or default_work_id
         if not resolved_work_id:
             return {"status": "error", "message": "无法确定作品ID，请明确提供或在支持的作品上下文中调用"}
-            
-        work_service = WorkService(session)
-        detail = await work_service.get_work_detail(resolved_work_id)
-        
-        # 构建内存中的索引映射
-        node_map = {str(n.id): {"id": str(n.id), "name": n.name, "type": n.type.value, "children": []} for n in detail.document}
-        
-        child_ids = set()
-        for edge in detail.relationship:
-            parent_id = edge.from_node_id
-            if parent_id in node_map:
-                for tid in edge.to_node_ids:
-                    if tid in node_map:
-                        node_map[parent_id]["children"].append(node_map[tid])
-                        child_ids.add(tid)
-        
-        # 根节点是那些不在任何 children 里的节点
-        root_nodes = [node for node_id, node in node_map.items() if node_id not in child_ids]
-        
+
+        async with session_provider() as session:
+            work_name = await session.scalar(
+                select(WorkSQLEntity.name).where(
+                    WorkSQLEntity.id == resolved_work_id, WorkSQLEntity.deleted_at.is_(None)
+                )
+            )
+            if work_name is None:
+                return {"status": "error", "message": f"作品不存在: {resolved_work_id}"}
+            service = NodeService(session)
+            if root_id:
+                items = await service.get_subtree(root_id, max_depth)
+            else:
+                items = await service.get_work_outline(resolved_work_id, max_depth)
+
+        # 结果按深度排列, 父节点总在子节点之前出现, 一次遍历即可还原树
+        node_map = {}
+        root_nodes = []
+        for item in items:
+            node = {"id": str(item.id), "name": item.name, "type": item.type.value, "children": []}
+            node_map[node["id"]] = node
+            parent = node_map.get(str(item.parent_node_id)) if item.parent_node_id else None
+            if parent is not None:
+                parent["children"].append(node)
+            else:
+                root_nodes.append(node)
+
         return {
             "work_id": resolved_work_id,
-            "work_name": detail.meta.name,
+            "work_name": work_name,
             "tree": root_nodes
         }
 
-    return [read_document_info, patch_document_content, manage_outline, read_work_outline]
+    @tool("list_outline_children")
+    async def list_outline_children(
+        parent_id: Optional[str] = None,
+        cursor: Optional[str] = None,
+        depth: int = 1,
+        work_id: Optional[str] = None,
+    ) -> dict:
+        """按需展开目录: 分页列出某个卷/文件夹下的子节点（按目录顺序）。
+
+        调用时机:
+        - 作品章节很多时，优先用本工具逐层展开，而不是一次读取整个目录。
+        - 先不传 parent_id 获取根节点（各卷），再对感兴趣的卷传入其 id 展开。
+
+        参数说明:
+        - parent_id: 父节点ID，不传表示作品根节点。
+        - cursor: 上一次返回的 next_cursor，用于翻页。
+        - depth: 展开深度，1 只列直接子节点。
+
+        返回字段:
+        - items: 节点列表，包含 id, name, type, parent_node_id, depth, has_children。
+        - next_cursor: 还有下一页时返回，否则为 null。
+        """
+        resolved_work_id = work_id or default_work_id
+        if not resolved_work_id:
+            return {"status": "error", "message": "无法确定作品ID，请明确提供或在支持的作品上下文中调用"}
+
+        async with session_provider() as session:
+            page = await NodeService(session).get_children(resolved_work_id, parent_id, cursor, None, depth)
+
+        return {
+            "work_id": resolved_work_id,
+            "parent_id": parent_id,
+            "items": [
+                {
+                    "id": str(item.id),
+                    "name": item.name,
+                    "type": item.type.value,
+                    "parent_node_id": str(item.parent_node_id) if item.parent_node_id else None,
+                    "depth": item.depth,
+                    "has_children": item.has_children,
+                }
+                for item in page.items
+            ],
+            "next_cursor": page.next_cursor,
+        }
+
+    @tool("search_work_content")
+    async def search_work_content(
+        query: str,
+        cursor: Optional[str] = None,
+        work_id: Optional[str] = None,
+    ) -> dict:
+        """在整部作品所有章节的正文（各文档当前版本）中全文检索。
+
+        调用时机:
+        - 需要查找某个人物、地名、物品、情节或原文片段出现在哪些章节时调用。
+        - 修改前需要确认某处原文所在章节时，先检索再读取或调用 patch_document_content。
+
+        参数说明:
+        - query: 检索词，多个词以空格分隔表示需同时出现；中文按连续字匹配，不区分英文大小写。
+        - cursor: 上一次返回的 next_cursor，用于翻页。
+        - work_id: 可选；不传则使用运行时默认 work_id。
+
+        返回字段:
+        - items: 按相关度排序的命中章节，包含 document_id, version_id, title, match_count,
+          snippets（命中处上下文，命中词以 【】 标出，start 为片段在正文中的字符偏移）。
+        - next_cursor: 还有下一页时返回，否则为 null。
+
+        使用规则:
+        - 检索的是已保存的内容，刚写入的修改可能在数秒后才可检索。
+        - 片段只是摘录，需要完整上下文时再读取对应章节。
+        """
+        resolved_work_id = work_id or default_work_id
+        if not resolved_work_id:
+            return {"status": "error", "message": "无法确定作品ID，请明确提供或在支持的作品上下文中调用"}
+
+        try:
+            async with session_provider() as session:
+                result = await NodeService(session).search_documents(resolved_work_id, query, cursor)
+        except BaseError as e:
+            return {"status": "error", "operation": "search_work_content", "message": e.message}
+
+        def mark(snippet) -> str:
+            parts = []
+            cursor_at = 0
+            for start, end in snippet.highlights:
+                parts.append(snippet.text[cursor_at:start])
+                parts.append(f"【{snippet.text[start:end]}】")
+                cursor_at = end
+            parts.append(snippet.text[cursor_at:])
+            return "".join(parts)
+
+        return {
+            "work_id": resolved_work_id,
+            "query": query,
+            "items": [
+                {
+                    "document_id": str(hit.node_id),
+                    "version_id": str(hit.version_id),
+                    "title": hit.title,
+                    "match_count": hit.match_count,
+                    "snippets": [{"start": snippet.start, "text": mark(snippet)} for snippet in hit.snippets],
+                }
+                for hit in result.items
+            ],
+            "next_cursor": result.next_cursor,
+        }
+
+    return [
+        read_document_info,
+        patch_document_content,
+        manage_outline,
+        batch_manage_outline,
+        read_work_outline,
+        list_outline_children,
+        search_work_content,
+    ]
@@ -12,20 +12,14 @@ from langchain_core.messages import HumanMessage
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
-from common.config import settings
-from infrastructure.pg.pg_client import async_session
+from infrastructure.pg.pg_checkpoint import get_checkpoint
+from infrastructure.pg.pg_client import agent_session, async_session
 from infrastructure.pg.pg_models import AgentsManagerSQLEntity
 from plugin.agent_manager.document_helper.agent.agent import build_agent
 from core.plugin.tool_builder import build_tools_from_plugins
 from core.plugin.runtime import PluginInternalRegistry
 from loguru import logger
 
-async def get_checkpoint() -> AsyncPostgresSaver:
-    conn_string = settings.SQLALCHEMY_DATABASE_URI
-    if "postgresql+asyncpg://" in conn_string:
-        conn_string = conn_string.replace("postgresql+asyncpg://", "postgresql://")
-    return AsyncPostgresSaver.from_conn_string(conn_string)
-
 class Assistant(Component):
     def __init__(self, title: str = "Document Assistant"):
         self.title = title
@@ -337,45 +331,46 @@ class DocumentHelperPlugin:
             return
         sid = session_id or f"document_helper-{uuid4()}"
         try:
-            async with async_session() as session:
+            # 对话期间不长期占用连接(等待 LLM 时连接空闲), 仅在读写数据库时从 agent 连接池短暂借用
+            async with agent_session() as session:
                 await self._ensure_session(session, sid)
-                # 从插件系统构建工具
-                plugin_tools = []
-                registry = PluginInternalRegistry.get_global()
-                if registry:
-                    plugin_tools = await build_tools_from_plugins(
-                        registry=registry,
-                        session=session,
-                        agent_name="文档助手",
-                    )
-                runtime = {
-                    "model_name": self.model_name,
-                    "api_key": self.api_key,
-                    "base_url": self.base_url,
-                    "session_id": sid,
-                    "document_content": document_content,
-                    "document_title": document_title,
-                    "user_prompt": self.user_prompt,
-                    "tools": plugin_tools,
-                    "session": session,
-                    "work_id": work_id,
-                    "document_id": document_id,
-                    "version_id": version_id,
-                }
-                async with self.checkpoint as checkpointer:
-                    agent = await build_agent(runtime, checkpointer)
-                    async for event in self._stream_agent_execution(
-                        agent,
-                        {
-                            "messages": [HumanMessage(content=message)],
-                            "context": "",
-                            "pending_tool_calls": [],
-                            "current_tool_call": None,
-                            "step_count": 0,
-                        },
-                        sid,
-                    ):
-                        yield event
+            # 从插件系统构建工具
+            plugin_tools = []
+            registry = PluginInternalRegistry.get_global()
+            if registry:
+                plugin_tools = await build_tools_from_plugins(
+                    registry=registry,
+                    session_provider=agent_session,
+                    agent_name="文档助手",
+                )
+            runtime = {
+                "model_name": self.model_name,
+                "api_key": self.api_key,
+                "base_url": self.base_url,
+                "session_id": sid,
+                "document_content": document_content,
+                "document_title": document_title,
+                "user_prompt": self.user_prompt,
+                "tools": plugin_tools,
+                "session_provider": agent_session,
+                "work_id": work_id,
+                "document_id": document_id,
+                "version_id": version_id,
+            }
+            checkpointer = self.checkpoint
+            agent = await build_agent(runtime, checkpointer)
+            async for event in self._stream_agent_execution(
+                agent,
+                {
+                    "messages": [HumanMessage(content=message)],
+                    "context": "",
+                    "pending_tool_calls": [],
+                    "current_tool_call": None,
+                    "step_count": 0,
+                },
+                sid,
+            ):
+                yield event
         except Exception as e:
             yield {"status": "error", "message": f"文档助手请求失败: {type(e).__name__}: {str(e)}"}
 
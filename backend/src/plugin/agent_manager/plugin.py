@@ -5,23 +5,17 @@ from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 
-from common.config import settings
 from core.plugin.di import Inject
 from core.ui.home import Home
 from core.plugin.annotations import plugin_meta, operation, runtime_config
 from common.enums import PluginFromTypeEnum, UITrigger
+from infrastructure.pg.pg_checkpoint import get_checkpoint
 from infrastructure.pg.pg_client import get_session
 from infrastructure.pg.pg_models import AgentsManagerSQLEntity, PluginSQLEntity
 from core.plugin.utils import build_plugin_id
 from core.plugin.runtime import PluginInternalRegistry
 from services.plugin.service import PluginService
 
-async def get_checkpoint() -> AsyncPostgresSaver:
-    conn_string = settings.SQLALCHEMY_DATABASE_URI
-    if "postgresql+asyncpg://" in conn_string:
-        conn_string = conn_string.replace("postgresql+asyncpg://", "postgresql://")
-    return AsyncPostgresSaver.from_conn_string(conn_string)
-
 @plugin_meta(
     name="Agent管理器",
     space="system", 
@@ -253,46 +247,46 @@ class AgentManagerPlugin:
             
             agent_list = []
             
-            async with self.checkpoint as checkpointer:
-                for agent in agents:
-                    history_items = []
-                    # 获取该Agent的所有会话
-                    if agent.sessions:
-                        for session_id in agent.sessions:
-                            # 获取会话历史 (Checkpoint)
-                            # 注意: 这里假设 checkpoint 存储时 thread_id = session_id
-                            # aget 返回的是 CheckpointTuple, 其中 checkpoint 是状态字典
-                            checkpoint_tuple = await checkpointer.aget({"configurable": {"thread_id": session_id}})
+            checkpointer = self.checkpoint
+            for agent in agents:
+                history_items = []
+                # 获取该Agent的所有会话
+                if agent.sessions:
+                    for session_id in agent.sessions:
+                        # 获取会话历史 (Checkpoint)
+                        # 注意: 这里假设 checkpoint 存储时 thread_id = session_id
+                        # aget 返回的是 CheckpointTuple, 其中 checkpoint 是状态字典
+                        checkpoint_tuple = await checkpointer.aget({"configurable": {"thread_id": session_id}})
                             
-                            messages = []
-                            checkpoint_payload = None
-                            if isinstance(checkpoint_tuple, dict):
-                                checkpoint_payload = checkpoint_tuple.get("checkpoint", checkpoint_tuple)
-                            elif checkpoint_tuple and hasattr(checkpoint_tuple, "checkpoint"):
-                                checkpoint_payload = checkpoint_tuple.checkpoint
+                        messages = []
+                        checkpoint_payload = None
+                        if isinstance(checkpoint_tuple, dict):
+                            checkpoint_payload = checkpoint_tuple.get("checkpoint", checkpoint_tuple)
+                        elif checkpoint_tuple and hasattr(checkpoint_tuple, "checkpoint"):
+                            checkpoint_payload = checkpoint_tuple.checkpoint
                             
-                            if isinstance(checkpoint_payload, dict):
-                                channel_values = checkpoint_payload.get("channel_values", {})
-                                raw_messages = channel_values.get("messages", []) if isinstance(channel_values, dict) else []
-                                messages = [
-                                    {
-                                        "type": (m.get("type", "unknown") if isinstance(m, dict) else getattr(m, "type", "unknown")),
-                                        "content": (m.get("content", "") if isinstance(m, dict) else getattr(m, "content", str(m)))
-                                    }
-                                    for m in raw_messages
-                                ]
-                            history_items.append({
-                                "agent_name": agent.name,
-                                "session_id": session_id,
-                                "messages": messages
-                            })
+                        if isinstance(checkpoint_payload, dict):
+                            channel_values = checkpoint_payload.get("channel_values", {})
+                            raw_messages = channel_values.get("messages", []) if isinstance(channel_values, dict) else []
+                            messages = [
+                                {
+                                    "type": (m.get("type", "unknown") if isinstance(m, dict) else getattr(m, "type", "unknown")),
+                                    "content": (m.get("content", "") if isinstance(m, dict) else getattr(m, "content", str(m)))
+                                }
+                                for m in raw_messages
+                            ]
+                        history_items.append({
+                            "agent_name": agent.name,
+                            "session_id": session_id,
+                            "messages": messages
+                        })
                     
-                    agent_list.append({
-                        "agent_name": agent.name,
-                        "on_email": email_config.get(agent.name, False), # 保持字段兼容，默认 False
-                        "history": history_items,
-                        "current_session_id": (agent.config or {}).get("current_session_id")
-                    })
+                agent_list.append({
+                    "agent_name": agent.name,
+                    "on_email": email_config.get(agent.name, False), # 保持字段兼容，默认 False
+                    "history": history_items,
+                    "current_session_id": (agent.config or {}).get("current_session_id")
+                })
 
             # 3. 封装为 List[AgentMessageHistoryItem]的字典并返回
             print(f"[AgentManager] 返回 {len(agent_list)} 个 Agent 信息")
@@ -4,7 +4,6 @@ from langchain_core.messages import HumanMessage
 from common.enums import UITrigger, PluginFromTypeEnum
 from core.ui.home import Home, ProjectSessionData, ProjectSessionItem
 from core.ui.layout import Mailbox
-from common.config import settings
 from common.model.base_agent import build_agent
 from core.plugin.annotations import plugin_meta, runtime_config, operation
 from core.plugin.di import Inject
@@ -28,7 +27,8 @@ class ProjectHelperChatConfigRequest(BaseModel):
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from infrastructure.pg.pg_client import get_session
+from infrastructure.pg.pg_checkpoint import get_checkpoint
+from infrastructure.pg.pg_client import get_agent_session
 
 
 # def get_project_helper_service(
@@ -41,12 +41,6 @@ from infrastructure.pg.pg_client import get_session
 
 
 
-async def get_checkpoint() -> AsyncPostgresSaver:
-    conn_string = settings.SQLALCHEMY_DATABASE_URI
-    if "postgresql+asyncpg://" in conn_string:
-        conn_string = conn_string.replace("postgresql+asyncpg://", "postgresql://")
-    return AsyncPostgresSaver.from_conn_string(conn_string)
-
 # @plugin_meta(
 #     name="project_helper",
 #     space="official", 
@@ -64,7 +58,7 @@ class ProjectHelperPlugin:
                 api_key: str = "", 
                 model_name: str = "gpt-3.5-turbo",
                 checkpoint: AsyncPostgresSaver = Inject(get_checkpoint),
-                session:AsyncSession = Inject(get_session) 
+                session:AsyncSession = Inject(get_agent_session) 
             ):
         """
         插件初始化方法
@@ -231,18 +225,18 @@ class ProjectHelperPlugin:
         project_sessions: List[ProjectSessionItem] = []
         
         # 2. Iterate through sessions and get checkpoints
-        async with self.checkpoint as checkpointer:
-            for session_id in sessions:
-                config = {"configurable": {"thread_id": session_id}}
-                checkpoint = await checkpointer.aget(config)
-                checkpoint_payload = None
-                if isinstance(checkpoint, dict):
-                    checkpoint_payload = checkpoint.get("checkpoint", checkpoint)
-                elif checkpoint and hasattr(checkpoint, "checkpoint"):
-                    checkpoint_payload = checkpoint.checkpoint
-                if isinstance(checkpoint_payload, dict):
-                    session_item = self._format_checkpoint_to_session_item(session_id, checkpoint_payload)
-                    project_sessions.append(session_item)
+        checkpointer = self.checkpoint
+        for session_id in sessions:
+            config = {"configurable": {"thread_id": session_id}}
+            checkpoint = await checkpointer.aget(config)
+            checkpoint_payload = None
+            if isinstance(checkpoint, dict):
+                checkpoint_payload = checkpoint.get("checkpoint", checkpoint)
+            elif checkpoint and hasattr(checkpoint, "checkpoint"):
+                checkpoint_payload = checkpoint.checkpoint
+            if isinstance(checkpoint_payload, dict):
+                session_item = self._format_checkpoint_to_session_item(session_id, checkpoint_payload)
+                project_sessions.append(session_item)
         
         # 3. Construct ProjectSessionData
         # Grouping by page_id if inferable, otherwise put all in a default "General" page.
@@ -357,67 +351,67 @@ class ProjectHelperPlugin:
             model_name=self.model_name,
         )
         try:
-            async with self.checkpoint as checkpointer:
-                agent = await build_agent(graph=graph, checkpoint=checkpointer)
-                assistant_text_parts: list[str] = []
-                seen_tool_dispatch: set[str] = set()
-                seen_tool_result: set[str] = set()
-                async for event in agent.astream_events(
-                    {
-                        "messages": [HumanMessage(content=message)],
-                        "context": "",
-                        "page_id": page_id,
-                    },
-                    config=config,
-                    context=runtime,
-                    version="v2",
-                ):
-                    event_name = str(event.get("event", ""))
-                    event_data = event.get("data") or {}
-                    if event_name == "on_chat_model_stream":
-                        chunk = event_data.get("chunk")
-                        chunk_content = getattr(chunk, "content", "")
-                        if isinstance(chunk_content, str) and chunk_content:
-                            assistant_text_parts.append(chunk_content)
-                            yield {"event_type": "assistant_chunk", "content": chunk_content}
-                        continue
-                    if event_name == "on_tool_start":
-                        tool_name = event.get("name")
-                        tool_input = event_data.get("input")
-                        dispatch_key = f"{tool_name}:{tool_input}"
-                        if tool_name and dispatch_key not in seen_tool_dispatch:
-                            seen_tool_dispatch.add(dispatch_key)
-                            yield {"event_type": "tool_dispatch", "tool_name": tool_name, "args": tool_input}
-                        continue
-                    if event_name == "on_tool_end":
-                        tool_name = event.get("name")
-                        tool_output = event_data.get("output")
-                        result_key = f"{tool_name}:{tool_output}"
-                        if result_key not in seen_tool_result:
-                            seen_tool_result.add(result_key)
-                            yield {"event_type": "tool_result", "tool_name": tool_name, "content": str(tool_output)}
-                        continue
+            checkpointer = self.checkpoint
+            agent = await build_agent(graph=graph, checkpoint=checkpointer)
+            assistant_text_parts: list[str] = []
+            seen_tool_dispatch: set[str] = set()
+            seen_tool_result: set[str] = set()
+            async for event in agent.astream_events(
+                {
+                    "messages": [HumanMessage(content=message)],
+                    "context": "",
+                    "page_id": page_id,
+                },
+                config=config,
+                context=runtime,
+                version="v2",
+            ):
+                event_name = str(event.get("event", ""))
+                event_data = event.get("data") or {}
+                if event_name == "on_chat_model_stream":
+                    chunk = event_data.get("chunk")
+                    chunk_content = getattr(chunk, "content", "")
+                    if isinstance(chunk_content, str) and chunk_content:
+                        assistant_text_parts.append(chunk_content)
+                        yield {"event_type": "assistant_chunk", "content": chunk_content}
+                    continue
+                if event_name == "on_tool_start":
+                    tool_name = event.get("name")
+                    tool_input = event_data.get("input")
+                    dispatch_key = f"{tool_name}:{tool_input}"
+                    if tool_name and dispatch_key not in seen_tool_dispatch:
+                        seen_tool_dispatch.add(dispatch_key)
+                        yield {"event_type": "tool_dispatch", "tool_name": tool_name, "args": tool_input}
+                    continue
+                if event_name == "on_tool_end":
+                    tool_name = event.get("name")
+                    tool_output = event_data.get("output")
+                    result_key = f"{tool_name}:{tool_output}"
+                    if result_key not in seen_tool_result:
+                        seen_tool_result.add(result_key)
+                        yield {"event_type": "tool_result", "tool_name": tool_name, "content": str(tool_output)}
+                    continue
 
-                if not assistant_text_parts:
-                    state_snapshot = await agent.aget_state(config)
-                    if state_snapshot and isinstance(state_snapshot.values, dict):
-                        messages = state_snapshot.values.get("messages", [])
-                        if isinstance(messages, list):
-                            for msg in messages:
-                                msg_type = getattr(msg, "type", "") or (
-                                    msg.get("type", "")
-                                    if isinstance(msg, dict)
-                                    else ""
-                                )
-                                if msg_type != "ai":
-                                    continue
-                                content = getattr(msg, "content", "") or (
-                                    msg.get("content", "")
-                                    if isinstance(msg, dict)
-                                    else ""
-                                )
-                                if isinstance(content, str) and content:
-                                    yield {"event_type": "assistant_chunk", "content": content}
+            if not assistant_text_parts:
+                state_snapshot = await agent.aget_state(config)
+                if state_snapshot and isinstance(state_snapshot.values, dict):
+                    messages = state_snapshot.values.get("messages", [])
+                    if isinstance(messages, list):
+                        for msg in messages:
+                            msg_type = getattr(msg, "type", "") or (
+                                msg.get("type", "")
+                                if isinstance(msg, dict)
+                                else ""
+                            )
+                            if msg_type != "ai":
+                                continue
+                            content = getattr(msg, "content", "") or (
+                                msg.get("content", "")
+                                if isinstance(msg, dict)
+                                else ""
+                            )
+                            if isinstance(content, str) and content:
+                                yield {"event_type": "assistant_chunk", "content": content}
         except Exception as e:
             yield {"status": "error", "message": f"项目助手请求失败: {type(e).__name__}: {str(e)}"}
             
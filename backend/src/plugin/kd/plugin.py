@@ -11,7 +11,7 @@ from sqlalchemy import delete, select, or_, and_
 from sqlalchemy import desc
 from core.ui.home import Home
 from core.plugin.di import Inject
-from infrastructure.pg.pg_client import get_session
+from infrastructure.pg.pg_client import fetch_projection, get_session, replica_read
 
 @plugin_meta(
     name="kd",
@@ -44,11 +44,14 @@ class KDPlugin:
         }
 
     @operation
+    @replica_read
     async def get_kd_list(self) -> List[KDMetaResponse]:
             """获取知识库列表."""
-            stmt = select(KnowledgeBaseSQLEntity).order_by(desc(KnowledgeBaseSQLEntity.create_at))
-            result = await self.session.execute(stmt)
-            entities = result.scalars().all()
+            kb_table = KnowledgeBaseSQLEntity.__table__
+            stmt = select(
+                kb_table.c.id, kb_table.c.enabled, kb_table.c.title, kb_table.c.description, kb_table.c.create_at
+            ).order_by(desc(kb_table.c.create_at))
+            entities = await fetch_projection(self.session, stmt)
             
             return [
                 KDMetaResponse(
@@ -85,6 +88,7 @@ class KDPlugin:
         )
 
     @operation
+    @replica_read
     async def get_kd_detail(self, kd_id: str) -> List[KDDescriptionResponse]:
         """获取知识库详情(知识点) - 返回 chunks 列表."""
         # Verify KB exists
@@ -219,6 +223,7 @@ class KDPlugin:
         await self.session.commit()
 
     @operation(name="search_kd")
+    @replica_read
     async def search_kd(self, work_id: str, query: str) -> List[KDDescriptionResponse]:
         """基于关键词搜索知识点 (Agent专属工具)"""
         # 先找到作品关联的所有知识库
@@ -12,7 +12,7 @@ from common.utils.utils import create_uuid, get_now_time, load_chat_model_with_e
 from infrastructure.pg.pg_models import MemorySQLEntity
 from core.plugin.annotations import plugin_meta, runtime_config, operation
 from core.plugin.di import Inject
-from infrastructure.pg.pg_client import get_session
+from infrastructure.pg.pg_client import fetch_projection, get_session, replica_read
 from core.ui.home import Home
 from langchain_core.messages import SystemMessage, HumanMessage
 
@@ -130,11 +130,15 @@ class MemoryPlugin:
         return summary
 
     @operation(name="get_memory_list")
+    @replica_read
     async def get_memory_list(self) -> List[MemoryMetaResponse]:
         """获取记忆列表."""
-        stmt = select(MemorySQLEntity)
-        result = await self.session.execute(stmt)
-        memories = result.scalars().all()
+        memory_table = MemorySQLEntity.__table__
+        stmt = select(
+            memory_table.c.id, memory_table.c.enabled, memory_table.c.title,
+            memory_table.c.description, memory_table.c.create_at,
+        )
+        memories = await fetch_projection(self.session, stmt)
         
         return [
             MemoryMetaResponse(
@@ -147,6 +151,7 @@ class MemoryPlugin:
         ]
 
     @operation(name="get_memory_detail")
+    @replica_read
     async def get_memory_detail(self, memory_id: str) -> MemoryDetailResponse:
         """获取记忆详情."""
         stmt = select(MemorySQLEntity).where(MemorySQLEntity.id == memory_id)
@@ -0,0 +1,253 @@
+"""Autosave Buffer Module.
+
+编辑器自动保存的进程内写后缓冲:
+按 (node_id, version_id) 暂存最新正文, 短时间内的连续保存只替换缓冲内容并递增对外修订号,
+停止输入 AUTOSAVE_DEBOUNCE_SECONDS 秒、持续输入超过 AUTOSAVE_MAX_DELAY_SECONDS 秒或缓冲总量超限时合并为一次提交;
+读取当前进程的文档详情/修订号时以缓冲为准 (读到自己的写入), 切换/新建/删除版本或其他写入路径修改正文前先同步提交,
+应用关闭时提交全部缓冲。
+
+缓冲只在本进程内可见: 其他进程在提交前读到的是库中内容。提交时若合并的保存中有 If-Match 校验,
+则以缓冲建立时的库中修订号做条件更新, 期间被其他进程修改时放弃这批保存并记录警告 (等同于该次保存返回 412);
+否则与直接保存一致, 后写入者生效。
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from api.routes.node.schema import DocumentDetailResponse
+from common.config import settings
+from common.errors import PreconditionFailedError, ResourceNotFoundError
+from common.utils.utils import count_words, get_now_time
+from infrastructure.pg.pg_client import bump_revision, job_session
+from infrastructure.pg.pg_models import DocumentVersionSQLEntity, NodeSQLEntity, WorkSQLEntity
+from services.node.search_index import DocumentSearchIndex
+from services.node.version_store import DocumentVersionStore
+from services.node.word_count_rollup import WordCountRollup
+
+logger = logging.getLogger(__name__)
+
+BufferKey = Tuple[str, str]
+
+
+@dataclass
+class PendingSave:
+    """一个版本尚未提交的保存."""
+    node_id: str
+    version_id: str
+    # 首次保存时的文档信息, 用于构造保存响应 (full_text/version_revision 取缓冲中的值)
+    detail: DocumentDetailResponse
+    # 库中的版本修订号 / 对外公布的修订号 (每次保存 +1)
+    base_revision: int
+    revision: int
+    text: str = ""
+    # 合并的保存中是否有 If-Match 校验, 决定提交时是否做条件更新
+    checked: bool = False
+    saves: int = 0
+    first_at: float = field(default_factory=time.monotonic)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def key(self) -> BufferKey:
+        return self.node_id, self.version_id
+
+    def response(self) -> DocumentDetailResponse:
+        return self.detail.model_copy(update={"full_text": self.text, "version_revision": self.revision})
+
+
+async def write_version_text(
+    session: AsyncSession,
+    node_id: str,
+    version_id: str,
+    text: str,
+    expected: int | None = None,
+    at_least: int | None = None,
+) -> int:
+    """提交缓冲正文 (与 NodeService.update_document_version_content 的写入一致), 返回库中新的修订号.
+
+    自动保存缓冲与协同编辑通道的快照共用; expected/at_least 见 bump_revision。作品已删除时放弃写入。
+    """
+    version = await session.get(DocumentVersionSQLEntity, version_id)
+    if version is None or str(version.node_id) != str(node_id):
+        raise ResourceNotFoundError(f"Version not found: {version_id}")
+    node = await session.get(NodeSQLEntity, version.node_id)
+    work = await session.get(WorkSQLEntity, node.work_id)
+    if work is None or work.deleted_at is not None:
+        raise ResourceNotFoundError(f"Work not found: {node.work_id}")
+    stored = await bump_revision(
+        session, DocumentVersionSQLEntity.__table__, version.id, expected=expected, at_least=at_least,
+    )
+    set_committed_value(version, "revision", stored)
+
+    version_store = DocumentVersionStore(session)
+    await version_store.set_text(version, text)
+    word_count = count_words(text)
+    delta = word_count - version.word_count
+    version.word_count = word_count
+
+    is_current = node.now_version_id == version.id if node.now_version_id is not None \
+        else node.now_version == version.version
+    if is_current:
+        await WordCountRollup(session).document_changed(node.work_id, node.id, delta)
+        await DocumentSearchIndex(session).update(node.work_id, node.id, version.id, text)
+        node.update_at = get_now_time()
+
+    await version_store.flush()
+    await session.commit()
+    return stored
+
+
+class AutosaveBuffer:
+    """按版本合并自动保存的写后缓冲 (单进程内共享)."""
+
+    def __init__(self):
+        self._entries: Dict[BufferKey, PendingSave] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.buffered_chars = 0
+
+    @staticmethod
+    def _key(node_id: UUID | str, version_id: UUID | str) -> BufferKey:
+        return str(node_id), str(version_id)
+
+    @property
+    def enabled(self) -> bool:
+        return settings.AUTOSAVE_DEBOUNCE_SECONDS > 0
+
+    def get(self, node_id: UUID | str, version_id: UUID | str) -> Optional[PendingSave]:
+        """该版本未提交的保存 (无则为 None)."""
+        return self._entries.get(self._key(node_id, version_id))
+
+    def track(self, detail: DocumentDetailResponse, version_id: UUID | str, revision: int) -> PendingSave:
+        """为版本建立缓冲 (已存在时返回现有缓冲); detail 为首次保存时加载的文档信息."""
+        key = self._key(detail.id, version_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = PendingSave(
+                node_id=key[0], version_id=key[1], detail=detail, base_revision=revision, revision=revision,
+            )
+            self._entries[key] = entry
+        return entry
+
+    async def save(self, entry: PendingSave, content: str, expected_revision: int | None = None) -> DocumentDetailResponse:
+        """写入缓冲并返回保存后的文档详情; expected_revision 为 If-Match 的版本修订号 (与缓冲中的修订号比较)."""
+        if expected_revision is not None and expected_revision != entry.revision:
+            raise PreconditionFailedError(f"document_version:{entry.version_id}")
+        # 以下在一次调度内完成, 与进行中的提交不会交错
+        self.buffered_chars += len(content) - len(entry.text)
+        entry.text = content
+        entry.revision += 1
+        entry.checked = entry.checked or expected_revision is not None
+        entry.saves += 1
+        response = entry.response()
+
+        if self.buffered_chars > settings.AUTOSAVE_MAX_BUFFER_CHARS \
+                or time.monotonic() - entry.first_at >= settings.AUTOSAVE_MAX_DELAY_SECONDS:
+            await self._flush(entry)
+        else:
+            self._schedule(entry)
+        return response
+
+    def _schedule(self, entry: PendingSave) -> None:
+        """(重新) 开始防抖计时."""
+        if entry.timer is not None:
+            entry.timer.cancel()
+        entry.timer = asyncio.get_running_loop().call_later(
+            settings.AUTOSAVE_DEBOUNCE_SECONDS, self._spawn_flush, entry
+        )
+
+    def _spawn_flush(self, entry: PendingSave) -> None:
+        entry.timer = None
+        task = asyncio.create_task(self._flush(entry, background=True), name="autosave-flush")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _drop(self, entry: PendingSave) -> None:
+        if entry.timer is not None:
+            entry.timer.cancel()
+            entry.timer = None
+        if self._entries.get(entry.key) is entry:
+            del self._entries[entry.key]
+            self.buffered_chars -= len(entry.text)
+
+    async def _flush(self, entry: PendingSave, background: bool = False) -> None:
+        """提交一个缓冲; 提交期间到达的新保存留在缓冲中, 重新计时."""
+        async with entry.lock:
+            if self._entries.get(entry.key) is not entry:
+                return
+            if entry.timer is not None:
+                entry.timer.cancel()
+                entry.timer = None
+            text, revision, saves = entry.text, entry.revision, entry.saves
+            try:
+                async with job_session() as session:
+                    stored = await write_version_text(
+                        session, entry.node_id, entry.version_id, text,
+                        expected=entry.base_revision if entry.checked else None, at_least=revision,
+                    )
+            except (PreconditionFailedError, ResourceNotFoundError) as e:
+                logger.warning(
+                    f"[Autosave] drop {saves} buffered save(s) for node={entry.node_id} "
+                    f"version={entry.version_id}: {e.message}"
+                )
+                self._drop(entry)
+                return
+            except Exception:
+                logger.exception(f"[Autosave] flush failed for node={entry.node_id} version={entry.version_id}")
+                # 保留缓冲, 下个防抖周期重试; 同步提交时将错误交给调用方
+                self._schedule(entry)
+                if not background:
+                    raise
+                return
+
+            entry.base_revision = stored
+            if entry.revision == revision:
+                self._drop(entry)
+            else:
+                entry.first_at = time.monotonic()
+                entry.saves -= saves
+                self._schedule(entry)
+
+    async def flush_node(self, node_id: UUID | str, version_id: UUID | str | None = None) -> None:
+        """同步提交节点 (或其指定版本) 的缓冲; 切换/新建/删除版本及其他写入正文的路径在加载数据前调用."""
+        node_key = str(node_id)
+        for entry in [e for e in self._entries.values() if e.node_id == node_key]:
+            if version_id is None or entry.version_id == str(version_id):
+                await self._flush(entry)
+
+    def _discard(self, entries: Iterable[PendingSave]) -> None:
+        for entry in list(entries):
+            if entry.saves:
+                logger.info(
+                    f"[Autosave] discard {entry.saves} buffered save(s) for deleted node={entry.node_id} "
+                    f"version={entry.version_id}"
+                )
+            self._drop(entry)
+
+    def discard_nodes(self, node_ids: Iterable[UUID | str]) -> None:
+        """丢弃已删除节点的缓冲 (删除节点/目录批量删除提交后调用), 进行中的提交会因版本不存在而放弃."""
+        node_keys = {str(node_id) for node_id in node_ids}
+        self._discard(e for e in list(self._entries.values()) if e.node_id in node_keys)
+
+    def discard_work(self, work_id: UUID | str) -> None:
+        """丢弃已删除作品的全部缓冲."""
+        work_key = str(work_id)
+        self._discard(e for e in list(self._entries.values()) if str(e.detail.work_id) == work_key)
+
+    async def flush_all(self) -> None:
+        """提交全部缓冲 (应用关闭时调用), 单个失败不影响其他."""
+        for entry in list(self._entries.values()):
+            try:
+                await self._flush(entry)
+            except Exception:
+                logger.exception(f"[Autosave] lost buffered content for node={entry.node_id} version={entry.version_id}")
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+autosave_buffer = AutosaveBuffer()
@@ -0,0 +1,299 @@
+"""Node Closure Store Module.
+
+维护 node_closure 闭包表, 与 node_relationship 的父子边同步写入:
+- 新建节点: 插入自身行 + 父节点全部祖先到新节点的行;
+- 移动节点: 断开子树与旧祖先的行, 再插入新祖先 x 子树的笛卡尔积, 代价为 O(子树 x 深度);
+- 删除节点: 整棵子树随节点删除, 闭包行由外键级联清理。
+"""
+from typing import Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import BIGINT, TEXT, Row, Select, and_, cast, delete, exists, func, insert, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.errors import NodeCycleError, ResourceNotFoundError
+from infrastructure.pg.pg_client import fetch_projection
+from infrastructure.pg.pg_models import NodeClosureSQLEntity, NodeRelationshipSQLEntity, NodeSQLEntity
+
+closure = NodeClosureSQLEntity.__table__
+node_table = NodeSQLEntity.__table__
+
+# 递归重建时的深度上限, 防止异常数据中的环导致递归不终止
+_MAX_TREE_DEPTH = 64
+
+
+class NodeClosureStore:
+    """目录树闭包表读写."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    # --- 写入 ---
+
+    async def add_node(self, work_id: UUID | str, node_id: UUID | str, parent_id: UUID | str | None = None) -> None:
+        """登记新节点 (需在节点行 flush 之后调用)."""
+        await self.session.execute(
+            insert(closure).values(ancestor_id=node_id, descendant_id=node_id, depth=0, work_id=work_id)
+        )
+        if parent_id is not None:
+            await self.session.execute(
+                insert(closure).from_select(
+                    ["ancestor_id", "descendant_id", "depth", "work_id"],
+                    select(
+                        closure.c.ancestor_id,
+                        literal(node_id, closure.c.descendant_id.type),
+                        closure.c.depth + 1,
+                        closure.c.work_id,
+                    ).where(closure.c.descendant_id == parent_id),
+                )
+            )
+
+    async def check_move(self, work_id: UUID | str, node_id: UUID | str, parent_id: UUID | str) -> None:
+        """校验新父节点存在于同一作品中, 且不在该节点的子树内 (一条 SQL)."""
+        creates_cycle = exists().where(
+            closure.c.ancestor_id == node_id,
+            closure.c.descendant_id == parent_id,
+        )
+        stmt = select(node_table.c.id, creates_cycle.label("creates_cycle"))\
+            .where(node_table.c.id == parent_id, node_table.c.work_id == work_id)
+        row = (await self.session.execute(stmt)).first()
+        if row is None:
+            raise ResourceNotFoundError(f"Parent node not found: {parent_id}")
+        if row.creates_cycle:
+            raise NodeCycleError(str(node_id), str(parent_id))
+
+    async def detach(self, node_id: UUID | str) -> None:
+        """断开以 node_id 为根的子树与其所有祖先之间的行."""
+        subtree = select(closure.c.descendant_id).where(closure.c.ancestor_id == node_id)
+        ancestors = select(closure.c.ancestor_id).where(
+            closure.c.descendant_id == node_id,
+            closure.c.ancestor_id != node_id,
+        )
+        await self.session.execute(
+            delete(closure).where(
+                closure.c.descendant_id.in_(subtree),
+                closure.c.ancestor_id.in_(ancestors),
+            )
+        )
+
+    async def attach(self, node_id: UUID | str, parent_id: UUID | str) -> None:
+        """将以 node_id 为根的子树挂到 parent_id 下."""
+        ancestor = closure.alias("ancestor_rows")
+        subtree = closure.alias("subtree_rows")
+        await self.session.execute(
+            insert(closure).from_select(
+                ["ancestor_id", "descendant_id", "depth", "work_id"],
+                select(
+                    ancestor.c.ancestor_id,
+                    subtree.c.descendant_id,
+                    ancestor.c.depth + subtree.c.depth + 1,
+                    subtree.c.work_id,
+                ).where(
+                    ancestor.c.descendant_id == parent_id,
+                    subtree.c.ancestor_id == node_id,
+                ),
+            )
+        )
+
+    async def move(self, node_id: UUID | str, parent_id: UUID | str | None) -> None:
+        """移动子树; parent_id 为 None 时移动为根节点 (调用方需先 check_move)."""
+        await self.detach(node_id)
+        if parent_id is not None:
+            await self.attach(node_id, parent_id)
+
+    # --- 查询 ---
+
+    def _outline_columns(self):
+        parent_edge = closure.alias("parent_edge")
+        columns = (
+            node_table.c.id,
+            node_table.c.name,
+            node_table.c.node_type,
+            node_table.c.sort_order,
+            node_table.c.word_count,
+            parent_edge.c.ancestor_id.label("parent_node_id"),
+        )
+        parent_join = and_(parent_edge.c.descendant_id == node_table.c.id, parent_edge.c.depth == 1)
+        return columns, parent_edge, parent_join
+
+    def subtree_ids(self, node_id: UUID | str) -> Select:
+        """子树(含自身)节点ID子查询, 供集合 DELETE/UPDATE 使用."""
+        return select(closure.c.descendant_id).where(closure.c.ancestor_id == node_id)
+
+    async def subtree(self, node_id: UUID | str, max_depth: Optional[int] = None) -> Sequence[Row]:
+        """子树 (含自身), depth 为相对 node_id 的层数."""
+        columns, parent_edge, parent_join = self._outline_columns()
+        stmt = select(*columns, closure.c.depth)\
+            .select_from(closure)\
+            .join(node_table, node_table.c.id == closure.c.descendant_id)\
+            .outerjoin(parent_edge, parent_join)\
+            .where(closure.c.ancestor_id == node_id)
+        if max_depth is not None:
+            stmt = stmt.where(closure.c.depth <= max_depth)
+        stmt = stmt.order_by(closure.c.depth, node_table.c.sort_order, node_table.c.id)
+        return await fetch_projection(self.session, stmt)
+
+    async def ancestors(self, node_id: UUID | str) -> Sequence[Row]:
+        """祖先链 (不含自身), 从根到父节点排列, depth 为距 node_id 的层数."""
+        columns, parent_edge, parent_join = self._outline_columns()
+        stmt = select(*columns, closure.c.depth)\
+            .select_from(closure)\
+            .join(node_table, node_table.c.id == closure.c.ancestor_id)\
+            .outerjoin(parent_edge, parent_join)\
+            .where(closure.c.descendant_id == node_id, closure.c.depth > 0)\
+            .order_by(closure.c.depth.desc())
+        return await fetch_projection(self.session, stmt)
+
+    async def outline(self, work_id: UUID | str, max_depth: Optional[int] = None) -> Sequence[Row]:
+        """整部作品的目录, depth 为绝对深度 (根为 0)."""
+        columns, parent_edge, parent_join = self._outline_columns()
+        node_depth = select(
+            closure.c.descendant_id,
+            func.max(closure.c.depth).label("depth"),
+        ).where(closure.c.work_id == work_id)\
+            .group_by(closure.c.descendant_id)\
+            .subquery("node_depth")
+        stmt = select(*columns, node_depth.c.depth)\
+            .select_from(node_depth)\
+            .join(node_table, node_table.c.id == node_depth.c.descendant_id)\
+            .outerjoin(parent_edge, parent_join)
+        if max_depth is not None:
+            stmt = stmt.where(node_depth.c.depth <= max_depth)
+        stmt = stmt.order_by(node_depth.c.depth, node_table.c.sort_order, node_table.c.id)
+        return await fetch_projection(self.session, stmt)
+
+    def preorder(self, work_id: UUID | str) -> Select:
+        """作品目录的先序遍历语句 (父节点在前, 兄弟按 sort_order), 不执行, 供调用方以服务端游标流式读取.
+
+        每个节点的排序键为其祖先链上各节点 (sort_order, id) 的数组, 由闭包行聚合得到。
+        """
+        ancestor = node_table.alias("ancestor")
+        # 偏移到非负再补零, 按 "C" 排序规则逐字节比较, 使文本顺序与数值顺序一致
+        step = func.concat(
+            func.lpad(cast(cast(ancestor.c.sort_order, BIGINT) + 2147483648, TEXT), 10, "0"),
+            cast(ancestor.c.id, TEXT),
+        ).collate("C")
+        paths = select(
+            closure.c.descendant_id,
+            func.array_agg(aggregate_order_by(step, closure.c.depth.desc())).label("path"),
+            (func.count() - 1).label("depth"),
+        ).select_from(closure)\
+            .join(ancestor, ancestor.c.id == closure.c.ancestor_id)\
+            .where(closure.c.work_id == work_id)\
+            .group_by(closure.c.descendant_id)\
+            .subquery("paths")
+        return select(
+            node_table.c.id,
+            node_table.c.name,
+            node_table.c.node_type,
+            node_table.c.now_version_id,
+            paths.c.depth,
+        ).join(paths, paths.c.descendant_id == node_table.c.id)\
+            .order_by(paths.c.path)
+
+    def _has_children(self):
+        child_edge = closure.alias("child_edge")
+        return exists().where(child_edge.c.ancestor_id == node_table.c.id, child_edge.c.depth == 1)
+
+    def _root_condition(self, work_id: UUID | str):
+        """作品根节点: 不存在指向自身的 depth=1 行."""
+        own_parent = closure.alias("own_parent")
+        return and_(
+            node_table.c.work_id == work_id,
+            ~exists().where(own_parent.c.descendant_id == node_table.c.id, own_parent.c.depth == 1),
+        )
+
+    async def next_sort_order(self, work_id: UUID | str, parent_id: UUID | str | None) -> int:
+        """新节点追加到兄弟末尾时的顺序值."""
+        stmt = select(func.coalesce(func.max(node_table.c.sort_order) + 1, 0))
+        if parent_id is None:
+            stmt = stmt.where(self._root_condition(work_id))
+        else:
+            stmt = stmt.select_from(closure)\
+                .join(node_table, node_table.c.id == closure.c.descendant_id)\
+                .where(closure.c.ancestor_id == parent_id, closure.c.depth == 1)
+        return int(await self.session.scalar(stmt))
+
+    async def children_page(
+        self,
+        work_id: UUID | str,
+        parent_id: UUID | str | None,
+        after: Optional[Tuple[int, UUID]],
+        limit: int,
+    ) -> Sequence[Row]:
+        """按 (sort_order, id) 键集分页读取直接子节点; parent_id 为 None 时读取根节点."""
+        stmt = select(
+            node_table.c.id,
+            node_table.c.name,
+            node_table.c.node_type,
+            node_table.c.sort_order,
+            node_table.c.word_count,
+            self._has_children().label("has_children"),
+        )
+        if parent_id is None:
+            stmt = stmt.where(self._root_condition(work_id))
+        else:
+            stmt = stmt.select_from(closure)\
+                .join(node_table, node_table.c.id == closure.c.descendant_id)\
+                .where(closure.c.ancestor_id == parent_id, closure.c.depth == 1)
+        if after is not None:
+            stmt = stmt.where(tuple_(node_table.c.sort_order, node_table.c.id) > tuple_(*after))
+        stmt = stmt.order_by(node_table.c.sort_order, node_table.c.id).limit(limit)
+        return await fetch_projection(self.session, stmt)
+
+    async def descendants(self, node_ids: Sequence[UUID], max_depth: int) -> Sequence[Row]:
+        """一次读取多个节点的子孙 (不含自身), depth 为相对这些节点的层数 (1..max_depth)."""
+        columns, parent_edge, parent_join = self._outline_columns()
+        stmt = select(*columns, closure.c.depth, self._has_children().label("has_children"))\
+            .select_from(closure)\
+            .join(node_table, node_table.c.id == closure.c.descendant_id)\
+            .outerjoin(parent_edge, parent_join)\
+            .where(
+                closure.c.ancestor_id.in_(node_ids),
+                closure.c.depth >= 1,
+                closure.c.depth <= max_depth,
+            )\
+            .order_by(closure.c.depth, node_table.c.sort_order, node_table.c.id)
+        return await fetch_projection(self.session, stmt)
+
+    async def work_tree(self, work_id: UUID | str) -> Sequence[Row]:
+        """作品目录骨架 (不含正文), 供批量操作在内存中校验."""
+        columns, parent_edge, parent_join = self._outline_columns()
+        stmt = select(*columns, node_table.c.description)\
+            .where(node_table.c.work_id == work_id)\
+            .outerjoin(parent_edge, parent_join)
+        return await fetch_projection(self.session, stmt)
+
+    async def rebuild_work(self, work_id: UUID | str) -> None:
+        """由 node_relationship 重建整部作品的闭包行 (批量改动目录结构后使用)."""
+        relationship = NodeRelationshipSQLEntity.__table__
+        await self.session.execute(delete(closure).where(closure.c.work_id == work_id))
+        paths = select(
+            node_table.c.id.label("ancestor_id"),
+            node_table.c.id.label("descendant_id"),
+            literal(0).label("depth"),
+        ).where(node_table.c.work_id == work_id).cte("paths", recursive=True)
+        paths = paths.union_all(
+            select(paths.c.ancestor_id, relationship.c.to_node_id, paths.c.depth + 1)
+            .join(relationship, relationship.c.from_node_id == paths.c.descendant_id)
+            .where(paths.c.depth < _MAX_TREE_DEPTH)
+        )
+        await self.session.execute(
+            insert(closure).from_select(
+                ["ancestor_id", "descendant_id", "depth", "work_id"],
+                select(
+                    paths.c.ancestor_id,
+                    paths.c.descendant_id,
+                    func.min(paths.c.depth),
+                    literal(work_id, closure.c.work_id.type),
+                ).group_by(paths.c.ancestor_id, paths.c.descendant_id),
+            )
+        )
+
+    async def depth(self, node_id: UUID | str) -> int:
+        """节点的绝对深度 (根为 0)."""
+        value = await self.session.scalar(
+            select(func.max(closure.c.depth)).where(closure.c.descendant_id == node_id)
+        )
+        return int(value or 0)
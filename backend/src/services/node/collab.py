@@ -0,0 +1,480 @@
+"""Collaborative Editing Module.
+
+文档版本的实时协同编辑通道 (WebSocket):
+每个 (node_id, version_id) 在本进程内有一个通道, 持有最新正文与最近 COLLAB_LOG_SIZE 批操作的日志;
+客户端提交基于某修订的区间修改, 服务端按日志将其变换 (OT, 见 content_patch.transform_edit) 到最新修订后应用,
+分配新的修订号并广播给其他连接, 查看者只接收增量消息, 无需轮询整篇正文。
+
+通道的修订号即版本修订号 (ETag 的第二段), 每应用一批修改 +1。正文按 COLLAB_SNAPSHOT_SECONDS 秒或
+COLLAB_SNAPSHOT_OPS 批写回 document_version (以 at_least 使库中修订号与通道一致), 最后一个连接断开、
+切换/新建版本及应用关闭时同步写回。通道打开期间, HTTP 保存/区间修改与 Agent 的正文修改都作为一批操作经通道应用,
+与编辑器的并发修改合并, 不再整篇覆盖。写回时发现版本被其他进程修改, 则以库中内容重新同步全部连接。
+
+消息协议 (JSON):
+- 客户端 -> 服务端: {"type": "ops", "base_revision": n, "operations": [DocumentPatchOperation], "client_seq": 任意}
+  (find 按最新正文定位, 只含 find 的一批修改不需要变换)
+- 服务端 -> 客户端:
+  - snapshot: 加入或需要重新同步时的完整正文 {"revision", "text", "word_count", "clients"}
+  - ack: 本连接的修改已应用 {"client_seq", "revision", "word_count"}
+  - ops: 其他来源的修改 {"revision", "operations": [{"start", "end", "text"}], "word_count"},
+    坐标相对 revision - 1 的正文, 互不重叠
+  - presence: 连接数变化 {"clients"}
+  - error: {"code", "message", "client_seq"}
+客户端对尚未确认的本地修改, 需按同样规则 (服务端已应用的修改在前) 与收到的 ops 相互变换。
+"""
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import WebSocket
+from pydantic import ValidationError
+
+from api.routes.node.schema import (
+    CollabOpsMessage,
+    DocumentDetailResponse,
+    DocumentPatchOperation,
+    DocumentPatchResponse,
+)
+from common.config import settings
+from common.errors import BaseError, InvalidContentPatchError, PreconditionFailedError, ResourceNotFoundError
+from infrastructure.pg.pg_client import job_session
+from infrastructure.pg.pg_models import DocumentVersionSQLEntity
+from services.node.autosave import write_version_text
+from services.node.content_patch import (
+    TextEdit,
+    apply_edits,
+    check_disjoint,
+    diff_edit,
+    resolve_operations,
+    transform_edit,
+)
+from services.node.version_store import DocumentVersionStore
+
+logger = logging.getLogger(__name__)
+
+ChannelKey = Tuple[str, str]
+
+
+@dataclass
+class ChannelState:
+    """通道打开时从库中加载的版本状态."""
+    detail: DocumentDetailResponse
+    text: str
+    revision: int
+    word_count: int
+
+
+ChannelLoader = Callable[[], Awaitable[ChannelState]]
+
+
+@dataclass
+class _LogEntry:
+    """一批已应用的修改: 坐标相对 revision - 1 的正文 (长度为 base_length)."""
+    revision: int
+    base_length: int
+    edits: List[TextEdit]
+
+
+class _Client:
+    """一个连接: 消息经队列由独立任务发送, 慢连接不阻塞广播."""
+
+    def __init__(self, websocket: WebSocket):
+        self.id = uuid.uuid4().hex
+        self.websocket = websocket
+        self.queue: asyncio.Queue[Optional[str]] = asyncio.Queue(maxsize=settings.COLLAB_CLIENT_QUEUE_SIZE)
+        self.sender = asyncio.create_task(self._send_loop(), name="collab-send")
+
+    def send(self, data: str) -> bool:
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _send_loop(self) -> None:
+        try:
+            while (data := await self.queue.get()) is not None:
+                await self.websocket.send_text(data)
+        except Exception:
+            # 连接已断开, 由接收循环负责退出
+            pass
+
+    async def finish(self, code: int) -> None:
+        """发送完队列中的消息后关闭 (最多等待 5 秒)."""
+        try:
+            await asyncio.wait_for(asyncio.shield(self.sender), timeout=5)
+        except Exception:
+            pass
+        await self.close(code)
+
+    async def close(self, code: int) -> None:
+        self.sender.cancel()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
+def _dump(message: Dict[str, Any]) -> str:
+    return json.dumps(message, ensure_ascii=False, default=str)
+
+
+class DocumentChannel:
+    """一个文档版本的协同编辑通道; 状态修改均在 lock 内进行."""
+
+    def __init__(self, hub: "CollabHub", node_id: str, version_id: str):
+        self.hub = hub
+        self.node_id = node_id
+        self.version_id = version_id
+        self.lock = asyncio.Lock()
+        self.loaded = False
+        self.closed = False
+        self.detail: Optional[DocumentDetailResponse] = None
+        self.text = ""
+        self.revision = 0
+        # 库中的版本修订号 (最近一次加载/写回)
+        self.stored_revision = 0
+        self.word_count = 0
+        self.log: Deque[_LogEntry] = deque(maxlen=settings.COLLAB_LOG_SIZE)
+        self.clients: Dict[str, _Client] = {}
+        self._unsaved_batches = 0
+        self._snapshot_timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def key(self) -> ChannelKey:
+        return self.node_id, self.version_id
+
+    def _load(self, state: ChannelState) -> None:
+        self.detail = state.detail
+        self.text = state.text
+        self.revision = self.stored_revision = state.revision
+        self.word_count = state.word_count
+        self.log.clear()
+        self._unsaved_batches = 0
+        self.loaded = True
+
+    def response(self) -> DocumentDetailResponse:
+        """以通道中的最新正文构造文档详情 (HTTP 保存经通道应用时返回)."""
+        return self.detail.model_copy(update={"full_text": self.text, "version_revision": self.revision})
+
+    # --- 广播 ---
+
+    def _snapshot_message(self) -> Dict[str, Any]:
+        return {
+            "type": "snapshot", "revision": self.revision, "text": self.text,
+            "word_count": self.word_count, "clients": len(self.clients),
+        }
+
+    def _broadcast(self, message: Dict[str, Any], exclude: Optional[str] = None) -> None:
+        data = _dump(message)
+        for client in list(self.clients.values()):
+            if client.id != exclude and not client.send(data):
+                # 发送队列已满 (消费过慢): 断开, 客户端重连后以快照恢复
+                logger.warning(f"[Collab] evict slow client {client.id} from node={self.node_id}")
+                del self.clients[client.id]
+                self.hub.spawn(client.close(code=1013))
+
+    # --- 应用修改 ---
+
+    def _apply(
+        self, base_revision: int, operations: Sequence[DocumentPatchOperation], source: Optional[str]
+    ) -> Optional[_LogEntry]:
+        """将基于 base_revision 的一批修改变换到最新修订并应用; 变换后无实际修改时返回 None."""
+        if all(op.find is not None for op in operations):
+            # 只按片段定位的修改与坐标无关, 直接作用于最新正文
+            base_revision = self.revision
+        behind = self.revision - base_revision
+        if behind < 0 or behind > len(self.log):
+            raise PreconditionFailedError(f"{DocumentVersionSQLEntity.__tablename__}:{self.version_id}")
+        concurrent = list(self.log)[len(self.log) - behind:] if behind else []
+        base_length = concurrent[0].base_length if concurrent else len(self.text)
+
+        edits = resolve_operations(operations, base_length, None if concurrent else self.text)
+        for entry in concurrent:
+            edits = [transform_edit(edit, entry.edits) for edit in edits]
+        edits = sorted(
+            (edit for edit in edits if edit.start < edit.end or edit.text),
+            key=lambda e: (e.start, e.end, e.index),
+        )
+        check_disjoint(edits)
+        if not edits:
+            return None
+        return self._commit(edits, source)
+
+    def _commit(self, edits: List[TextEdit], source: Optional[str]) -> _LogEntry:
+        """应用已变换到最新修订的修改, 记入日志并广播给其他连接."""
+        patched = apply_edits(self.text, edits)
+        entry = _LogEntry(revision=self.revision + 1, base_length=len(self.text), edits=edits)
+        self.text = patched.text
+        self.revision = entry.revision
+        self.word_count += patched.word_count_delta
+        self.log.append(entry)
+        self._broadcast({
+            "type": "ops",
+            "revision": entry.revision,
+            "operations": [{"start": e.start, "end": e.end, "text": e.text} for e in edits],
+            "word_count": self.word_count,
+        }, exclude=source)
+
+        self._unsaved_batches += 1
+        if self._unsaved_batches == settings.COLLAB_SNAPSHOT_OPS:
+            self.hub.spawn(self.persist())
+        elif self._snapshot_timer is None:
+            self._schedule_snapshot()
+        return entry
+
+    def _schedule_snapshot(self) -> None:
+        self._snapshot_timer = asyncio.get_running_loop().call_later(
+            settings.COLLAB_SNAPSHOT_SECONDS, lambda: self.hub.spawn(self.persist())
+        )
+
+    async def submit(
+        self, base_revision: int, operations: Sequence[DocumentPatchOperation]
+    ) -> Optional[DocumentPatchResponse]:
+        """服务端来源 (HTTP 区间修改/Agent) 的一批修改; 通道已关闭时返回 None, 由调用方直接写库."""
+        async with self.lock:
+            if self.closed or not self.loaded:
+                return None
+            word_count = self.word_count
+            self._apply(base_revision, operations, source=None)
+            return DocumentPatchResponse(
+                version_id=self.version_id,
+                version_revision=self.revision,
+                word_count=self.word_count,
+                word_count_delta=self.word_count - word_count,
+            )
+
+    async def replace_text(self, content: str, expected_revision: int | None = None) -> Optional[DocumentDetailResponse]:
+        """整篇保存: 与最新正文求最小差异后作为一批修改应用; 通道已关闭时返回 None."""
+        async with self.lock:
+            if self.closed or not self.loaded:
+                return None
+            if expected_revision is not None and expected_revision != self.revision:
+                raise PreconditionFailedError(f"{DocumentVersionSQLEntity.__tablename__}:{self.version_id}")
+            edit = diff_edit(self.text, content)
+            if edit is not None:
+                self._commit([edit], source=None)
+            return self.response()
+
+    async def receive(self, client: _Client, raw: str) -> None:
+        """处理客户端消息."""
+        client_seq = None
+        try:
+            if len(raw) > settings.COLLAB_MAX_MESSAGE_CHARS:
+                raise InvalidContentPatchError(0, f"消息超过 {settings.COLLAB_MAX_MESSAGE_CHARS} 字符")
+            message = CollabOpsMessage.model_validate_json(raw)
+            client_seq = message.client_seq
+            async with self.lock:
+                if self.closed:
+                    return
+                try:
+                    self._apply(message.base_revision, message.operations, source=client.id)
+                except PreconditionFailedError:
+                    # 基准修订过旧 (超出日志) 或超前: 以快照重新同步
+                    client.send(_dump({
+                        "type": "error", "code": 41200, "message": "基准修订已过期, 请以快照重新同步",
+                        "client_seq": client_seq,
+                    }))
+                    client.send(_dump(self._snapshot_message()))
+                    return
+                client.send(_dump({
+                    "type": "ack", "client_seq": client_seq, "revision": self.revision, "word_count": self.word_count,
+                }))
+        except ValidationError as e:
+            client.send(_dump({"type": "error", "code": 422, "message": str(e), "client_seq": client_seq}))
+        except BaseError as e:
+            client.send(_dump({"type": "error", "code": e.code, "message": e.message, "client_seq": client_seq}))
+
+    # --- 写回与生命周期 ---
+
+    async def _reload(self) -> None:
+        """以库中内容重新同步 (调用方持有 lock)."""
+        async with job_session() as session:
+            version = await session.get(DocumentVersionSQLEntity, self.version_id)
+            if version is None:
+                raise ResourceNotFoundError(f"Version not found: {self.version_id}")
+            text = await DocumentVersionStore(session).get_text(version)
+        self._load(ChannelState(
+            detail=self.detail, text=text, revision=version.revision, word_count=version.word_count,
+        ))
+        self._broadcast(self._snapshot_message())
+
+    async def _persist(self) -> None:
+        """将正文写回 document_version (调用方持有 lock)."""
+        if self._snapshot_timer is not None:
+            self._snapshot_timer.cancel()
+            self._snapshot_timer = None
+        if not self.loaded or self.revision == self.stored_revision:
+            return
+        try:
+            async with job_session() as session:
+                self.stored_revision = await write_version_text(
+                    session, self.node_id, self.version_id, self.text,
+                    expected=self.stored_revision, at_least=self.revision,
+                )
+            self._unsaved_batches = 0
+        except PreconditionFailedError:
+            logger.warning(
+                f"[Collab] version={self.version_id} changed outside the channel, "
+                f"drop {self.revision - self.stored_revision} unsaved batch(es) and resync"
+            )
+            try:
+                await self._reload()
+            except ResourceNotFoundError:
+                await self._close("文档版本已删除")
+        except ResourceNotFoundError:
+            await self._close("文档版本已删除")
+        except Exception:
+            logger.exception(f"[Collab] failed to persist node={self.node_id} version={self.version_id}")
+            # 保留未写回的修改, 下个周期重试
+            self._schedule_snapshot()
+
+    async def persist(self) -> None:
+        async with self.lock:
+            if self.closed:
+                return
+            await self._persist()
+            if not self.clients and not self.closed and self.revision == self.stored_revision:
+                # 最后一个连接离开时写回失败, 重试成功后关闭
+                await self._close()
+
+    async def _close(self, reason: Optional[str] = None, code: int = 1000) -> None:
+        """关闭通道并断开全部连接 (调用方持有 lock)."""
+        self.closed = True
+        if self._snapshot_timer is not None:
+            self._snapshot_timer.cancel()
+            self._snapshot_timer = None
+        self.hub.discard(self)
+        clients = list(self.clients.values())
+        self.clients.clear()
+        for client in clients:
+            if reason:
+                client.send(_dump({"type": "error", "code": 40400, "message": reason, "client_seq": None}))
+            client.send(None)
+            self.hub.spawn(client.finish(code))
+
+    async def close(self, reason: Optional[str] = None, code: int = 1000) -> None:
+        """写回后关闭 (应用关闭/版本删除时调用)."""
+        async with self.lock:
+            if self.closed:
+                return
+            await self._persist()
+            if not self.closed:
+                await self._close(reason, code)
+
+    async def leave(self, client: _Client) -> None:
+        """连接断开; 最后一个连接离开时写回并关闭通道."""
+        client.sender.cancel()
+        async with self.lock:
+            if self.closed:
+                return
+            self.clients.pop(client.id, None)
+            if self.clients:
+                self._broadcast({"type": "presence", "clients": len(self.clients)})
+                return
+            await self._persist()
+            if self.revision != self.stored_revision:
+                # 写回失败: 保留通道, 由定时写回重试
+                return
+            if not self.closed:
+                await self._close()
+
+
+class CollabHub:
+    """本进程内全部协同编辑通道."""
+
+    def __init__(self):
+        self._channels: Dict[ChannelKey, DocumentChannel] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    @staticmethod
+    def _key(node_id: Any, version_id: Any) -> ChannelKey:
+        return str(node_id), str(version_id)
+
+    def get(self, node_id: Any, version_id: Any) -> Optional[DocumentChannel]:
+        """已打开的通道 (无则为 None)."""
+        return self._channels.get(self._key(node_id, version_id))
+
+    def discard(self, channel: DocumentChannel) -> None:
+        if self._channels.get(channel.key) is channel:
+            del self._channels[channel.key]
+
+    def spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def join(
+        self, node_id: Any, version_id: Any, websocket: WebSocket, loader: ChannelLoader
+    ) -> Tuple[DocumentChannel, _Client]:
+        """加入通道 (不存在时以 loader 从库中加载), 向新连接发送快照并广播连接数."""
+        key = self._key(node_id, version_id)
+        while True:
+            channel = self._channels.get(key)
+            if channel is None:
+                channel = DocumentChannel(self, *key)
+                self._channels[key] = channel
+            async with channel.lock:
+                if channel.closed:
+                    # 恰好在最后一个连接离开时关闭, 重新打开
+                    continue
+                if not channel.loaded:
+                    try:
+                        channel._load(await loader())
+                    except BaseException:
+                        await channel._close()
+                        raise
+                client = _Client(websocket)
+                channel.clients[client.id] = client
+                client.send(_dump(channel._snapshot_message()))
+                channel._broadcast({"type": "presence", "clients": len(channel.clients)}, exclude=client.id)
+                return channel, client
+
+    async def flush_node(self, node_id: Any, version_id: Any = None) -> None:
+        """同步写回节点 (或其指定版本) 的通道 (切换/新建/删除版本前调用)."""
+        node_key = str(node_id)
+        for channel in [c for c in self._channels.values() if c.node_id == node_key]:
+            if version_id is None or channel.version_id == str(version_id):
+                await channel.persist()
+
+    @staticmethod
+    async def _discard_channels(channels: List[DocumentChannel], reason: str) -> None:
+        """关闭通道且不写回 (内容所属的版本/节点/作品已删除)."""
+        for channel in channels:
+            async with channel.lock:
+                if not channel.closed:
+                    await channel._close(reason)
+
+    async def close_version(self, node_id: Any, version_id: Any, reason: str) -> None:
+        channel = self.get(node_id, version_id)
+        if channel is not None:
+            await self._discard_channels([channel], reason)
+
+    async def close_nodes(self, node_ids: Iterable[Any], reason: str) -> None:
+        """关闭已删除节点的全部通道 (删除节点/目录批量删除提交后调用)."""
+        node_keys = {str(node_id) for node_id in node_ids}
+        await self._discard_channels([c for c in self._channels.values() if c.node_id in node_keys], reason)
+
+    async def close_work(self, work_id: Any, reason: str) -> None:
+        """关闭已删除作品的全部通道."""
+        work_key = str(work_id)
+        await self._discard_channels(
+            [c for c in self._channels.values() if c.detail is not None and str(c.detail.work_id) == work_key], reason
+        )
+
+    async def close_all(self) -> None:
+        """应用关闭: 写回全部通道并断开连接."""
+        for channel in list(self._channels.values()):
+            try:
+                await channel.close(code=1001)
+            except Exception:
+                logger.exception(f"[Collab] failed to persist node={channel.node_id} version={channel.version_id}")
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+collab_hub = CollabHub()
@@ -0,0 +1,191 @@
+"""Content Patch Module.
+
+文档正文的区间修改:
+一组 replace/insert/delete 操作均以基准修订的正文为坐标 (Unicode 码点偏移, 左闭右开),
+校验互不重叠后一次拼接出新正文; 字数只对受影响的窗口 (扩展到词边界) 重新统计, 与全文长度无关。
+基于旧修订的修改可经 transform_edit 变换到最新修订 (协同编辑通道使用)。
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from api.routes.node.schema import DocumentPatchOperation
+from common.config import settings
+from common.enums import ContentPatchOperationEnum
+from common.errors import InvalidContentPatchError
+from common.utils.word_count import count_words_uncached, is_word_char
+
+
+@dataclass
+class ContentPatchResult:
+    """修改后的正文及字数变化."""
+    text: str
+    word_count_delta: int
+
+
+@dataclass
+class TextEdit:
+    """解析后的一个操作: 基准正文中 [start, end) 替换为 text."""
+    index: int
+    start: int
+    end: int
+    text: str
+
+
+def _locate(index: int, text: str, find: str) -> Tuple[int, int]:
+    """find 片段须在基准正文中恰好出现一次."""
+    start = text.find(find)
+    if start < 0:
+        raise InvalidContentPatchError(index, "find 片段在正文中不存在")
+    if text.find(find, start + 1) >= 0:
+        raise InvalidContentPatchError(index, "find 片段在正文中出现多次, 请改用偏移量")
+    return start, start + len(find)
+
+
+def _resolve(index: int, text: str | None, length: int, operation: DocumentPatchOperation) -> TextEdit:
+    op = operation.op
+    if operation.find is not None:
+        if op == ContentPatchOperationEnum.INSERT:
+            raise InvalidContentPatchError(index, "insert 不支持 find, 请给出 start")
+        if not operation.find:
+            raise InvalidContentPatchError(index, "find 不能为空")
+        if operation.start is not None or operation.end is not None:
+            raise InvalidContentPatchError(index, "find 与 start/end 不能同时给出")
+        if text is None:
+            raise InvalidContentPatchError(index, "find 只能用于最新修订")
+        start, end = _locate(index, text, operation.find)
+    else:
+        if operation.start is None:
+            raise InvalidContentPatchError(index, "缺少 start")
+        start = operation.start
+        end = start if op == ContentPatchOperationEnum.INSERT else operation.end
+        if op == ContentPatchOperationEnum.INSERT and operation.end not in (None, start):
+            raise InvalidContentPatchError(index, "insert 不能给出 end")
+        if end is None:
+            raise InvalidContentPatchError(index, "缺少 end")
+        if not 0 <= start <= end <= length:
+            raise InvalidContentPatchError(index, f"区间 [{start}, {end}) 超出正文范围 (长度 {length})")
+
+    if op == ContentPatchOperationEnum.DELETE:
+        if operation.text:
+            raise InvalidContentPatchError(index, "delete 不能给出 text")
+        replacement = ""
+    else:
+        if operation.text is None:
+            raise InvalidContentPatchError(index, f"{op.value} 缺少 text")
+        replacement = operation.text
+    if op == ContentPatchOperationEnum.INSERT and not replacement:
+        raise InvalidContentPatchError(index, "insert 的 text 不能为空")
+    return TextEdit(index=index, start=start, end=end, text=replacement)
+
+
+def _word_window(text: str, start: int, end: int) -> Tuple[int, int]:
+    """将区间向两侧扩展到词边界, 窗口外的字数不受修改影响."""
+    while start > 0 and is_word_char(text[start - 1]):
+        start -= 1
+    while end < len(text) and is_word_char(text[end]):
+        end += 1
+    return start, end
+
+
+def _splice(text: str, start: int, end: int, edits: Sequence[TextEdit]) -> str:
+    """将 [start, end) 范围内的已排序修改应用到该片段."""
+    parts = []
+    cursor = start
+    for edit in edits:
+        parts.append(text[cursor:edit.start])
+        parts.append(edit.text)
+        cursor = edit.end
+    parts.append(text[cursor:end])
+    return "".join(parts)
+
+
+def resolve_operations(
+    operations: Sequence[DocumentPatchOperation], length: int, text: str | None = None
+) -> List[TextEdit]:
+    """校验一组操作并按位置排序; length 为基准正文长度, text 为基准正文 (仅 find 需要)."""
+    if len(operations) > settings.CONTENT_PATCH_MAX_OPERATIONS:
+        raise InvalidContentPatchError(
+            settings.CONTENT_PATCH_MAX_OPERATIONS, f"单次最多 {settings.CONTENT_PATCH_MAX_OPERATIONS} 个操作"
+        )
+    # 同一位置的插入排在以该位置开始的区间之前, 多个插入按提交顺序
+    edits = sorted(
+        (_resolve(i, text, length, operation) for i, operation in enumerate(operations)),
+        key=lambda e: (e.start, e.end, e.index),
+    )
+    check_disjoint(edits)
+    return edits
+
+
+def check_disjoint(edits: Sequence[TextEdit]) -> None:
+    """已排序的修改须互不重叠."""
+    for prev, edit in zip(edits, edits[1:]):
+        if edit.start < prev.end:
+            raise InvalidContentPatchError(edit.index, f"与第 {prev.index + 1} 个操作的区间重叠")
+
+
+def apply_edits(text: str, edits: Sequence[TextEdit]) -> ContentPatchResult:
+    """应用一组已排序且互不重叠的修改."""
+    # 词窗口相交或相接的修改合为一组 (插入的文字可能与相邻的词连成一个词), 每组统计一次
+    delta = 0
+    group: List[TextEdit] = []
+    window_start = window_end = 0
+    for edit in list(edits) + [None]:
+        if edit is not None:
+            start, end = _word_window(text, edit.start, edit.end)
+            if group and start <= window_end:
+                group.append(edit)
+                window_end = max(window_end, end)
+                continue
+        if group:
+            delta += count_words_uncached(_splice(text, window_start, window_end, group))\
+                - count_words_uncached(text[window_start:window_end])
+        if edit is not None:
+            group = [edit]
+            window_start, window_end = start, end
+
+    return ContentPatchResult(text=_splice(text, 0, len(text), edits), word_count_delta=delta)
+
+
+def apply_content_patch(text: str, operations: Sequence[DocumentPatchOperation]) -> ContentPatchResult:
+    """校验并应用一组区间修改."""
+    return apply_edits(text, resolve_operations(operations, len(text), text))
+
+
+def diff_edit(old: str, new: str) -> Optional[TextEdit]:
+    """整篇替换转为一个最小区间修改 (去掉公共前后缀); 内容相同时返回 None."""
+    if old == new:
+        return None
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return TextEdit(index=0, start=prefix, end=len(old) - suffix, text=new[prefix:len(new) - suffix])
+
+
+def transform_edit(edit: TextEdit, applied: Sequence[TextEdit]) -> TextEdit:
+    """将基于旧修订的修改变换到并发修改 applied (已排序, 坐标同为旧修订) 应用之后的坐标.
+
+    - 位于并发修改之前/之后的区间原样保留/整体平移;
+    - 与并发修改部分重叠时只保留未被其改写的部分, 不会删除对方写入的文字;
+    - 同一位置的插入, 先应用的在前;
+    - 区间完全包含并发修改时一并替换对方写入的文字。
+    坐标映射单调, 互不重叠的一组修改变换后仍互不重叠。
+    """
+    start, end = edit.start, edit.end
+    # 从后往前映射: 靠后的修改不影响其前方的坐标
+    for other in reversed(applied):
+        inserted_end = other.start + len(other.text)
+        shift = len(other.text) - (other.end - other.start)
+        if start >= other.end:
+            start += shift
+        elif start >= other.start:
+            start = inserted_end
+        if end >= other.end and end > other.start:
+            end += shift
+        elif end > other.start:
+            end = other.start
+        end = max(end, start)
+    return TextEdit(index=edit.index, start=start, end=end, text=edit.text)
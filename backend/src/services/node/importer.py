@@ -0,0 +1,234 @@
+"""Novel Import Module.
+
+整本小说 (txt/markdown) 的流式导入:
+逐行读取已落盘的上传文件, 由 DocumentTextSplitter 增量识别卷/章标题, 内存中只保留当前章与一个待写批次;
+每批以多行 INSERT 写入节点、初始版本 (内容寻址 blob)、父子边与检索索引, 并产出一条进度事件。
+全部写完后一次性重建闭包与字数汇总, 整个导入在一个事务内完成, 失败则全部不生效。
+"""
+import codecs
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.config import settings
+from common.enums import NodeTypeEnum, VersionStorageEnum
+from common.errors import ResourceNotFoundError
+from common.utils.utils import DocumentTextSplitter, count_words, get_now_time
+from infrastructure.pg.pg_client import bump_revision
+from infrastructure.pg.pg_models import (
+    DocumentVersionSQLEntity,
+    NodeRelationshipSQLEntity,
+    NodeSQLEntity,
+    WorkSQLEntity,
+)
+from services.node.closure_store import NodeClosureStore
+from services.node.search_index import DocumentSearchIndex
+from services.node.version_store import DocumentVersionStore
+from services.node.word_count_rollup import WordCountRollup
+
+node_table = NodeSQLEntity.__table__
+version_table = DocumentVersionSQLEntity.__table__
+relationship_table = NodeRelationshipSQLEntity.__table__
+
+# 标题行: 可带 markdown 标题前缀, 序号支持阿拉伯/中文数字, 整行不超过 60 字 (避免误判正文)
+_NUMERAL = r'[0-9零〇一二三四五六七八九十百千万两]+'
+VOLUME_PATTERN = rf'^(?=.{{1,60}}$)(?:#{{1,6}}\s*)?第{_NUMERAL}[卷部](?:[\s:：].*)?$'
+CHAPTER_PATTERN = rf'^(?=.{{1,60}}$)(?:#{{1,6}}\s*)?(?:第{_NUMERAL}[章回节]|序章|楔子|尾声)(?:[\s:：].*)?$'
+
+IMPORT_VERSION_NAME = "导入版本"
+PREAMBLE_TITLE = "前言"
+_SNIFF_BYTES = 64 * 1024
+
+
+@dataclass
+class ImportProgress:
+    """导入进度 (按批上报)."""
+    total_bytes: int
+    bytes_read: int = 0
+    volumes: int = 0
+    chapters: int = 0
+    words: int = 0
+
+    def event(self, name: str, **extra: Any) -> Dict[str, Any]:
+        return {"event": name, **asdict(self), **extra}
+
+
+@dataclass
+class _ImportBatch:
+    """待写入的一批节点: 卷 (文件夹) 与章 (文档及其正文)."""
+    folders: List[Dict[str, Any]] = field(default_factory=list)
+    documents: List[Dict[str, Any]] = field(default_factory=list)
+    edges: List[Dict[str, Any]] = field(default_factory=list)
+    contents: List[str] = field(default_factory=list)
+    word_counts: List[int] = field(default_factory=list)
+    chars: int = 0
+
+    def __len__(self) -> int:
+        return len(self.folders) + len(self.documents)
+
+
+def detect_encoding(path: str) -> str:
+    """根据文件头判断编码: UTF-8 (含 BOM) 否则按 GB18030 (兼容 GBK/GB2312) 读取."""
+    with open(path, "rb") as f:
+        head = f.read(_SNIFF_BYTES)
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # 增量解码, 末尾被截断的多字节字符不算错误
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "gb18030"
+
+
+def _clean_title(title: str) -> str:
+    return title.lstrip("#").strip()
+
+
+class NovelImporter:
+    """按章节流式导入小说."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.version_store = DocumentVersionStore(session)
+        self.closure_store = NodeClosureStore(session)
+        self.word_counts = WordCountRollup(session)
+        self.search_index = DocumentSearchIndex(session)
+        self.splitter = DocumentTextSplitter(CHAPTER_PATTERN, VOLUME_PATTERN)
+
+    async def check_target(self, work_id: str, parent_id: Optional[str]) -> None:
+        """校验作品存在, 且导入位置 (若给定) 为该作品下的文件夹."""
+        work = await self.session.scalar(
+            select(WorkSQLEntity.id).where(WorkSQLEntity.id == work_id, WorkSQLEntity.deleted_at.is_(None))
+        )
+        if work is None:
+            raise ResourceNotFoundError(f"Work not found: {work_id}")
+        if parent_id is None:
+            return
+        parent = await self.session.scalar(
+            select(node_table.c.id).where(
+                node_table.c.id == parent_id,
+                node_table.c.work_id == work_id,
+                node_table.c.node_type == NodeTypeEnum.FOLDER.value,
+            )
+        )
+        if parent is None:
+            raise ResourceNotFoundError(f"Folder not found: {parent_id}")
+
+    async def _flush(self, work_id: str, batch: _ImportBatch) -> None:
+        """写入一批: 节点 -> 边 -> blob 与版本 -> 节点当前版本 -> 检索索引 (每类一条语句)."""
+        await self.session.execute(insert(node_table), batch.folders + batch.documents)
+        if batch.edges:
+            await self.session.execute(insert(relationship_table), batch.edges)
+
+        if batch.documents:
+            blob_hashes = await self.version_store.acquire_blobs(batch.contents)
+            versions = [
+                {
+                    "id": uuid.uuid4(), "node_id": doc["id"], "version": IMPORT_VERSION_NAME, "full_text": "",
+                    "word_count": word_count, "storage_type": VersionStorageEnum.FULL.value,
+                    "blob_hash": blob_hash, "base_version_id": None, "delta": None, "chain_depth": 0,
+                    "create_at": doc["create_at"],
+                }
+                for doc, word_count, blob_hash in zip(batch.documents, batch.word_counts, blob_hashes)
+            ]
+            await self.session.execute(insert(version_table), versions)
+            await self.session.execute(
+                update(node_table)
+                .where(
+                    node_table.c.id == version_table.c.node_id,
+                    version_table.c.id.in_([v["id"] for v in versions]),
+                )
+                .values(now_version=IMPORT_VERSION_NAME, now_version_id=version_table.c.id)
+            )
+            await self.search_index.update_many(work_id, [
+                (doc["id"], version["id"], content)
+                for doc, version, content in zip(batch.documents, versions, batch.contents)
+            ])
+
+    async def run(
+        self,
+        work_id: str,
+        path: str,
+        parent_id: Optional[str] = None,
+        encoding: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """导入文件并逐批产出进度事件, 最后产出 done 事件并提交事务."""
+        started = time.perf_counter()
+        encoding = encoding or detect_encoding(path)
+        progress = ImportProgress(total_bytes=os.path.getsize(path))
+        now = get_now_time()
+        next_order: Dict[Optional[UUID | str], int] = {
+            parent_id: await self.closure_store.next_sort_order(work_id, parent_id)
+        }
+        volume_title: Optional[str] = None
+        volume_id: Optional[UUID] = None
+        batch = _ImportBatch()
+
+        def node_row(node_parent: Optional[UUID | str], name: str, node_type: NodeTypeEnum) -> Dict[str, Any]:
+            node_id = uuid.uuid4()
+            sort_order = next_order.get(node_parent, 0)
+            next_order[node_parent] = sort_order + 1
+            if node_parent is not None:
+                batch.edges.append({
+                    "id": uuid.uuid4(), "work_id": work_id, "from_node_id": node_parent, "to_node_id": node_id,
+                    "create_at": now, "update_at": now,
+                })
+            return {
+                "id": node_id, "work_id": work_id, "name": name, "description": None,
+                "node_type": node_type.value, "sort_order": sort_order, "now_version": None,
+                "now_version_id": None, "create_at": now, "update_at": now,
+            }
+
+        with open(path, encoding=encoding, errors="replace") as f:
+            for chunk in self.splitter.iter_documents(f, include_preamble=True):
+                metadata = chunk["metadata"]
+                chapter_parent = parent_id
+                if metadata["volume_title"] is not None:
+                    if metadata["volume_title"] != volume_title:
+                        volume_title = metadata["volume_title"]
+                        folder = node_row(parent_id, _clean_title(volume_title), NodeTypeEnum.FOLDER)
+                        batch.folders.append(folder)
+                        volume_id = folder["id"]
+                        progress.volumes += 1
+                    chapter_parent = volume_id
+
+                content = chunk["content"].strip("\n")
+                title = metadata["document_title"]
+                word_count = count_words(content)
+                batch.documents.append(node_row(
+                    chapter_parent, _clean_title(title) if title else PREAMBLE_TITLE, NodeTypeEnum.DOCUMENT
+                ))
+                batch.contents.append(content)
+                batch.word_counts.append(word_count)
+                batch.chars += len(content)
+                progress.chapters += 1
+                progress.words += word_count
+
+                if len(batch) >= settings.NOVEL_IMPORT_BATCH_CHAPTERS or batch.chars >= settings.NOVEL_IMPORT_BATCH_CHARS:
+                    await self._flush(work_id, batch)
+                    batch = _ImportBatch()
+                    progress.bytes_read = f.buffer.tell()
+                    yield progress.event("progress")
+
+        if len(batch):
+            await self._flush(work_id, batch)
+        progress.bytes_read = progress.total_bytes
+
+        # 结构与字数整体重建各一次, 与章节数量无关
+        if progress.chapters or progress.volumes:
+            await self.closure_store.rebuild_work(work_id)
+            await self.word_counts.recompute_work(work_id)
+        await bump_revision(self.session, WorkSQLEntity.__table__, work_id)
+        await self.session.commit()
+        yield progress.event(
+            "done",
+            encoding=encoding,
+            elapsed_ms=round((time.perf_counter() - started) * 1000),
+        )
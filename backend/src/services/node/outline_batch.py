@@ -0,0 +1,157 @@
+"""Outline Batch Module.
+
+目录批量操作的内存规划:
+一次读取作品的目录骨架 (id/类型/父节点/顺序), 在内存中按顺序校验并应用 create/move/rename/delete,
+得到最终状态与原状态的差异, 由 NodeService 以批量 INSERT/UPDATE/DELETE 在一个事务内写入。
+"""
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set
+from uuid import UUID
+
+from api.routes.node.schema import OutlineOperation
+from common.enums import NodeTypeEnum, OutlineOperationEnum
+from common.errors import InvalidOutlineOperationError, NodeCycleError
+
+
+@dataclass
+class OutlineEntry:
+    """目录骨架中的一个节点."""
+    id: UUID
+    node_type: str
+    parent_id: Optional[UUID]
+    sort_order: int
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+
+@dataclass
+class OutlinePlan:
+    """批量操作应用后的差异."""
+    created: List[OutlineEntry] = field(default_factory=list)
+    # 已有节点: 父节点变化 / 名称描述顺序变化
+    moved: Set[UUID] = field(default_factory=set)
+    changed: Set[UUID] = field(default_factory=set)
+    renamed: Set[UUID] = field(default_factory=set)
+    deleted: Set[UUID] = field(default_factory=set)
+
+
+class OutlineBatchPlanner:
+    """在内存中校验并应用目录批量操作."""
+
+    def __init__(self, entries: Sequence[OutlineEntry]):
+        self.nodes: Dict[UUID, OutlineEntry] = {e.id: e for e in entries}
+        self.original_parent: Dict[UUID, Optional[UUID]] = {e.id: e.parent_id for e in entries}
+        self.children: Dict[Optional[UUID], Set[UUID]] = {}
+        for entry in entries:
+            self.children.setdefault(entry.parent_id, set()).add(entry.id)
+        self.created: Dict[UUID, OutlineEntry] = {}
+        self.changed: Set[UUID] = set()
+        self.renamed: Set[UUID] = set()
+        self.deleted: Set[UUID] = set()
+
+    def _require(self, index: int, node_id: Optional[UUID]) -> OutlineEntry:
+        if node_id is None:
+            raise InvalidOutlineOperationError(index, "缺少 node_id")
+        entry = self.nodes.get(node_id)
+        if entry is None:
+            raise InvalidOutlineOperationError(index, f"节点不存在或已删除: {node_id}")
+        return entry
+
+    def _require_parent(self, index: int, parent_id: Optional[UUID]) -> None:
+        if parent_id is not None and parent_id not in self.nodes:
+            raise InvalidOutlineOperationError(index, f"父节点不存在或已删除: {parent_id}")
+
+    def _next_sort_order(self, parent_id: Optional[UUID]) -> int:
+        siblings = self.children.get(parent_id, set())
+        return max((self.nodes[s].sort_order for s in siblings), default=-1) + 1
+
+    def _set_parent(self, entry: OutlineEntry, parent_id: Optional[UUID], sort_order: Optional[int]) -> None:
+        self.children.get(entry.parent_id, set()).discard(entry.id)
+        entry.sort_order = sort_order if sort_order is not None else self._next_sort_order(parent_id)
+        entry.parent_id = parent_id
+        self.children.setdefault(parent_id, set()).add(entry.id)
+
+    def _subtree(self, node_id: UUID) -> List[UUID]:
+        stack, found = [node_id], []
+        while stack:
+            current = stack.pop()
+            found.append(current)
+            stack.extend(self.children.get(current, ()))
+        return found
+
+    def _create(self, index: int, op: OutlineOperation) -> None:
+        if not op.name:
+            raise InvalidOutlineOperationError(index, "create 操作缺少 name")
+        node_id = op.node_id or uuid.uuid4()
+        if node_id in self.nodes or node_id in self.deleted:
+            raise InvalidOutlineOperationError(index, f"节点ID已存在: {node_id}")
+        self._require_parent(index, op.parent_node_id)
+        entry = OutlineEntry(
+            id=node_id,
+            node_type=op.type.value,
+            parent_id=None,
+            sort_order=0,
+            name=op.name,
+            description=op.description,
+        )
+        self.nodes[node_id] = entry
+        self.created[node_id] = entry
+        self._set_parent(entry, op.parent_node_id, op.sort_order)
+
+    def _move(self, index: int, op: OutlineOperation) -> None:
+        entry = self._require(index, op.node_id)
+        self._require_parent(index, op.parent_node_id)
+        # 沿新父节点的祖先链向上, 遇到自身即成环
+        ancestor = op.parent_node_id
+        while ancestor is not None:
+            if ancestor == entry.id:
+                raise NodeCycleError(str(entry.id), str(op.parent_node_id))
+            ancestor = self.nodes[ancestor].parent_id
+        self._set_parent(entry, op.parent_node_id, op.sort_order)
+        self.changed.add(entry.id)
+
+    def _rename(self, index: int, op: OutlineOperation) -> None:
+        entry = self._require(index, op.node_id)
+        if op.name is None and op.description is None and op.sort_order is None:
+            raise InvalidOutlineOperationError(index, "rename 操作至少需要 name/description/sort_order 之一")
+        if op.name is not None:
+            entry.name = op.name
+        if op.description is not None:
+            entry.description = op.description
+        if op.sort_order is not None:
+            entry.sort_order = op.sort_order
+        self.renamed.add(entry.id)
+        self.changed.add(entry.id)
+
+    def _delete(self, index: int, op: OutlineOperation) -> None:
+        entry = self._require(index, op.node_id)
+        self.children.get(entry.parent_id, set()).discard(entry.id)
+        for node_id in self._subtree(entry.id):
+            self.nodes.pop(node_id)
+            self.children.pop(node_id, None)
+            if self.created.pop(node_id, None) is None:
+                self.deleted.add(node_id)
+
+    def apply(self, operations: Sequence[OutlineOperation]) -> OutlinePlan:
+        handlers = {
+            OutlineOperationEnum.CREATE: self._create,
+            OutlineOperationEnum.MOVE: self._move,
+            OutlineOperationEnum.RENAME: self._rename,
+            OutlineOperationEnum.DELETE: self._delete,
+        }
+        for index, op in enumerate(operations):
+            handlers[op.op](index, op)
+
+        survivors = [node_id for node_id in self.changed if node_id in self.nodes and node_id not in self.created]
+        return OutlinePlan(
+            created=list(self.created.values()),
+            moved={n for n in survivors if self.nodes[n].parent_id != self.original_parent[n]},
+            changed=set(survivors),
+            renamed={n for n in self.renamed if n in self.nodes and n not in self.created},
+            deleted=self.deleted,
+        )
+
+    @staticmethod
+    def is_document(entry: OutlineEntry) -> bool:
+        return entry.node_type == NodeTypeEnum.DOCUMENT.value
@@ -0,0 +1,226 @@
+"""Document Search Module.
+
+作品内正文全文检索:
+每个文档的当前版本在 document_search 中对应一行 tsvector, 内容保存/切换版本/导入时同步更新,
+节点或版本删除时随外键级联删除。分词在应用内完成 (Postgres 自带的解析器不切分中文):
+- 中日文字符连续段切为相邻二字组 (bigram), 并附加段末单字, 使单字查询可按前缀匹配;
+- 其余字母数字串按 NFKC + casefold 归一后整体作为一个词。
+查询按同样规则分词, 各词项取 AND; 以 (work_id, search_vector) 的 GIN 索引 (btree_gin) 只在本作品内匹配,
+按 ts_rank_cd 排序, 命中片段与高亮在应用内对本页结果的正文计算。
+
+检索读取的是已提交的内容: 自动保存缓冲与协同编辑通道中尚未写回的修改要在写回后才可检索。
+"""
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import Row, String, and_, bindparam, cast, delete, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import TSQUERY, TSVECTOR, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.routes.node.schema import DocumentSearchSnippet
+from common.config import settings
+from common.utils.utils import get_now_time
+from common.utils.word_count import CJK_RANGES
+from infrastructure.pg.pg_client import fetch_projection
+from infrastructure.pg.pg_models import DocumentSearchSQLEntity, NodeSQLEntity
+
+search_table = DocumentSearchSQLEntity.__table__
+node_table = NodeSQLEntity.__table__
+
+# 参与二字切分的区间: 字数统计的中日文区间去掉标点与全角/半角形式
+_PUNCTUATION_BLOCKS = {0x3000, 0xFE30, 0xFF01, 0xFF61}
+_IDEOGRAPH_CLASS = "".join(
+    f"\\U{start:08x}-\\U{end:08x}" for start, end in CJK_RANGES if start not in _PUNCTUATION_BLOCKS
+)
+_SEGMENT = re.compile(f"(?P<cjk>[{_IDEOGRAPH_CLASS}]+)|(?P<word>[^\\W{_IDEOGRAPH_CLASS}]+)")
+
+# tsvector 的限制: 位置最大 16383 (更大的记为 16383), 每个词最多 256 个位置, 词项总长不超过 1MB
+_MAX_POSITION = 16383
+_MAX_POSITIONS_PER_LEXEME = 256
+_MAX_LEXEME_BYTES = 1_000_000
+# 过长的串 (链接、编码数据等) 不建索引
+_MAX_WORD_CHARS = 64
+
+
+def _normalize_word(word: str) -> str:
+    return unicodedata.normalize("NFKC", word).casefold()
+
+
+def _quote(lexeme: str) -> str:
+    return "'" + lexeme.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def search_tokens(text: str) -> List[str]:
+    """正文分词 (按出现顺序)."""
+    tokens: List[str] = []
+    for match in _SEGMENT.finditer(text):
+        segment = match.group()
+        if match.lastgroup == "cjk":
+            tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+            tokens.append(segment[-1])
+        elif len(segment) <= _MAX_WORD_CHARS:
+            tokens.append(_normalize_word(segment))
+    return tokens
+
+
+def build_search_vector(text: str) -> Optional[str]:
+    """正文转为 tsvector 的文本形式 (带位置, 供 ts_rank_cd 计算邻近度); 无可检索内容时为 None."""
+    positions: Dict[str, List[int]] = {}
+    lexeme_bytes = 0
+    for position, token in enumerate(search_tokens(text), 1):
+        position = min(position, _MAX_POSITION)
+        entries = positions.get(token)
+        if entries is None:
+            lexeme_bytes += len(token.encode("utf-8"))
+            if lexeme_bytes > _MAX_LEXEME_BYTES:
+                break
+            positions[token] = [position]
+        elif len(entries) < _MAX_POSITIONS_PER_LEXEME and entries[-1] != position:
+            entries.append(position)
+    if not positions:
+        return None
+    return " ".join(f"{_quote(lexeme)}:{','.join(map(str, entries))}" for lexeme, entries in positions.items())
+
+
+@dataclass
+class SearchQuery:
+    """解析后的查询: tsquery 文本与用于高亮的匹配模式."""
+    tsquery: str
+    pattern: re.Pattern
+
+
+def parse_search_query(query: str) -> Optional[SearchQuery]:
+    """按正文的分词规则解析查询, 各词项取 AND; 不含可检索字符时为 None."""
+    terms: List[str] = []
+    needles = set()
+    for match in _SEGMENT.finditer(query):
+        segment = match.group()
+        if match.lastgroup == "cjk":
+            needles.add(segment)
+            if len(segment) == 1:
+                terms.append(_quote(segment) + ":*")
+            else:
+                terms.extend(_quote(segment[i:i + 2]) for i in range(len(segment) - 1))
+        elif len(segment) <= _MAX_WORD_CHARS:
+            needles.add(segment)
+            terms.append(_quote(_normalize_word(segment)))
+    if not terms:
+        return None
+    pattern = re.compile(
+        "|".join(re.escape(needle) for needle in sorted(needles, key=len, reverse=True)), re.IGNORECASE
+    )
+    return SearchQuery(tsquery=" & ".join(dict.fromkeys(terms)), pattern=pattern)
+
+
+def build_snippets(text: str, pattern: re.Pattern) -> Tuple[int, List[DocumentSearchSnippet]]:
+    """统计正文中查询词的出现次数, 并截取前几处命中的上下文片段.
+
+    命中为各词项的二字组而非整词相邻时 (查询词在正文中被隔开), 出现次数可能为 0, 此时返回开头的片段。
+    """
+    context = settings.SEARCH_SNIPPET_CONTEXT_CHARS
+    windows: List[List[Any]] = []
+    count = 0
+    for match in pattern.finditer(text):
+        count += 1
+        start, end = match.span()
+        if windows and start < windows[-1][1]:
+            window = windows[-1]
+            window[1] = max(window[1], end)
+            window[2].append((start, end))
+        elif len(windows) < settings.SEARCH_SNIPPETS_PER_HIT:
+            # 上下文不与前一片段重叠
+            floor = windows[-1][1] if windows else 0
+            windows.append([max(floor, start - context), min(len(text), end + context), [(start, end)]])
+    if not windows:
+        return 0, [DocumentSearchSnippet(start=0, end=min(len(text), 2 * context), text=text[:2 * context])]
+    return count, [
+        DocumentSearchSnippet(
+            start=start,
+            end=end,
+            text=text[start:end],
+            highlights=[(s - start, e - start) for s, e in spans],
+        )
+        for start, end, spans in windows
+    ]
+
+
+class DocumentSearchIndex:
+    """文档当前版本的检索索引 (document_search)."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    @staticmethod
+    def _upsert():
+        stmt = pg_insert(search_table).values(
+            node_id=bindparam("b_node_id"),
+            work_id=bindparam("b_work_id"),
+            version_id=bindparam("b_version_id"),
+            search_vector=cast(bindparam("b_vector", type_=String), TSVECTOR),
+            update_at=bindparam("b_update_at"),
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=[search_table.c.node_id],
+            set_={
+                "work_id": stmt.excluded.work_id,
+                "version_id": stmt.excluded.version_id,
+                "search_vector": stmt.excluded.search_vector,
+                "update_at": stmt.excluded.update_at,
+            },
+        )
+
+    async def update(self, work_id: UUID | str, node_id: UUID | str, version_id: UUID | str, text: str) -> None:
+        """文档当前版本内容变化 (保存/切换版本); 无可检索内容时删除该行."""
+        vector = build_search_vector(text)
+        if vector is None:
+            await self.remove(node_id)
+            return
+        await self.session.execute(self._upsert(), {
+            "b_node_id": node_id, "b_work_id": work_id, "b_version_id": version_id,
+            "b_vector": vector, "b_update_at": get_now_time(),
+        })
+
+    async def update_many(self, work_id: UUID | str, documents: Sequence[Tuple[Any, Any, str]]) -> None:
+        """批量写入 (node_id, version_id, 正文), 一条语句 (导入/回填使用)."""
+        now = get_now_time()
+        params = []
+        for node_id, version_id, text in documents:
+            vector = build_search_vector(text)
+            if vector is not None:
+                params.append({
+                    "b_node_id": node_id, "b_work_id": work_id, "b_version_id": version_id,
+                    "b_vector": vector, "b_update_at": now,
+                })
+        if params:
+            await self.session.execute(self._upsert(), params)
+
+    async def retarget(self, node_id: UUID | str, version_id: UUID | str) -> None:
+        """当前版本切换为内容相同的新版本 (新建版本), 只改指向不重新分词."""
+        await self.session.execute(
+            update(search_table).where(search_table.c.node_id == node_id).values(version_id=version_id)
+        )
+
+    async def remove(self, node_id: UUID | str) -> None:
+        await self.session.execute(delete(search_table).where(search_table.c.node_id == node_id))
+
+    async def search(
+        self, work_id: UUID | str, query: SearchQuery, after: Optional[Tuple[float, UUID]], limit: int
+    ) -> Sequence[Row]:
+        """按相关度倒序 (同分按节点ID) 返回一页命中: node_id, version_id, name, rank; after 为上一页末行的键."""
+        tsquery = cast(literal(query.tsquery, String), TSQUERY)
+        # 标准化选项 1: 除以 1 + log(文档长度), 避免长章节仅因篇幅占优
+        rank = func.ts_rank_cd(search_table.c.search_vector, tsquery, 1)
+        stmt = select(
+            search_table.c.node_id,
+            search_table.c.version_id,
+            node_table.c.name,
+            rank.label("rank"),
+        ).join(node_table, node_table.c.id == search_table.c.node_id)\
+            .where(search_table.c.work_id == work_id, search_table.c.search_vector.op("@@")(tsquery))
+        if after is not None:
+            stmt = stmt.where(or_(rank < after[0], and_(rank == after[0], search_table.c.node_id > after[1])))
+        stmt = stmt.order_by(rank.desc(), search_table.c.node_id).limit(limit)
+        return await fetch_projection(self.session, stmt)
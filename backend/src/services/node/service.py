@@ -2,8 +2,10 @@
 import logging
 import uuid
 
-from sqlalchemy import func, select
+from sqlalchemy import Row, and_, bindparam, delete, func, insert, select, true, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
 
 from api.routes.node.schema import (
     CreateNodeDTO,
@@ -12,16 +14,37 @@ from api.routes.node.schema import (
     DocumentVersionCreateRequest,
     DocumentVersionResponse,
     DocumentVersionItem,
-    DocumentDetailResponse
+    DocumentDetailResponse,
+    DocumentPatchRequest,
+    DocumentPatchResponse,
+    DocumentSearchHit,
+    DocumentSearchResponse,
+    NodeChildrenResponse,
+    NodeDeleteResponse,
+    OutlineBatchRequest,
+    OutlineBatchResponse,
+    NodeOutlineItem,
 )
-from common.enums import NodeTypeEnum
-from common.errors import ResourceNotFoundError
-from common.utils.utils import get_now_time
+from common.config import settings
+from common.enums import NodeTypeEnum, VersionStorageEnum
+from common.errors import InvalidCursorError, PreconditionFailedError, ResourceNotFoundError
+from common.utils.utils import count_words, decode_cursor, encode_cursor, get_now_time
+from infrastructure.pg.pg_client import bump_revision, fetch_projection, replica_read
 from infrastructure.pg.pg_models import (
+    DocumentBlobSQLEntity,
     DocumentVersionSQLEntity,
     NodeRelationshipSQLEntity,
     NodeSQLEntity,
+    WorkSQLEntity,
 )
+from services.node.autosave import autosave_buffer
+from services.node.closure_store import NodeClosureStore
+from services.node.collab import ChannelState, collab_hub
+from services.node.content_patch import apply_content_patch
+from services.node.outline_batch import OutlineBatchPlanner, OutlineEntry
+from services.node.search_index import DocumentSearchIndex, build_snippets, parse_search_query
+from services.node.version_store import DocumentVersionStore
+from services.node.word_count_rollup import WordCountRollup
 
 logger = logging.getLogger(__name__)
 
@@ -31,17 +54,23 @@ class NodeService:
     def __init__(self, session: AsyncSession):
         """Initialize NodeService."""
         self.session = session
+        self.version_store = DocumentVersionStore(session)
+        self.closure_store = NodeClosureStore(session)
+        self.word_counts = WordCountRollup(session)
+        self.search_index = DocumentSearchIndex(session)
 
     async def create_node(self, work_id: str, request: CreateNodeDTO) -> NodeDetailResponse:
         """创建节点（文档/文件夹）."""
         logger.info(f"[CreateNode] Starting for work_id={work_id}, type={request.type}, name={request.name}")
+        await self._require_work(work_id)
 
         # 1. 创建节点
         new_node = NodeSQLEntity(
             work_id=work_id,
             name=request.name,
             node_type=request.type.value,
-            description=request.description
+            description=request.description,
+            sort_order=await self.closure_store.next_sort_order(work_id, request.parent_node_id),
         )
         self.session.add(new_node)
         await self.session.flush() # Get ID
@@ -50,18 +79,20 @@ class NodeService:
         # 2. 如果是文档，创建初始版本
         content = ""
         word_count = 0
+        version = None
         if request.type == NodeTypeEnum.DOCUMENT:
             logger.info(f"[CreateNode] Creating initial version for document node {new_node.id}")
             version = DocumentVersionSQLEntity(
                 node_id=new_node.id,
                 version="初始化版本",
-                full_text=content,
                 word_count=word_count,
                 create_at=get_now_time()
             )
+            await self.version_store.new_version(version, content, None)
             self.session.add(version)
             await self.session.flush() # Get version ID
             new_node.now_version = version.version
+            new_node.now_version_id = version.id
             logger.info(f"[CreateNode] Initial version {version.version} added to session for node {new_node.id}")
         else:
             logger.info(f"[CreateNode] Node type is {request.type}, skipping version creation")
@@ -77,7 +108,9 @@ class NodeService:
                 to_node_id=new_node.id
             )
             self.session.add(rel)
-        
+        await self.closure_store.add_node(work_id, new_node.id, request.parent_node_id)
+        await bump_revision(self.session, WorkSQLEntity.__table__, work_id)
+
         await self.session.commit()
         await self.session.refresh(new_node)
 
@@ -89,79 +122,199 @@ class NodeService:
             word_count=word_count,
             description=new_node.description,
             parent_node_id=request.parent_node_id, # Return the parent_id from request as it's just created
-            now_version=None # Initial version created but not set as now_version? Wait. 
-            # create_node creates initial version (v1) but does not set node.now_version explicitly?
-            # It should set it if we want strictness.
-            # But line 50: version = DocumentVersionSQLEntity(...)
-            # It doesn't set node.now_version.
-            # I should fix create_node to set node.now_version = version.id
+            now_version=version.version if version else None,
+            now_version_id=version.id if version else None
         )
 
-    async def get_node_detail(self, node_id: str) -> NodeDetailResponse:
-        """获取节点详情."""
-        stmt = select(NodeSQLEntity).where(NodeSQLEntity.id == node_id)
+    async def _load_node_bundle(
+        self, node_id: str, version_id: str | None = None
+    ) -> tuple[NodeSQLEntity, DocumentVersionSQLEntity | None, uuid.UUID | None]:
+        """一次查询加载节点、版本与父节点ID.
+
+        - 指定 version_id 时加载该版本(需属于该节点);
+        - 否则按 now_version_id 主键关联当前版本;
+        - 兼容尚未回填 now_version_id 的旧数据: 按 now_version 名称匹配, 不存在时回退到版本号最大的版本;
+        - 父节点ID 通过关联子查询获取;
+        - 所属作品已删除 (墓碑) 时与节点不存在相同;
+        - 版本为关键帧时一并取回 blob 内容。
+        """
+        parent_subq = select(NodeRelationshipSQLEntity.from_node_id)\
+            .where(NodeRelationshipSQLEntity.to_node_id == NodeSQLEntity.id)\
+            .limit(1)\
+            .scalar_subquery()
+
+        if version_id:
+            version_alias = aliased(DocumentVersionSQLEntity, name="requested_version")
+            blob_alias = aliased(DocumentBlobSQLEntity, name="requested_blob")
+            stmt = select(NodeSQLEntity, version_alias, blob_alias.content, parent_subq.label("parent_id"))\
+                .join(WorkSQLEntity, self._live_work(NodeSQLEntity.work_id))\
+                .outerjoin(version_alias, and_(
+                    version_alias.id == version_id,
+                    version_alias.node_id == NodeSQLEntity.id,
+                ))\
+                .outerjoin(blob_alias, blob_alias.hash == version_alias.blob_hash)\
+                .where(NodeSQLEntity.id == node_id)
+        else:
+            version_alias = aliased(DocumentVersionSQLEntity, name="current_version")
+            legacy_subq = select(DocumentVersionSQLEntity)\
+                .where(
+                    DocumentVersionSQLEntity.node_id == NodeSQLEntity.id,
+                    NodeSQLEntity.now_version_id.is_(None),
+                )\
+                .order_by(
+                    (DocumentVersionSQLEntity.version == NodeSQLEntity.now_version).desc().nulls_last(),
+                    DocumentVersionSQLEntity.version.desc(),
+                )\
+                .limit(1)\
+                .lateral("legacy_version")
+            legacy_alias = aliased(DocumentVersionSQLEntity, legacy_subq)
+            # 已回填 now_version_id 时 legacy_version 为空, 两者至多一个有值, 共用一个 blob 关联
+            blob_alias = aliased(DocumentBlobSQLEntity, name="current_blob")
+            stmt = select(NodeSQLEntity, version_alias, legacy_alias, blob_alias.content, parent_subq.label("parent_id"))\
+                .join(WorkSQLEntity, self._live_work(NodeSQLEntity.work_id))\
+                .outerjoin(version_alias, version_alias.id == NodeSQLEntity.now_version_id)\
+                .outerjoin(legacy_subq, true())\
+                .outerjoin(blob_alias, blob_alias.hash == func.coalesce(version_alias.blob_hash, legacy_subq.c.blob_hash))\
+                .where(NodeSQLEntity.id == node_id)
+
         result = await self.session.execute(stmt)
-        node = result.scalar_one_or_none()
-        
-        if not node:
+        row = result.one_or_none()
+        if not row:
             raise ResourceNotFoundError(f"Node not found: {node_id}")
+        if version_id:
+            node, version, blob_content, parent_id = row
+        else:
+            node, version, legacy_version, blob_content, parent_id = row
+            version = version or legacy_version
+        if version is not None:
+            self.version_store.remember_blob(version.blob_hash, blob_content)
+        return node, version, parent_id
 
-        content = ""
-        word_count = 0
-        now_version_id = None
-        
-        if node.node_type == NodeTypeEnum.DOCUMENT.value:
-            # 获取指定版本(now_version) 或 最新版本
-            latest_version = None
-            if node.now_version:
-                stmt_ver = select(DocumentVersionSQLEntity).where(
-                    DocumentVersionSQLEntity.node_id == node.id,
-                    DocumentVersionSQLEntity.version == node.now_version
-                )
-                result_ver = await self.session.execute(stmt_ver)
-                latest_version = result_ver.scalar_one_or_none()
-            
-            if not latest_version:
-                # Fallback to latest by version number
-                stmt_ver = select(DocumentVersionSQLEntity)\
-                    .where(DocumentVersionSQLEntity.node_id == node_id)\
-                    .order_by(DocumentVersionSQLEntity.version.desc())\
-                    .limit(1)
-                result_ver = await self.session.execute(stmt_ver)
-                latest_version = result_ver.scalar_one_or_none()
-            
-            if latest_version:
-                content = latest_version.full_text
-                word_count = latest_version.word_count
-                now_version_id = latest_version.id
-        
-        # 获取父节点ID
-        stmt_parent = select(NodeRelationshipSQLEntity.from_node_id)\
-            .where(NodeRelationshipSQLEntity.to_node_id == node_id)
-        result_parent = await self.session.execute(stmt_parent)
-        parent_id = result_parent.scalar_one_or_none()
+    @staticmethod
+    def _is_current_version(node: NodeSQLEntity, version: DocumentVersionSQLEntity) -> bool:
+        if node.now_version_id is not None:
+            return node.now_version_id == version.id
+        return node.now_version == version.version
 
+    @staticmethod
+    def _to_node_detail(
+        node: NodeSQLEntity,
+        version: DocumentVersionSQLEntity | None,
+        parent_id: uuid.UUID | None,
+        content: str = "",
+    ) -> NodeDetailResponse:
+        # 非文档节点不返回版本信息
+        if node.node_type != NodeTypeEnum.DOCUMENT.value:
+            version = None
         return NodeDetailResponse(
             id=node.id,
             work_id=node.work_id,
             name=node.name,
-            content=content,
+            content=content if version else "",
             type=NodeTypeEnum(node.node_type),
-            word_count=word_count,
+            word_count=version.word_count if version else 0,
             description=node.description,
             parent_node_id=parent_id,
-            now_version=latest_version.version if latest_version else None,
-            now_version_id=now_version_id
+            now_version=version.version if version else None,
+            now_version_id=version.id if version else None,
+            node_revision=node.revision,
+            version_revision=version.revision if version else 0,
         )
 
-    async def update_node(self, node_id: str, request: UpdateNodeDTO) -> NodeDetailResponse:
-        """更新节点（重命名/移动）- 不处理内容更新."""
-        stmt = select(NodeSQLEntity).where(NodeSQLEntity.id == node_id)
-        result = await self.session.execute(stmt)
-        node = result.scalar_one_or_none()
-        
-        if not node:
+    async def _touch_node(self, node: NodeSQLEntity, expected_revision: int | None = None) -> None:
+        """递增节点及其作品的修订号 (ETag); expected_revision 用于 If-Match."""
+        revision = await bump_revision(self.session, NodeSQLEntity.__table__, node.id, expected_revision)
+        set_committed_value(node, "revision", revision)
+        await bump_revision(self.session, WorkSQLEntity.__table__, node.work_id)
+
+    @staticmethod
+    def _live_work(work_id_column):
+        """作品未被删除 (置墓碑后节点读写一律视为不存在)."""
+        return and_(WorkSQLEntity.id == work_id_column, WorkSQLEntity.deleted_at.is_(None))
+
+    async def _require_work(self, work_id: str) -> None:
+        work = await self.session.scalar(
+            select(WorkSQLEntity.id).where(WorkSQLEntity.id == work_id, WorkSQLEntity.deleted_at.is_(None))
+        )
+        if work is None:
+            raise ResourceNotFoundError(f"Work not found: {work_id}")
+
+    async def _require_node_work(self, node_id: str) -> uuid.UUID:
+        """节点存在且所属作品未删除, 返回作品ID."""
+        work_id = await self.session.scalar(
+            select(NodeSQLEntity.work_id)
+            .join(WorkSQLEntity, self._live_work(NodeSQLEntity.work_id))
+            .where(NodeSQLEntity.id == node_id)
+        )
+        if work_id is None:
             raise ResourceNotFoundError(f"Node not found: {node_id}")
+        return work_id
+
+    @replica_read
+    async def get_document_stamp(self, node_id: str, version_id: str | None = None) -> Row | None:
+        """只读取修订号 (不加载正文), 供条件 GET 判断; version_id 为空时取当前版本."""
+        node_table = NodeSQLEntity.__table__
+        version_table = DocumentVersionSQLEntity.__table__
+        target = version_table.c.id == version_id if version_id else version_table.c.id == node_table.c.now_version_id
+        stmt = select(
+            node_table.c.revision.label("node_revision"),
+            func.coalesce(version_table.c.revision, 0).label("version_revision"),
+            node_table.c.now_version_id,
+            version_table.c.id.label("version_id"),
+        ).select_from(node_table)\
+            .join(WorkSQLEntity.__table__, self._live_work(node_table.c.work_id))\
+            .outerjoin(version_table, and_(target, version_table.c.node_id == node_table.c.id))\
+            .where(node_table.c.id == node_id)
+        rows = await fetch_projection(self.session, stmt)
+        if not rows:
+            return None
+        stamp = rows[0]
+        pending = self._pending_content(node_id, stamp.version_id) if stamp.version_id is not None else None
+        if pending is not None:
+            stamp = stamp._replace(version_revision=pending[1])
+        return stamp
+
+    @staticmethod
+    def _pending_content(node_id: uuid.UUID | str, version_id: uuid.UUID | str) -> tuple[str, int] | None:
+        """本进程内尚未写回的正文与修订号 (协同编辑通道优先, 其次自动保存缓冲)."""
+        channel = collab_hub.get(node_id, version_id)
+        if channel is not None and channel.loaded and not channel.closed:
+            return channel.text, channel.revision
+        pending = autosave_buffer.get(node_id, version_id)
+        if pending is not None:
+            return pending.text, pending.revision
+        return None
+
+    @staticmethod
+    async def _flush_pending_content(node_id: str, version_id: str | None = None) -> None:
+        """同步写回本进程内尚未提交的正文 (切换/新建/删除版本及直接写库前调用)."""
+        await autosave_buffer.flush_node(node_id, version_id)
+        await collab_hub.flush_node(node_id, version_id)
+
+    async def _detail_content(self, node: NodeSQLEntity, version: DocumentVersionSQLEntity | None) -> str:
+        if version is None or node.node_type != NodeTypeEnum.DOCUMENT.value:
+            return ""
+        return await self.version_store.get_text(version)
+
+    @replica_read
+    async def get_node_detail(self, node_id: str) -> NodeDetailResponse:
+        """获取节点详情."""
+        node, version, parent_id = await self._load_node_bundle(node_id)
+        pending = self._pending_content(node.id, version.id) if version is not None else None
+        if pending is not None:
+            # 本进程尚未写回的正文: 返回其内容与修订号
+            detail = self._to_node_detail(node, version, parent_id, pending[0])
+            detail.version_revision = pending[1]
+            return detail
+        content = await self._detail_content(node, version)
+        return self._to_node_detail(node, version, parent_id, content)
+
+    async def update_node(
+        self, node_id: str, request: UpdateNodeDTO, expected_revision: int | None = None
+    ) -> NodeDetailResponse:
+        """更新节点（重命名/移动）- 不处理内容更新; expected_revision 为 If-Match 的节点修订号."""
+        node, version, parent_id = await self._load_node_bundle(node_id)
+        await self._touch_node(node, expected_revision)
             
         # Update Meta
         if request.name is not None:
@@ -170,16 +323,15 @@ class NodeService:
         if request.description is not None:
             node.description = request.description
         
-        if request.parent_node_id is not None:
-            # TODO: Validate parent_id exists and no cycle
+        if request.parent_node_id is not None and request.parent_node_id != parent_id:
+            # 校验新父节点存在于同一作品且不在自身子树内
+            await self.closure_store.check_move(node.work_id, node.id, request.parent_node_id)
             # Update Relationship
             # 1. Remove old parent relationship
-            stmt_del_rel = select(NodeRelationshipSQLEntity)\
+            await self.session.execute(
+                delete(NodeRelationshipSQLEntity)
                 .where(NodeRelationshipSQLEntity.to_node_id == node_id)
-            result_del_rel = await self.session.execute(stmt_del_rel)
-            old_rel = result_del_rel.scalars().all()
-            for r in old_rel:
-                await self.session.delete(r)
+            )
             
             # 2. Add new parent relationship
             new_rel = NodeRelationshipSQLEntity(
@@ -188,96 +340,43 @@ class NodeService:
                 to_node_id=node.id
             )
             self.session.add(new_rel)
+            await self.word_counts.subtree_detaching(node.id)
+            await self.closure_store.move(node.id, request.parent_node_id)
+            await self.word_counts.subtree_attached(node.id)
+            parent_id = request.parent_node_id
+            if request.sort_order is None:
+                # 移动到新父节点下时默认追加到末尾
+                node.sort_order = await self.closure_store.next_sort_order(node.work_id, parent_id)
+
+        if request.sort_order is not None:
+            node.sort_order = request.sort_order
             
+        content = await self._detail_content(node, version)
         node.update_at = get_now_time()
         await self.session.commit()
-        await self.session.refresh(node)
-        
-        # 获取父节点ID (For response)
-        stmt_parent = select(NodeRelationshipSQLEntity.from_node_id)\
-            .where(NodeRelationshipSQLEntity.to_node_id == node_id)
-        result_parent = await self.session.execute(stmt_parent)
-        parent_id = result_parent.scalar_one_or_none()
-        
-        # Get content for response
-        content = ""
-        word_count = 0
-        current_version_id = None
-        now_version_id = None
-        
-        if node.node_type == "document":
-            # Fetch existing content for response
-            latest_version = None
-            if node.now_version:
-                 stmt_ver = select(DocumentVersionSQLEntity).where(
-                     DocumentVersionSQLEntity.node_id == node.id,
-                     DocumentVersionSQLEntity.version == node.now_version
-                 )
-                 result_ver = await self.session.execute(stmt_ver)
-                 latest_version = result_ver.scalar_one_or_none()
-            
-            if not latest_version:
-                stmt_ver = select(DocumentVersionSQLEntity)\
-                    .where(DocumentVersionSQLEntity.node_id == node_id)\
-                    .order_by(DocumentVersionSQLEntity.version.desc())\
-                    .limit(1)
-                result_ver = await self.session.execute(stmt_ver)
-                latest_version = result_ver.scalar_one_or_none()
-                
-            if latest_version:
-                content = latest_version.full_text
-                word_count = latest_version.word_count
-                current_version_id = latest_version.version
-                now_version_id = latest_version.id # Get UUID
 
-        return NodeDetailResponse(
-            id=node.id,
-            work_id=node.work_id,
-            name=node.name,
-            content=content,
-            type=NodeTypeEnum(node.node_type),
-            word_count=word_count,
-            description=node.description,
-            parent_node_id=parent_id,
-            now_version=current_version_id,
-            now_version_id=now_version_id
-        )
+        return self._to_node_detail(node, version, parent_id, content)
 
     async def get_document_version_detail_and_switch(self, node_id: str, version_id: str) -> DocumentDetailResponse:
         """获取指定版本的文档详情，并更新节点的 now_version 为该版本."""
-        # 1. Get Node
-        stmt = select(NodeSQLEntity).where(NodeSQLEntity.id == node_id)
-        result = await self.session.execute(stmt)
-        node = result.scalar_one_or_none()
-        
-        if not node:
-             raise ResourceNotFoundError(f"Node not found: {node_id}")
-
-        # 2. Get Version (Check existence)
-        # version_id here is the UUID of the version
-        stmt_ver = select(DocumentVersionSQLEntity).where(
-            DocumentVersionSQLEntity.node_id == node_id,
-            DocumentVersionSQLEntity.id == version_id
-        )
-        result_ver = await self.session.execute(stmt_ver)
-        version = result_ver.scalar_one_or_none()
+        await self._flush_pending_content(node_id)
+        # 1. Get Node + Version (version_id here is the UUID of the version) + Parent ID
+        node, version, parent_id = await self._load_node_bundle(node_id, version_id=version_id)
         
         if not version:
              raise ResourceNotFoundError(f"Version not found: {version_id}")
+        full_text = await self.version_store.get_text(version)
 
-        # 3. Update Node's now_version to this version's version_name (version field)
-        # Note: now_version stores the version string (e.g., "v1.0.0"), not UUID.
-        if node.now_version != version.version:
+        # 2. Update Node's now_version_id (UUID) and now_version (version name, kept for compatibility)
+        if node.now_version_id != version.id:
+             # 文档节点的 word_count 即原当前版本字数
+             await self.word_counts.document_changed(node.work_id, node.id, version.word_count - node.word_count)
+             await self.search_index.update(node.work_id, node.id, version.id, full_text)
+             await self._touch_node(node)
+             node.now_version_id = version.id
              node.now_version = version.version
              node.update_at = get_now_time()
              await self.session.commit()
-             await self.session.refresh(node)
-        
-        # 4. Get Parent ID
-        stmt_parent = select(NodeRelationshipSQLEntity.from_node_id)\
-            .where(NodeRelationshipSQLEntity.to_node_id == node_id)
-        result_parent = await self.session.execute(stmt_parent)
-        parent_id = result_parent.scalar_one_or_none()
 
         return DocumentDetailResponse(
             id=node.id,
@@ -285,47 +384,48 @@ class NodeService:
             title=node.name,
             description=node.description,
             from_node_id=parent_id,
-            full_text=version.full_text,
+            full_text=full_text,
             now_version=version.version,
-            now_version_id=version.id
+            now_version_id=version.id,
+            node_revision=node.revision,
+            version_revision=version.revision,
         )
 
-    async def update_document_version_content(self, node_id: str, version_id: str, content: str) -> DocumentDetailResponse:
-        """更新指定文档版本的内容."""
-        # 1. Get Node (Check existence)
-        stmt = select(NodeSQLEntity).where(NodeSQLEntity.id == node_id)
-        result = await self.session.execute(stmt)
-        node = result.scalar_one_or_none()
-        if not node:
-             raise ResourceNotFoundError(f"Node not found: {node_id}")
+    async def update_document_version_content(
+        self, node_id: str, version_id: str, content: str, expected_revision: int | None = None
+    ) -> DocumentDetailResponse:
+        """更新指定文档版本的内容; expected_revision 为 If-Match 的版本修订号.
 
-        # 2. Get Version (By UUID)
-        stmt_ver = select(DocumentVersionSQLEntity).where(
-            DocumentVersionSQLEntity.node_id == node_id,
-            DocumentVersionSQLEntity.id == version_id
-        )
-        result_ver = await self.session.execute(stmt_ver)
-        version = result_ver.scalar_one_or_none()
+        该版本的协同编辑通道打开时, 与通道中的最新正文求差异后作为一次修改经通道应用。
+        """
+        channel = collab_hub.get(node_id, version_id)
+        if channel is not None:
+            detail = await channel.replace_text(content, expected_revision)
+            if detail is not None:
+                return detail
+        await autosave_buffer.flush_node(node_id, version_id)
+        # 1. Get Node + Version (By UUID) + Parent ID
+        node, version, parent_id = await self._load_node_bundle(node_id, version_id=version_id)
         
         if not version:
              raise ResourceNotFoundError(f"Version not found: {version_id}")
+        revision = await bump_revision(self.session, DocumentVersionSQLEntity.__table__, version.id, expected_revision)
+        set_committed_value(version, "revision", revision)
         
-        # 3. Update Content
-        version.full_text = content
-        version.word_count = len(content)
+        # 2. Update Content
+        await self.version_store.set_text(version, content)
+        word_count = count_words(content)
+        delta = word_count - version.word_count
+        version.word_count = word_count
         
-        # 4. If this is the current version, update node update_at
-        if node.now_version == version.version:
+        # 3. If this is the current version, update node update_at and word count rollups
+        if self._is_current_version(node, version):
+             await self.word_counts.document_changed(node.work_id, node.id, delta)
+             await self.search_index.update(node.work_id, node.id, version.id, content)
              node.update_at = get_now_time()
              
+        await self.version_store.flush()
         await self.session.commit()
-        await self.session.refresh(version)
-        
-        # 5. Get Parent ID
-        stmt_parent = select(NodeRelationshipSQLEntity.from_node_id)\
-            .where(NodeRelationshipSQLEntity.to_node_id == node_id)
-        result_parent = await self.session.execute(stmt_parent)
-        parent_id = result_parent.scalar_one_or_none()
         
         return DocumentDetailResponse(
             id=node.id,
@@ -333,20 +433,127 @@ class NodeService:
             title=node.name,
             description=node.description,
             from_node_id=parent_id,
-            full_text=version.full_text,
+            full_text=content,
             now_version=node.now_version,
-            now_version_id=version.id
+            now_version_id=version.id,
+            node_revision=node.revision,
+            version_revision=version.revision,
+        )
+
+    async def autosave_document_version_content(
+        self, node_id: str, version_id: str, content: str, expected_revision: int | None = None
+    ) -> DocumentDetailResponse:
+        """编辑器自动保存: 写入进程内的写后缓冲, 连续保存合并为一次提交 (见 services.node.autosave).
+
+        只有版本的首次缓冲保存需要读库校验, 之后的保存不访问数据库; If-Match 与缓冲中的修订号比较。
+        """
+        if not autosave_buffer.enabled or collab_hub.get(node_id, version_id) is not None:
+            return await self.update_document_version_content(node_id, version_id, content, expected_revision)
+        pending = autosave_buffer.get(node_id, version_id)
+        if pending is None:
+            node, version, parent_id = await self._load_node_bundle(node_id, version_id=version_id)
+            if not version:
+                 raise ResourceNotFoundError(f"Version not found: {version_id}")
+            if expected_revision is not None and expected_revision != version.revision:
+                 raise PreconditionFailedError(f"{DocumentVersionSQLEntity.__tablename__}:{version.id}")
+            await self.session.rollback()
+            pending = autosave_buffer.track(
+                DocumentDetailResponse(
+                    id=node.id,
+                    work_id=node.work_id,
+                    title=node.name,
+                    description=node.description,
+                    from_node_id=parent_id,
+                    now_version=node.now_version,
+                    now_version_id=version.id,
+                    node_revision=node.revision,
+                    version_revision=version.revision,
+                ),
+                version.id,
+                version.revision,
+            )
+        return await autosave_buffer.save(pending, content, expected_revision)
+
+    async def load_collab_state(self, node_id: str, version_id: str) -> ChannelState:
+        """打开协同编辑通道时加载版本状态 (先提交该版本的自动保存缓冲)."""
+        await autosave_buffer.flush_node(node_id, version_id)
+        node, version, parent_id = await self._load_node_bundle(node_id, version_id=version_id)
+        if not version or node.node_type != NodeTypeEnum.DOCUMENT.value:
+             raise ResourceNotFoundError(f"Version not found: {version_id}")
+        text = await self.version_store.get_text(version)
+        await self.session.rollback()
+        return ChannelState(
+            detail=DocumentDetailResponse(
+                id=node.id,
+                work_id=node.work_id,
+                title=node.name,
+                description=node.description,
+                from_node_id=parent_id,
+                now_version=node.now_version,
+                now_version_id=version.id,
+                node_revision=node.revision,
+                version_revision=version.revision,
+            ),
+            text=text,
+            revision=version.revision,
+            word_count=version.word_count,
         )
 
+    async def patch_document_version_content(
+        self, node_id: str, version_id: str, request: DocumentPatchRequest
+    ) -> DocumentPatchResponse:
+        """以区间操作修改指定版本的内容.
+
+        request.base_revision 须等于版本当前修订号 (条件更新, 否则 412), 操作坐标均相对该修订的正文;
+        全部操作只按片段 (find) 定位时与坐标无关, 不校验 base_revision, 直接作用于最新正文 (与协同通道一致)。
+        正文在服务端拼接, 字数按受影响窗口增量计算, 只返回新的修订号与字数。
+        该版本的协同编辑通道打开时经通道应用: 基于较旧修订的修改与其后的并发修改合并 (OT), 而非返回 412。
+        """
+        channel = collab_hub.get(node_id, version_id)
+        if channel is not None:
+            response = await channel.submit(request.base_revision, request.operations)
+            if response is not None:
+                return response
+        await autosave_buffer.flush_node(node_id, version_id)
+        node, version, _ = await self._load_node_bundle(node_id, version_id=version_id)
+        if not version:
+             raise ResourceNotFoundError(f"Version not found: {version_id}")
+        expected = None if all(op.find is not None for op in request.operations) else request.base_revision
+        revision = await bump_revision(self.session, DocumentVersionSQLEntity.__table__, version.id, expected)
+        set_committed_value(version, "revision", revision)
+
+        # 基准正文通常命中进程内缓存 (编辑中的版本刚被读取或写入过)
+        patched = apply_content_patch(await self.version_store.get_text(version), request.operations)
+        await self.version_store.set_text(version, patched.text)
+        version.word_count += patched.word_count_delta
 
+        if self._is_current_version(node, version):
+             if patched.word_count_delta:
+                 await self.word_counts.document_changed(node.work_id, node.id, patched.word_count_delta)
+             await self.search_index.update(node.work_id, node.id, version.id, patched.text)
+             node.update_at = get_now_time()
+
+        await self.version_store.flush()
+        await self.session.commit()
+
+        return DocumentPatchResponse(
+            version_id=version.id,
+            version_revision=version.revision,
+            word_count=version.word_count,
+            word_count_delta=patched.word_count_delta,
+        )
+
+
+    @replica_read
     async def get_document_versions(self, node_id: str) -> DocumentVersionResponse:
         """获取文档版本列表."""
-        stmt = select(DocumentVersionSQLEntity)\
-            .where(DocumentVersionSQLEntity.node_id == node_id)\
-            .order_by(DocumentVersionSQLEntity.create_at.desc())
+        await self._require_node_work(node_id)
+        version_table = DocumentVersionSQLEntity.__table__
+        stmt = select(version_table.c.id, version_table.c.version, version_table.c.create_at)\
+            .where(version_table.c.node_id == node_id)\
+            .order_by(version_table.c.create_at.desc())
         
-        result = await self.session.execute(stmt)
-        versions = result.scalars().all()
+        versions = await fetch_projection(self.session, stmt)
         
         return DocumentVersionResponse(
             versions=[
@@ -360,28 +567,13 @@ class NodeService:
 
     async def create_document_version(self, node_id: str, request: DocumentVersionCreateRequest) -> None:
         """创建新版本 (基于当前 now_version)."""
-        # 1. Get Node
-        stmt = select(NodeSQLEntity).where(NodeSQLEntity.id == node_id)
-        result = await self.session.execute(stmt)
-        node = result.scalar_one_or_none()
-        
-        if not node:
-             raise ResourceNotFoundError(f"Node not found: {node_id}")
+        await self._flush_pending_content(node_id)
+        # 1. Get Node + Current Version
+        node, current_ver, _ = await self._load_node_bundle(node_id)
 
         # 2. Get Current Version Content
-        current_content = ""
-        current_word_count = 0
-        
-        if node.now_version:
-             stmt_ver = select(DocumentVersionSQLEntity).where(
-                 DocumentVersionSQLEntity.node_id == node.id,
-                 DocumentVersionSQLEntity.version == node.now_version
-             )
-             result_ver = await self.session.execute(stmt_ver)
-             current_ver = result_ver.scalar_one_or_none()
-             if current_ver:
-                 current_content = current_ver.full_text
-                 current_word_count = current_ver.word_count
+        current_content = await self.version_store.get_text(current_ver) if current_ver else ""
+        current_word_count = current_ver.word_count if current_ver else 0
         
         # 3. Determine New Version Name
         # Logic: If request.version_name provided, use it.
@@ -412,25 +604,30 @@ class NodeService:
              else:
                  new_version_name = "v1"
 
-        # 4. Create New Version
+        # 4. Create New Version (Inherit content, stored as delta against current version when possible)
         new_ver = DocumentVersionSQLEntity(
             node_id=node.id,
             version=new_version_name,
-            full_text=current_content, # Inherit content
             word_count=current_word_count,
             create_at=get_now_time()
         )
+        await self.version_store.new_version(new_ver, current_content, current_ver)
         self.session.add(new_ver)
         await self.session.flush() # Get ID
         
-        # 5. Set as current version
+        # 5. Set as current version (内容与原当前版本相同, 检索索引只改指向)
+        await self._touch_node(node)
         node.now_version = new_ver.version
+        node.now_version_id = new_ver.id
+        await self.search_index.retarget(node.id, new_ver.id)
         node.update_at = get_now_time()
         
         await self.session.commit()
 
     async def delete_document_version(self, node_id: str, version_id: str) -> None:
         """删除指定版本 (UUID)."""
+        await self._require_node_work(node_id)
+        await self._flush_pending_content(node_id, version_id)
         # version_id is UUID
         stmt = select(DocumentVersionSQLEntity).where(
             DocumentVersionSQLEntity.node_id == node_id,
@@ -447,7 +644,7 @@ class NodeService:
         result_node = await self.session.execute(stmt_node)
         node = result_node.scalar_one_or_none()
         
-        if node and node.now_version == ver.version:
+        if node and self._is_current_version(node, ver):
              # If deleting current version, we must switch to another one or allow null?
              # Strategy: Switch to latest created version that is not this one
              stmt_latest = select(DocumentVersionSQLEntity)\
@@ -459,41 +656,308 @@ class NodeService:
              
              if latest:
                  node.now_version = latest.version
+                 node.now_version_id = latest.id
+                 await self.search_index.update(
+                     node.work_id, node.id, latest.id, await self.version_store.get_text(latest)
+                 )
              else:
                  node.now_version = None # No versions left
+                 node.now_version_id = None
+                 await self.search_index.remove(node.id)
+             await self.word_counts.document_changed(
+                 node.work_id, node.id, (latest.word_count if latest else 0) - node.word_count
+             )
+             await self._touch_node(node)
         
+        # 以该版本为基准的增量需先重新挂接, 并释放其 blob 引用
+        await self.version_store.detach(ver)
         await self.session.delete(ver)
+        await self.version_store.flush()
         await self.session.commit()
+        await collab_hub.close_version(node_id, version_id, "文档版本已删除")
 
-    async def delete_node(self, node_id: str) -> None:
-        """删除节点."""
-        stmt = select(NodeSQLEntity).where(NodeSQLEntity.id == node_id)
-        result = await self.session.execute(stmt)
-        node = result.scalar_one_or_none()
-        
-        if not node:
-            raise ResourceNotFoundError(f"Node not found: {node_id}")
-            
-        # Manually delete relationships if not CASCADE
-        # Delete Parent Relationship (Where this node is child)
-        stmt_del_child = select(NodeRelationshipSQLEntity).where(NodeRelationshipSQLEntity.to_node_id == node_id)
-        res_del_child = await self.session.execute(stmt_del_child)
-        for r in res_del_child.scalars().all():
-            await self.session.delete(r)
-            
-        # Delete Children Relationship (Where this node is parent)
-        # Note: This orphans children. Ideally should delete children or move them.
-        # Simple implementation: Delete relationships where I am parent.
-        stmt_del_parent = select(NodeRelationshipSQLEntity).where(NodeRelationshipSQLEntity.from_node_id == node_id)
-        res_del_parent = await self.session.execute(stmt_del_parent)
-        for r in res_del_parent.scalars().all():
-            await self.session.delete(r)
-
-        # Delete Document Versions (If document)
-        stmt_del_ver = select(DocumentVersionSQLEntity).where(DocumentVersionSQLEntity.node_id == node_id)
-        res_del_ver = await self.session.execute(stmt_del_ver)
-        for v in res_del_ver.scalars().all():
-            await self.session.delete(v)
-        
-        await self.session.delete(node)
+    async def delete_node(self, node_id: str) -> NodeDeleteResponse:
+        """删除节点及其整棵子树 (节点/关系/版本), 以少量集合 DELETE 在一个事务内完成."""
+        work_id = await self._require_node_work(node_id)
+        await self.word_counts.subtree_deleting(work_id, node_id)
+        await bump_revision(self.session, WorkSQLEntity.__table__, work_id)
+
+        # 子树(含自身)由闭包表一次给出; 各语句在执行时取快照, 删除顺序满足外键依赖
+        subtree = self.closure_store.subtree_ids(node_id)
+        deleted_ids = (await self.session.execute(subtree)).scalars().all()
+
+        # 1. 文档版本: 批量释放 blob 引用后整体删除
+        await self.version_store.release_versions(DocumentVersionSQLEntity.node_id.in_(subtree))
+        versions = await self.session.execute(
+            delete(DocumentVersionSQLEntity).where(DocumentVersionSQLEntity.node_id.in_(subtree))
+        )
+
+        # 2. 父子关系: 子树内部的边 + 子树根与其父节点的边
+        relationships = await self.session.execute(
+            delete(NodeRelationshipSQLEntity).where(NodeRelationshipSQLEntity.to_node_id.in_(subtree))
+        )
+
+        # 3. 节点 (闭包表行随外键级联删除)
+        nodes = await self.session.execute(
+            delete(NodeSQLEntity).where(NodeSQLEntity.id.in_(subtree))
+        )
+
+        await self.version_store.flush()
         await self.session.commit()
+        # 已删除节点的未写回内容一并丢弃
+        await collab_hub.close_nodes(deleted_ids, "文档已删除")
+        autosave_buffer.discard_nodes(deleted_ids)
+        result = NodeDeleteResponse(
+            deleted_nodes=nodes.rowcount,
+            deleted_relationships=relationships.rowcount,
+            deleted_versions=versions.rowcount,
+        )
+        logger.info(f"[DeleteNode] node_id={node_id}, {result}")
+        return result
+
+    async def apply_outline_batch(self, work_id: str, request: OutlineBatchRequest) -> OutlineBatchResponse:
+        """批量应用目录操作: 内存中整体校验后, 以批量语句在一个事务内写入, 任一操作无效则全部不生效."""
+        await self._require_work(work_id)
+
+        rows = await self.closure_store.work_tree(work_id)
+        planner = OutlineBatchPlanner([
+            OutlineEntry(
+                id=row.id,
+                node_type=row.node_type,
+                parent_id=row.parent_node_id,
+                sort_order=row.sort_order,
+                name=row.name,
+                description=row.description,
+            )
+            for row in rows
+        ])
+        plan = planner.apply(request.operations)
+        now = get_now_time()
+
+        # 1. 删除: 版本(先释放 blob 引用) -> 指向这些节点的边 -> 节点 (闭包行级联删除)
+        deleted_ids = list(plan.deleted)
+        if deleted_ids:
+            await self.version_store.release_versions(DocumentVersionSQLEntity.node_id.in_(deleted_ids))
+            await self.session.execute(
+                delete(DocumentVersionSQLEntity).where(DocumentVersionSQLEntity.node_id.in_(deleted_ids))
+            )
+
+        # 2. 父子边: 删除被移动/删除节点的旧边, 再统一插入新边
+        rewired = list(plan.moved | plan.deleted)
+        if rewired:
+            await self.session.execute(
+                delete(NodeRelationshipSQLEntity).where(NodeRelationshipSQLEntity.to_node_id.in_(rewired))
+            )
+        if deleted_ids:
+            await self.session.execute(delete(NodeSQLEntity).where(NodeSQLEntity.id.in_(deleted_ids)))
+
+        # 3. 新建节点与其初始版本 (空正文共用一个 blob)
+        if plan.created:
+            await self.session.execute(insert(NodeSQLEntity.__table__), [
+                {
+                    "id": e.id, "work_id": work_id, "name": e.name, "description": e.description,
+                    "node_type": e.node_type, "sort_order": e.sort_order, "now_version": None,
+                    "now_version_id": None, "create_at": now, "update_at": now,
+                }
+                for e in plan.created
+            ])
+            documents = [e for e in plan.created if planner.is_document(e)]
+            if documents:
+                blob_hash = await self.version_store.acquire_keyframes("", len(documents))
+                version_ids = {e.id: uuid.uuid4() for e in documents}
+                await self.session.execute(insert(DocumentVersionSQLEntity.__table__), [
+                    {
+                        "id": version_ids[e.id], "node_id": e.id, "version": "初始化版本", "full_text": "",
+                        "word_count": 0, "storage_type": VersionStorageEnum.FULL.value, "blob_hash": blob_hash,
+                        "base_version_id": None, "delta": None, "chain_depth": 0, "create_at": now,
+                    }
+                    for e in documents
+                ])
+                node_table = NodeSQLEntity.__table__
+                await self.session.execute(
+                    update(node_table)
+                    .where(node_table.c.id == bindparam("b_id"))
+                    .values(now_version="初始化版本", now_version_id=bindparam("b_version_id")),
+                    [{"b_id": node_id, "b_version_id": version_id} for node_id, version_id in version_ids.items()],
+                )
+
+        # 4. 已有节点的名称/描述/顺序
+        if plan.changed:
+            node_table = NodeSQLEntity.__table__
+            await self.session.execute(
+                update(node_table)
+                .where(node_table.c.id == bindparam("b_id"))
+                .values(
+                    name=bindparam("b_name"),
+                    description=bindparam("b_description"),
+                    sort_order=bindparam("b_sort_order"),
+                    update_at=bindparam("b_update_at"),
+                    revision=node_table.c.revision + 1,
+                ),
+                [
+                    {
+                        "b_id": n, "b_name": planner.nodes[n].name, "b_description": planner.nodes[n].description,
+                        "b_sort_order": planner.nodes[n].sort_order, "b_update_at": now,
+                    }
+                    for n in plan.changed
+                ],
+            )
+
+        new_edges = [
+            {"id": uuid.uuid4(), "work_id": work_id, "from_node_id": e.parent_id, "to_node_id": e.id,
+             "create_at": now, "update_at": now}
+            for e in [*plan.created, *(planner.nodes[n] for n in plan.moved)]
+            if e.parent_id is not None
+        ]
+        if new_edges:
+            await self.session.execute(insert(NodeRelationshipSQLEntity.__table__), new_edges)
+
+        # 5. 目录结构有变化时整体重建闭包 (两条语句, 与操作数量无关)
+        if plan.created or plan.moved:
+            await self.closure_store.rebuild_work(work_id)
+        if plan.moved or plan.deleted:
+            await self.word_counts.recompute_work(work_id)
+        await bump_revision(self.session, WorkSQLEntity.__table__, work_id)
+
+        await self.version_store.flush()
+        await self.session.commit()
+        if deleted_ids:
+            await collab_hub.close_nodes(deleted_ids, "文档已删除")
+            autosave_buffer.discard_nodes(deleted_ids)
+        logger.info(
+            f"[OutlineBatch] work_id={work_id}, ops={len(request.operations)}, created={len(plan.created)}, "
+            f"moved={len(plan.moved)}, renamed={len(plan.renamed)}, deleted={len(plan.deleted)}"
+        )
+        return OutlineBatchResponse(
+            created_node_ids=[e.id for e in plan.created],
+            created=len(plan.created),
+            moved=len(plan.moved),
+            renamed=len(plan.renamed),
+            deleted=len(plan.deleted),
+        )
+
+    @staticmethod
+    def _to_outline_items(rows) -> list[NodeOutlineItem]:
+        return [
+            NodeOutlineItem(
+                id=row.id,
+                name=row.name,
+                type=NodeTypeEnum(row.node_type),
+                parent_node_id=row.parent_node_id,
+                depth=row.depth,
+                sort_order=row.sort_order,
+                has_children=getattr(row, "has_children", None),
+            )
+            for row in rows
+        ]
+
+    @replica_read
+    async def get_work_outline(self, work_id: str, max_depth: int | None = None) -> list[NodeOutlineItem]:
+        """获取作品目录 (扁平, 按深度排列), 可限制最大深度."""
+        await self._require_work(work_id)
+        rows = await self.closure_store.outline(work_id, max_depth)
+        return self._to_outline_items(rows)
+
+    @replica_read
+    async def get_subtree(self, node_id: str, max_depth: int | None = None) -> list[NodeOutlineItem]:
+        """获取以节点为根的子树 (含自身), depth 为相对层数."""
+        await self._require_node_work(node_id)
+        rows = await self.closure_store.subtree(node_id, max_depth)
+        return self._to_outline_items(rows)
+
+    @replica_read
+    async def get_ancestors(self, node_id: str) -> list[NodeOutlineItem]:
+        """获取节点的祖先链 (从根到父节点)."""
+        await self._require_node_work(node_id)
+        rows = await self.closure_store.ancestors(node_id)
+        return self._to_outline_items(rows)
+
+    @replica_read
+    async def get_children(
+        self,
+        work_id: str,
+        parent_id: str | None = None,
+        cursor: str | None = None,
+        limit: int | None = None,
+        depth: int = 1,
+    ) -> NodeChildrenResponse:
+        """按兄弟顺序分页获取直接子节点 (parent_id 为空时为根节点), depth>1 时同时展开本页子节点的子孙."""
+        await self._require_work(work_id)
+        limit = min(limit or settings.NODE_CHILDREN_PAGE_SIZE, settings.NODE_CHILDREN_MAX_PAGE_SIZE)
+        depth = max(1, min(depth, settings.NODE_CHILDREN_MAX_DEPTH))
+        after = None
+        if cursor:
+            sort_order, last_id = decode_cursor(cursor, 2)
+            try:
+                after = (int(sort_order), uuid.UUID(str(last_id)))
+            except (TypeError, ValueError) as e:
+                raise InvalidCursorError(cursor) from e
+
+        # 多取一条判断是否还有下一页
+        rows = await self.closure_store.children_page(work_id, parent_id, after, limit + 1)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].sort_order, rows[-1].id)
+
+        parent_uuid = uuid.UUID(str(parent_id)) if parent_id else None
+        items = [
+            NodeOutlineItem(
+                id=row.id,
+                name=row.name,
+                type=NodeTypeEnum(row.node_type),
+                parent_node_id=parent_uuid,
+                depth=1,
+                sort_order=row.sort_order,
+                has_children=row.has_children,
+            )
+            for row in rows
+        ]
+        if depth > 1:
+            expandable = [row.id for row in rows if row.has_children]
+            if expandable:
+                nested = await self.closure_store.descendants(expandable, depth - 1)
+                for item in self._to_outline_items(nested):
+                    item.depth += 1
+                    items.append(item)
+        return NodeChildrenResponse(items=items, next_cursor=next_cursor)
+
+    @replica_read
+    async def search_documents(
+        self, work_id: str, query: str, cursor: str | None = None, limit: int | None = None
+    ) -> DocumentSearchResponse:
+        """在作品全部文档的当前版本中检索正文: 按相关度分页, 每条命中附带高亮片段 (见 services.node.search_index)."""
+        await self._require_work(work_id)
+        parsed = parse_search_query(query)
+        if parsed is None:
+            return DocumentSearchResponse()
+        limit = min(limit or settings.SEARCH_PAGE_SIZE, settings.SEARCH_MAX_PAGE_SIZE)
+        after = None
+        if cursor:
+            rank, last_id = decode_cursor(cursor, 2)
+            try:
+                after = (float(rank), uuid.UUID(str(last_id)))
+            except (TypeError, ValueError) as e:
+                raise InvalidCursorError(cursor) from e
+
+        # 多取一条判断是否还有下一页
+        rows = await self.search_index.search(work_id, parsed, after, limit + 1)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].rank, rows[-1].node_id)
+
+        # 片段只对本页结果取正文计算
+        texts = await self.version_store.get_texts([row.version_id for row in rows])
+        items = []
+        for row in rows:
+            match_count, snippets = build_snippets(texts.get(row.version_id) or "", parsed.pattern)
+            items.append(DocumentSearchHit(
+                node_id=row.node_id,
+                version_id=row.version_id,
+                title=row.name,
+                rank=row.rank,
+                match_count=match_count,
+                snippets=snippets,
+            ))
+        return DocumentSearchResponse(items=items, next_cursor=next_cursor)
@@ -0,0 +1,468 @@
+"""Document Version Store Module.
+
+文档版本的增量链存储:
+- 关键帧(full): 内容存于按哈希寻址的 document_blob, 相同内容只存一份并引用计数;
+- 增量(delta): delta 保存相对 base_version 的差异, 内容 = apply(base 的内容, delta);
+- 每条链最多 DOCUMENT_VERSION_KEYFRAME_INTERVAL 层, 超过或差异不划算时写入新的关键帧;
+- 读取时一次递归查询取回整条链并还原, 还原结果进入进程内 LRU 缓存;
+- 引用计数归零的 blob 在本次写入 flush 后批量回收。
+
+差异按"片段"计算: 以换行、标签结束符与句末标点切分, 对小说正文(含 HTML)都有较好的粒度。
+"""
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from sqlalchemy import TEXT, cast, delete, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import ColumnElement
+
+from common.config import settings
+from common.enums import VersionStorageEnum
+from common.errors import DocumentVersionCorruptedError
+from common.utils.utils import get_now_time
+from infrastructure.pg.pg_models import DocumentBlobSQLEntity, DocumentVersionSQLEntity
+
+# 差异操作: [0, i1, i2] 复制基准片段 [i1, i2); [1, "text"] 插入文本
+_OP_COPY = 0
+_OP_INSERT = 1
+
+_SEGMENT_RE = re.compile(r"[^\n>。！？!?]+[\n>。！？!?]*|[\n>。！？!?]+")
+
+# 增量大小超过正文该比例时直接存关键帧
+_MAX_DELTA_RATIO = 0.5
+
+
+def split_segments(text: str) -> List[str]:
+    """将文本切分为片段, 所有片段顺序拼接即为原文."""
+    return _SEGMENT_RE.findall(text)
+
+
+def compute_delta(base_text: str, new_text: str) -> List[List[Any]]:
+    """计算 base_text -> new_text 的差异操作列表."""
+    base_segments = split_segments(base_text)
+    new_segments = split_segments(new_text)
+    matcher = SequenceMatcher(None, base_segments, new_segments, autojunk=False)
+    ops: List[List[Any]] = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            if ops and ops[-1][0] == _OP_COPY and ops[-1][2] == i1:
+                ops[-1][2] = i2
+            else:
+                ops.append([_OP_COPY, i1, i2])
+        elif tag in ("replace", "insert"):
+            inserted = "".join(new_segments[j1:j2])
+            if ops and ops[-1][0] == _OP_INSERT:
+                ops[-1][1] += inserted
+            else:
+                ops.append([_OP_INSERT, inserted])
+        # delete: 不复制即可
+    return ops
+
+
+def apply_delta(base_text: str, delta: Sequence[Sequence[Any]]) -> str:
+    """将差异操作应用到 base_text 上."""
+    base_segments = split_segments(base_text)
+    parts: List[str] = []
+    for op in delta:
+        if op[0] == _OP_COPY:
+            parts.extend(base_segments[op[1]:op[2]])
+        else:
+            parts.append(op[1])
+    return "".join(parts)
+
+
+def delta_size(delta: Sequence[Sequence[Any]]) -> int:
+    return len(json.dumps(delta, ensure_ascii=False))
+
+
+def content_hash(text: str) -> str:
+    """内容寻址哈希 (与迁移中的 encode(sha256(convert_to(text, 'UTF8')), 'hex') 一致)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class _TextCache:
+    """正文的进程内 LRU 缓存.
+
+    - 关键帧按 blob 哈希缓存, 内容寻址天然不会过期;
+    - 增量版本的 key 包含增量内容的摘要: 版本被改写(或链被重新挂接)后摘要随之变化, 多进程下也不会读到旧内容。
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[tuple[str, str], str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def blob_key(blob_hash: str) -> tuple[str, str]:
+        return "blob", blob_hash
+
+    @staticmethod
+    def delta_key(version: DocumentVersionSQLEntity) -> tuple[str, str]:
+        raw = json.dumps([str(version.base_version_id), version.delta], ensure_ascii=False)
+        return str(version.id), hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: tuple[str, str]) -> Optional[str]:
+        text = self._data.get(key)
+        if text is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return text
+
+    def put(self, key: tuple[str, str], text: str) -> None:
+        if self.max_entries <= 0:
+            return
+        self._data[key] = text
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+version_text_cache = _TextCache(settings.DOCUMENT_VERSION_CACHE_SIZE)
+
+
+class DocumentVersionStore:
+    """文档版本内容的读写 (增量链 + 内容寻址 blob)."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        # 本次会话中引用计数被减少的 blob, flush 后统一回收
+        self._released: Set[str] = set()
+
+    # --- 读取 ---
+
+    def remember_blob(self, blob_hash: Optional[str], content: Optional[str]) -> None:
+        """登记随版本一并查询出的 blob 内容, 避免再次查询."""
+        if blob_hash and content is not None:
+            version_text_cache.put(version_text_cache.blob_key(blob_hash), content)
+
+    async def _blob_text(self, blob_hash: str) -> str:
+        key = version_text_cache.blob_key(blob_hash)
+        cached = version_text_cache.get(key)
+        if cached is not None:
+            return cached
+        content = await self.session.scalar(
+            select(DocumentBlobSQLEntity.content).where(DocumentBlobSQLEntity.hash == blob_hash)
+        )
+        if content is None:
+            raise DocumentVersionCorruptedError(blob_hash)
+        version_text_cache.put(key, content)
+        return content
+
+    async def get_text(self, version: DocumentVersionSQLEntity) -> str:
+        """获取版本的完整内容."""
+        if version.storage_type != VersionStorageEnum.DELTA.value:
+            if version.blob_hash:
+                return await self._blob_text(version.blob_hash)
+            return version.full_text
+        key = version_text_cache.delta_key(version)
+        cached = version_text_cache.get(key)
+        if cached is not None:
+            return cached
+        text = await self._reconstruct(version)
+        version_text_cache.put(key, text)
+        return text
+
+    async def get_texts(self, version_ids: Sequence[Any]) -> Dict[Any, str]:
+        """批量获取版本内容: 一条语句取回版本行与关键帧 blob, 增量版本再逐个回溯.
+
+        只读缓存不写入, 供导出等一次性顺序读取使用, 避免整部作品挤出缓存中的热点内容。
+        """
+        if not version_ids:
+            return {}
+        dv = DocumentVersionSQLEntity
+        stmt = select(
+            dv.id, dv.storage_type, dv.full_text, dv.blob_hash, dv.base_version_id, dv.delta,
+            DocumentBlobSQLEntity.content.label("blob_content"),
+        ).outerjoin(DocumentBlobSQLEntity, DocumentBlobSQLEntity.hash == dv.blob_hash)\
+            .where(dv.id.in_(version_ids))
+        texts: Dict[Any, str] = {}
+        for row in (await self.session.execute(stmt)).all():
+            if row.storage_type != VersionStorageEnum.DELTA.value:
+                if row.blob_hash and row.blob_content is None:
+                    raise DocumentVersionCorruptedError(str(row.id))
+                texts[row.id] = row.blob_content if row.blob_hash else row.full_text
+                continue
+            cached = version_text_cache.get(version_text_cache.delta_key(row))
+            texts[row.id] = cached if cached is not None else await self._reconstruct(row)
+        return texts
+
+    async def _reconstruct(self, version: DocumentVersionSQLEntity) -> str:
+        # 递归查询: 从目标版本沿 base_version_id 回溯到关键帧, 一次取回整条链(含关键帧 blob 内容)
+        dv = DocumentVersionSQLEntity
+        chain = select(
+            dv.id, dv.base_version_id, dv.storage_type, dv.full_text, dv.delta, dv.blob_hash,
+            literal(0).label("depth"),
+        ).where(dv.id == version.base_version_id).cte("version_chain", recursive=True)
+        parent = aliased(dv)
+        chain = chain.union_all(
+            select(
+                parent.id, parent.base_version_id, parent.storage_type, parent.full_text, parent.delta, parent.blob_hash,
+                (chain.c.depth + 1).label("depth"),
+            )
+            .join(chain, parent.id == chain.c.base_version_id)
+            .where(
+                chain.c.storage_type == VersionStorageEnum.DELTA.value,
+                chain.c.depth < settings.DOCUMENT_VERSION_KEYFRAME_INTERVAL * 4,
+            )
+        )
+        stmt = select(chain, DocumentBlobSQLEntity.content.label("blob_content"))\
+            .outerjoin(DocumentBlobSQLEntity, DocumentBlobSQLEntity.hash == chain.c.blob_hash)\
+            .order_by(chain.c.depth.desc())
+        result = await self.session.execute(stmt)
+        rows = result.all()
+        if not rows or rows[0].storage_type != VersionStorageEnum.FULL.value:
+            raise DocumentVersionCorruptedError(str(version.id))
+
+        keyframe = rows[0]
+        if keyframe.blob_hash:
+            if keyframe.blob_content is None:
+                raise DocumentVersionCorruptedError(str(keyframe.id))
+            text = keyframe.blob_content
+            self.remember_blob(keyframe.blob_hash, text)
+        else:
+            text = keyframe.full_text
+        for row in rows[1:]:
+            text = apply_delta(text, row.delta or [])
+        return apply_delta(text, version.delta or [])
+
+    # --- blob 引用计数 ---
+
+    async def _share_blob(self, blob_hash: str) -> bool:
+        """若 blob 已存在则引用计数 +1 并返回 True (不传输正文)."""
+        result = await self.session.execute(
+            update(DocumentBlobSQLEntity)
+            .where(DocumentBlobSQLEntity.hash == blob_hash)
+            .values(ref_count=DocumentBlobSQLEntity.ref_count + 1)
+            .returning(DocumentBlobSQLEntity.hash)
+        )
+        return result.first() is not None
+
+    async def _create_blob(self, blob_hash: str, text: str, refs: int = 1) -> None:
+        blob_table = DocumentBlobSQLEntity.__table__
+        stmt = pg_insert(blob_table).values(
+            hash=blob_hash,
+            content=text,
+            size=len(text.encode("utf-8")),
+            ref_count=refs,
+            create_at=get_now_time(),
+        )
+        # 并发写入同一内容时退化为引用计数 +refs
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[blob_table.c.hash],
+            set_={"ref_count": blob_table.c.ref_count + refs},
+        )
+        await self.session.execute(stmt)
+        self.remember_blob(blob_hash, text)
+
+    async def _release_blob(self, blob_hash: Optional[str]) -> None:
+        if not blob_hash:
+            return
+        await self.session.execute(
+            update(DocumentBlobSQLEntity)
+            .where(DocumentBlobSQLEntity.hash == blob_hash)
+            .values(ref_count=DocumentBlobSQLEntity.ref_count - 1)
+        )
+        self._released.add(blob_hash)
+
+    async def release_versions(self, condition: ColumnElement[bool]) -> None:
+        """批量删除版本前调用: 按 blob 聚合后一次性扣减引用计数."""
+        refs = select(
+            DocumentVersionSQLEntity.blob_hash.label("hash"),
+            func.count().label("refs"),
+        ).where(condition, DocumentVersionSQLEntity.blob_hash.is_not(None))\
+            .group_by(DocumentVersionSQLEntity.blob_hash)\
+            .subquery()
+        result = await self.session.execute(
+            update(DocumentBlobSQLEntity)
+            .where(DocumentBlobSQLEntity.hash == refs.c.hash)
+            .values(ref_count=DocumentBlobSQLEntity.ref_count - refs.c.refs)
+            .returning(DocumentBlobSQLEntity.hash)
+        )
+        self._released.update(result.scalars().all())
+
+    async def flush(self) -> None:
+        """写入版本变更, 并批量回收引用计数归零的 blob (需在版本行变更落库之后执行)."""
+        await self.session.flush()
+        if not self._released:
+            return
+        await self.session.execute(
+            delete(DocumentBlobSQLEntity).where(
+                DocumentBlobSQLEntity.hash.in_(list(self._released)),
+                DocumentBlobSQLEntity.ref_count <= 0,
+            )
+        )
+        self._released.clear()
+
+    # --- 写入 ---
+
+    async def _store(
+        self,
+        version: DocumentVersionSQLEntity,
+        text: str,
+        base: Optional[DocumentVersionSQLEntity],
+        base_text: Optional[str],
+    ) -> None:
+        """写入内容: 与关键帧基准内容相同则直接引用其 blob; 给定基准且增量足够小则存增量;
+        否则已有相同内容则直接引用; 否则写入新关键帧.
+
+        增量优先于按哈希共享 blob: 已有版本各自引用自身内容的 blob, 先查共享会使 rechain 永远不产生增量。
+        """
+        old_blob_hash = version.blob_hash
+
+        # 未修改内容 (如新建版本): 只增加基准 blob 的引用, 不延长增量链
+        if base is not None and text == base_text and base.storage_type == VersionStorageEnum.FULL.value \
+                and base.blob_hash and await self._share_blob(base.blob_hash):
+            self._set_keyframe(version, base.blob_hash)
+            await self._release_blob(old_blob_hash)
+            return
+
+        if base is not None and base_text is not None and base.chain_depth + 1 < settings.DOCUMENT_VERSION_KEYFRAME_INTERVAL:
+            delta = compute_delta(base_text, text)
+            if delta_size(delta) <= max(len(text) * _MAX_DELTA_RATIO, 64):
+                version.storage_type = VersionStorageEnum.DELTA.value
+                version.base_version_id = base.id
+                version.delta = delta
+                version.chain_depth = base.chain_depth + 1
+                version.blob_hash = None
+                version.full_text = ""
+                await self._release_blob(old_blob_hash)
+                return
+
+        blob_hash = content_hash(text)
+        if not await self._share_blob(blob_hash):
+            await self._create_blob(blob_hash, text)
+        self._set_keyframe(version, blob_hash)
+        await self._release_blob(old_blob_hash)
+
+    @staticmethod
+    def _set_keyframe(version: DocumentVersionSQLEntity, blob_hash: str) -> None:
+        version.storage_type = VersionStorageEnum.FULL.value
+        version.blob_hash = blob_hash
+        version.base_version_id = None
+        version.delta = None
+        version.chain_depth = 0
+        version.full_text = ""
+
+    async def acquire_keyframes(self, text: str, refs: int) -> str:
+        """为 refs 个内容相同的新关键帧版本一次性登记 blob 引用, 返回 blob 哈希 (批量建档用)."""
+        blob_hash = content_hash(text)
+        await self._create_blob(blob_hash, text, refs)
+        return blob_hash
+
+    async def acquire_blobs(self, texts: Sequence[str]) -> List[str]:
+        """为一批新关键帧版本登记 blob (一条多行 upsert), 返回与 texts 一一对应的哈希 (批量导入用).
+
+        同批内相同内容先合并计数, 避免同一语句内对同一行重复 upsert; 不写入内容缓存以限制内存。
+        """
+        hashes = [content_hash(text) for text in texts]
+        merged: Dict[str, Dict[str, Any]] = {}
+        now = get_now_time()
+        for blob_hash, text in zip(hashes, texts):
+            row = merged.get(blob_hash)
+            if row is None:
+                merged[blob_hash] = {
+                    "hash": blob_hash, "content": text, "size": len(text.encode("utf-8")),
+                    "ref_count": 1, "create_at": now,
+                }
+            else:
+                row["ref_count"] += 1
+        if merged:
+            blob_table = DocumentBlobSQLEntity.__table__
+            stmt = pg_insert(blob_table).values(list(merged.values()))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[blob_table.c.hash],
+                set_={"ref_count": blob_table.c.ref_count + stmt.excluded.ref_count},
+            )
+            await self.session.execute(stmt)
+        return hashes
+
+    async def new_version(
+        self,
+        version: DocumentVersionSQLEntity,
+        text: str,
+        base: Optional[DocumentVersionSQLEntity],
+    ) -> None:
+        """为新建的版本写入内容, base 为其派生来源(通常是当前版本)."""
+        base_text = await self.get_text(base) if base is not None else None
+        await self._store(version, text, base, base_text)
+
+    async def rechain(self, versions: Sequence[tuple[DocumentVersionSQLEntity, str]]) -> None:
+        """按给定顺序(通常为创建时间)重建同一节点的增量链, 内容由调用方提供."""
+        base: Optional[DocumentVersionSQLEntity] = None
+        base_text: Optional[str] = None
+        for version, text in versions:
+            await self._store(version, text, base, base_text)
+            base, base_text = version, text
+
+    async def materialize(self, version: DocumentVersionSQLEntity, text: str) -> None:
+        """将版本转为关键帧."""
+        await self._store(version, text, None, None)
+
+    async def _dependents(self, version: DocumentVersionSQLEntity) -> List[DocumentVersionSQLEntity]:
+        stmt = select(DocumentVersionSQLEntity).where(
+            DocumentVersionSQLEntity.base_version_id == version.id,
+            DocumentVersionSQLEntity.storage_type == VersionStorageEnum.DELTA.value,
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def set_text(self, version: DocumentVersionSQLEntity, text: str) -> None:
+        """原地修改版本内容; 以该版本为基准的增量会重新挂接到新内容上."""
+        dependents = await self._dependents(version)
+        dependent_texts = [(dep, await self.get_text(dep)) for dep in dependents]
+
+        base = None
+        base_text = None
+        if version.storage_type == VersionStorageEnum.DELTA.value and version.base_version_id:
+            base = await self.session.get(DocumentVersionSQLEntity, version.base_version_id)
+            if base is not None:
+                base_text = await self.get_text(base)
+        await self._store(version, text, base, base_text)
+
+        for dep, dep_text in dependent_texts:
+            await self._store(dep, dep_text, version, text)
+
+    async def detach(self, version: DocumentVersionSQLEntity) -> None:
+        """删除版本前调用: 将以其为基准的增量挂接到它的基准上(或转为关键帧), 并释放其 blob 引用."""
+        dependents = await self._dependents(version)
+        base = None
+        base_text = None
+        if dependents and version.storage_type == VersionStorageEnum.DELTA.value and version.base_version_id:
+            base = await self.session.get(DocumentVersionSQLEntity, version.base_version_id)
+            if base is not None:
+                base_text = await self.get_text(base)
+        for dep in dependents:
+            dep_text = await self.get_text(dep)
+            await self._store(dep, dep_text, base, base_text)
+        await self._release_blob(version.blob_hash)
+
+
+async def get_version_storage_stats(session: AsyncSession) -> Dict[str, int]:
+    """统计版本正文的实际存储占用 (字节)."""
+    inline_bytes = await session.scalar(
+        select(func.coalesce(func.sum(
+            func.octet_length(DocumentVersionSQLEntity.full_text)
+            + func.coalesce(func.octet_length(cast(DocumentVersionSQLEntity.delta, TEXT)), 0)
+        ), 0))
+    )
+    blob_bytes = await session.scalar(
+        select(func.coalesce(func.sum(DocumentBlobSQLEntity.size), 0))
+    )
+    blob_count = await session.scalar(select(func.count()).select_from(DocumentBlobSQLEntity))
+    return {
+        "inline_bytes": int(inline_bytes or 0),
+        "blob_bytes": int(blob_bytes or 0),
+        "blob_count": int(blob_count or 0),
+    }
@@ -0,0 +1,104 @@
+"""Word Count Rollup Module.
+
+字数汇总的增量维护:
+- node.word_count: 文档为当前版本字数, 文件夹为子树内全部文档当前版本字数之和;
+- work.word_count: 作品内全部文档当前版本字数之和。
+当前版本字数变化时, 沿闭包表对自身及全部祖先做原子的 `word_count + delta`;
+移动子树时从旧祖先减去、向新祖先加上子树合计; 删除子树时从祖先与作品减去。
+字数统计口径见 common.utils.word_count。
+"""
+from uuid import UUID
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from infrastructure.pg.pg_models import (
+    DocumentVersionSQLEntity,
+    NodeClosureSQLEntity,
+    NodeSQLEntity,
+    WorkSQLEntity,
+)
+
+closure = NodeClosureSQLEntity.__table__
+node_table = NodeSQLEntity.__table__
+work_table = WorkSQLEntity.__table__
+version_table = DocumentVersionSQLEntity.__table__
+
+
+class WordCountRollup:
+    """文件夹/作品字数汇总."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def _ancestor_ids(self, node_id: UUID | str, include_self: bool):
+        stmt = select(closure.c.ancestor_id).where(closure.c.descendant_id == node_id)
+        if not include_self:
+            stmt = stmt.where(closure.c.depth > 0)
+        return stmt
+
+    async def _add_to_nodes(self, node_id: UUID | str, delta, include_self: bool) -> None:
+        await self.session.execute(
+            update(node_table)
+            .where(node_table.c.id.in_(self._ancestor_ids(node_id, include_self)))
+            .values(word_count=node_table.c.word_count + delta)
+        )
+
+    async def _add_to_work(self, work_id: UUID | str, delta) -> None:
+        await self.session.execute(
+            update(work_table)
+            .where(work_table.c.id == work_id)
+            .values(word_count=work_table.c.word_count + delta, revision=work_table.c.revision + 1)
+        )
+
+    def _subtree_total(self, node_id: UUID | str):
+        # 使用别名, 避免在 UPDATE node 中被关联为外层行
+        root = node_table.alias("subtree_root")
+        return select(root.c.word_count).where(root.c.id == node_id).scalar_subquery()
+
+    async def document_changed(self, work_id: UUID | str, node_id: UUID | str, delta: int) -> None:
+        """文档当前版本字数变化 delta (内容保存/切换版本/删除当前版本)."""
+        if not delta:
+            return
+        await self._add_to_nodes(node_id, delta, include_self=True)
+        await self._add_to_work(work_id, delta)
+
+    async def subtree_detaching(self, node_id: UUID | str) -> None:
+        """移动前调用: 从旧祖先减去子树合计 (需在闭包行变更之前)."""
+        await self._add_to_nodes(node_id, -self._subtree_total(node_id), include_self=False)
+
+    async def subtree_attached(self, node_id: UUID | str) -> None:
+        """移动后调用: 向新祖先加上子树合计 (需在闭包行变更之后)."""
+        await self._add_to_nodes(node_id, self._subtree_total(node_id), include_self=False)
+
+    async def subtree_deleting(self, work_id: UUID | str, node_id: UUID | str) -> None:
+        """删除子树前调用: 从祖先与作品减去子树合计."""
+        total = self._subtree_total(node_id)
+        await self._add_to_work(work_id, -total)
+        await self._add_to_nodes(node_id, -total, include_self=False)
+
+    async def recompute_work(self, work_id: UUID | str) -> None:
+        """按当前版本字数整体重算一部作品 (批量改动目录结构后使用, 两条语句)."""
+        descendant = node_table.alias("descendant")
+        totals = select(
+            closure.c.ancestor_id,
+            func.coalesce(func.sum(version_table.c.word_count), 0).label("total"),
+        ).select_from(closure)\
+            .join(descendant, descendant.c.id == closure.c.descendant_id)\
+            .outerjoin(version_table, version_table.c.id == descendant.c.now_version_id)\
+            .where(closure.c.work_id == work_id)\
+            .group_by(closure.c.ancestor_id)\
+            .subquery("totals")
+        await self.session.execute(
+            update(node_table)
+            .where(node_table.c.id == totals.c.ancestor_id)
+            .values(word_count=totals.c.total)
+        )
+        work_total = select(func.coalesce(func.sum(version_table.c.word_count), 0))\
+            .select_from(node_table)\
+            .join(version_table, version_table.c.id == node_table.c.now_version_id)\
+            .where(node_table.c.work_id == work_id)\
+            .scalar_subquery()
+        await self.session.execute(
+            update(work_table).where(work_table.c.id == work_id).values(word_count=work_total)
+        )
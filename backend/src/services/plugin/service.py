@@ -19,6 +19,7 @@ from common.enums import LoaderType, PluginFromTypeEnum
 from common.errors import ResourceNotFoundError
 from core.plugin.runtime import PluginInternalRegistry
 from core.plugin.di import DependencyInfo
+from infrastructure.pg.pg_client import fetch_projection
 from infrastructure.pg.pg_models import PluginSQLEntity
 
 
@@ -30,9 +31,12 @@ class PluginService:
 
     async def get_plugin_list(self) -> List[PluginMetaResponse]:
         """获取所有插件列表."""
-        stmt = select(PluginSQLEntity)
-        result = await self.session.execute(stmt)
-        plugins = result.scalars().all()
+        plugin_table = PluginSQLEntity.__table__
+        stmt = select(
+            plugin_table.c.id, plugin_table.c.name, plugin_table.c.version,
+            plugin_table.c.description, plugin_table.c.enabled,
+        )
+        plugins = await fetch_projection(self.session, stmt)
         
         return [
             PluginMetaResponse(
@@ -81,15 +85,18 @@ class PluginService:
 
     async def get_expand_plugins(self) -> List[PluginMetaResponse]:
         """获取扩展插件列表 (SYSTEM, OFFICIAL, CUSTOM)."""
-        stmt = select(PluginSQLEntity).where(
-            PluginSQLEntity.from_type.in_([
+        plugin_table = PluginSQLEntity.__table__
+        stmt = select(
+            plugin_table.c.id, plugin_table.c.name, plugin_table.c.version,
+            plugin_table.c.description, plugin_table.c.enabled,
+        ).where(
+            plugin_table.c.from_type.in_([
                 PluginFromTypeEnum.SYSTEM.value,
                 PluginFromTypeEnum.OFFICIAL.value,
                 PluginFromTypeEnum.CUSTOM.value
             ])
         )
-        result = await self.session.execute(stmt)
-        plugins = result.scalars().all()
+        plugins = await fetch_projection(self.session, stmt)
         
         return [
             PluginMetaResponse(
@@ -0,0 +1,253 @@
+"""Work Export Module.
+
+整部作品的流式导出 (txt / markdown / epub 结构的 zip):
+以服务端游标按先序遍历读取目录, 每批节点一次取回当前版本正文, 逐段编码为字节块产出;
+内存占用只与单批大小有关 (epub 额外保留每章的标题与文件名, 用于最后写入目录与清单)。
+"""
+import html
+import io
+import re
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.config import settings
+from common.enums import ExportFormatEnum, NodeTypeEnum
+from common.errors import ResourceNotFoundError
+from infrastructure.pg.pg_models import WorkSQLEntity
+from services.node.closure_store import NodeClosureStore
+from services.node.version_store import DocumentVersionStore
+
+# 正文可能是编辑器输出的 HTML, 也可能是导入/Agent 写入的纯文本
+_BLOCK_BREAK = re.compile(r"<br\s*/?>|</(?:p|div|li|blockquote|h[1-6])\s*>", re.IGNORECASE)
+_TAG = re.compile(r"<[^>]+>")
+
+MEDIA_TYPES = {
+    ExportFormatEnum.TXT: "text/plain; charset=utf-8",
+    ExportFormatEnum.MARKDOWN: "text/markdown; charset=utf-8",
+    ExportFormatEnum.EPUB: "application/epub+zip",
+}
+FILE_EXTENSIONS = {
+    ExportFormatEnum.TXT: "txt",
+    ExportFormatEnum.MARKDOWN: "md",
+    ExportFormatEnum.EPUB: "epub",
+}
+
+
+def content_paragraphs(content: Optional[str]) -> List[str]:
+    """将正文拆为段落 (HTML 去标签并还原实体), 去除空行与首尾空白."""
+    if not content:
+        return []
+    if _TAG.search(content):
+        content = html.unescape(_TAG.sub("", _BLOCK_BREAK.sub("\n", content)))
+    return [line.strip() for line in content.split("\n") if line.strip()]
+
+
+@dataclass
+class ExportEntry:
+    """导出顺序中的一个节点及其正文."""
+    id: UUID
+    name: str
+    is_document: bool
+    depth: int
+    paragraphs: List[str]
+
+
+class _ZipSink(io.RawIOBase):
+    """zipfile 的不可回退写入目标: 写入的数据暂存, 由调用方取走后发送."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
+
+
+class WorkExporter:
+    """按目录顺序流式导出作品."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.closure_store = NodeClosureStore(session)
+        self.version_store = DocumentVersionStore(session)
+
+    async def get_work_name(self, work_id: str) -> str:
+        name = await self.session.scalar(
+            select(WorkSQLEntity.name).where(WorkSQLEntity.id == work_id, WorkSQLEntity.deleted_at.is_(None))
+        )
+        if name is None:
+            raise ResourceNotFoundError(f"Work not found: {work_id}")
+        return name
+
+    async def entries(self, work_id: str) -> AsyncIterator[ExportEntry]:
+        """服务端游标逐批读取目录, 每批一条语句取回文档的当前版本正文."""
+        stmt = self.closure_store.preorder(work_id)\
+            .execution_options(yield_per=settings.WORK_EXPORT_BATCH_SIZE)
+        result = await self.session.stream(stmt)
+        async for rows in result.partitions():
+            texts = await self.version_store.get_texts([
+                row.now_version_id for row in rows
+                if row.node_type == NodeTypeEnum.DOCUMENT.value and row.now_version_id is not None
+            ])
+            for row in rows:
+                yield self._entry(row, texts)
+
+    @staticmethod
+    def _entry(row: Row, texts: dict) -> ExportEntry:
+        is_document = row.node_type == NodeTypeEnum.DOCUMENT.value
+        return ExportEntry(
+            id=row.id,
+            name=row.name,
+            is_document=is_document,
+            depth=row.depth,
+            paragraphs=content_paragraphs(texts.get(row.now_version_id)) if is_document else [],
+        )
+
+    async def export(self, work_id: str, work_name: str, export_format: ExportFormatEnum) -> AsyncIterator[bytes]:
+        """按格式产出字节块 (已按 WORK_EXPORT_FLUSH_BYTES 合并)."""
+        writers = {
+            ExportFormatEnum.TXT: self._txt,
+            ExportFormatEnum.MARKDOWN: self._markdown,
+            ExportFormatEnum.EPUB: self._epub,
+        }
+        async for chunk in writers[export_format](work_id, work_name):
+            yield chunk
+
+    async def _buffered(self, parts: AsyncIterator[str]) -> AsyncIterator[bytes]:
+        buffer: List[bytes] = []
+        size = 0
+        async for part in parts:
+            data = part.encode("utf-8")
+            buffer.append(data)
+            size += len(data)
+            if size >= settings.WORK_EXPORT_FLUSH_BYTES:
+                yield b"".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield b"".join(buffer)
+
+    async def _txt(self, work_id: str, work_name: str) -> AsyncIterator[bytes]:
+        async def parts() -> AsyncIterator[str]:
+            yield f"{work_name}\n\n"
+            async for entry in self.entries(work_id):
+                yield f"\n{entry.name}\n\n"
+                for paragraph in entry.paragraphs:
+                    yield f"　　{paragraph}\n"
+        async for chunk in self._buffered(parts()):
+            yield chunk
+
+    async def _markdown(self, work_id: str, work_name: str) -> AsyncIterator[bytes]:
+        async def parts() -> AsyncIterator[str]:
+            yield f"# {work_name}\n\n"
+            async for entry in self.entries(work_id):
+                yield f"{'#' * min(entry.depth + 2, 6)} {entry.name}\n\n"
+                for paragraph in entry.paragraphs:
+                    yield f"{paragraph}\n\n"
+        async for chunk in self._buffered(parts()):
+            yield chunk
+
+    async def _epub(self, work_id: str, work_name: str) -> AsyncIterator[bytes]:
+        """EPUB 3 结构的 zip: 每个节点一个 xhtml, 目录与清单在最后写入 (zip 条目顺序只要求 mimetype 在首位)."""
+        sink = _ZipSink()
+        toc: List[Tuple[str, str, int]] = []
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+            archive.writestr("META-INF/container.xml", _CONTAINER_XML)
+            async for entry in self.entries(work_id):
+                href = f"text/{len(toc) + 1:05d}.xhtml"
+                toc.append((href, entry.name, entry.depth))
+                archive.writestr(f"OEBPS/{href}", _chapter_xhtml(entry))
+                if sink.size >= settings.WORK_EXPORT_FLUSH_BYTES:
+                    yield sink.drain()
+            archive.writestr("OEBPS/nav.xhtml", _nav_xhtml(work_name, toc))
+            archive.writestr("OEBPS/content.opf", _package_opf(work_id, work_name, toc))
+        yield sink.drain()
+
+
+_CONTAINER_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+
+def _xhtml(title: str, body: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" xml:lang="zh-CN">\n'
+        f"<head><title>{html.escape(title)}</title></head>\n<body>\n{body}</body>\n</html>\n"
+    )
+
+
+def _chapter_xhtml(entry: ExportEntry) -> str:
+    level = min(entry.depth + 1, 6)
+    lines = [f"<h{level}>{html.escape(entry.name)}</h{level}>\n"]
+    lines.extend(f"<p>{html.escape(paragraph)}</p>\n" for paragraph in entry.paragraphs)
+    return _xhtml(entry.name, "".join(lines))
+
+
+def _nav_items(toc: List[Tuple[str, str, int]]) -> Iterator[str]:
+    """按深度将扁平的先序目录还原为嵌套的 <ol>."""
+    depth = -1
+    for href, name, entry_depth in toc:
+        # 深度跳级 (异常数据) 时按一级处理, 保证标签嵌套合法
+        entry_depth = min(entry_depth, depth + 1)
+        if entry_depth > depth:
+            yield "<ol>\n" * (entry_depth - depth)
+        else:
+            yield "</li>\n" + "</ol>\n</li>\n" * (depth - entry_depth)
+        yield f'<li><a href="{href}">{html.escape(name)}</a>'
+        depth = entry_depth
+    if depth >= 0:
+        yield "</li>\n" + "</ol>\n</li>\n" * depth + "</ol>\n"
+
+
+def _nav_xhtml(work_name: str, toc: List[Tuple[str, str, int]]) -> str:
+    items = "".join(_nav_items(toc)) or "<ol><li><a href=\"nav.xhtml\">目录</a></li></ol>\n"
+    return _xhtml(work_name, f'<nav epub:type="toc" id="toc">\n<h1>{html.escape(work_name)}</h1>\n{items}</nav>\n')
+
+
+def _package_opf(work_id: str, work_name: str, toc: List[Tuple[str, str, int]]) -> str:
+    manifest = "".join(
+        f'    <item id="n{i}" href="{href}" media-type="application/xhtml+xml"/>\n'
+        for i, (href, _, _) in enumerate(toc, 1)
+    )
+    spine = "".join(f'    <itemref idref="n{i}"/>\n' for i in range(1, len(toc) + 1)) or '    <itemref idref="nav"/>\n'
+    modified = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id" xml:lang="zh-CN">\n'
+        '  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+        f'    <dc:identifier id="book-id">urn:uuid:{work_id}</dc:identifier>\n'
+        f"    <dc:title>{html.escape(work_name)}</dc:title>\n"
+        "    <dc:language>zh-CN</dc:language>\n"
+        f'    <meta property="dcterms:modified">{modified}</meta>\n'
+        "  </metadata>\n"
+        "  <manifest>\n"
+        '    <item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>\n'
+        f"{manifest}"
+        "  </manifest>\n"
+        "  <spine>\n"
+        f"{spine}"
+        "  </spine>\n"
+        "</package>\n"
+    )
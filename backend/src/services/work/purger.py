@@ -0,0 +1,234 @@
+"""Work Purger Module.
+
+已删除 (置墓碑) 作品的后台分批清除:
+每次只对一个作品的当前阶段删除至多 WORK_PURGE_BATCH_SIZE 行并立即提交, 单个事务持锁时间有界,
+不会长时间阻塞其他写入; 进度与阶段记录在 work_purge 行中, 进程重启后从当前阶段继续 (各阶段均可重入)。
+阶段顺序: 闭包行 -> 父子边 -> 文档版本 (释放 blob 引用) -> 节点 -> 插件映射与作品行。
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.config import settings
+from common.enums import WorkPurgePhaseEnum
+from common.utils.utils import get_now_time
+from infrastructure.pg.pg_client import job_session
+from infrastructure.pg.pg_models import (
+    DocumentVersionSQLEntity,
+    NodeClosureSQLEntity,
+    NodeRelationshipSQLEntity,
+    NodeSQLEntity,
+    WorkPluginMappingSQLEntity,
+    WorkPurgeSQLEntity,
+    WorkSQLEntity,
+)
+from services.node.version_store import DocumentVersionStore
+
+logger = logging.getLogger(__name__)
+
+closure = NodeClosureSQLEntity.__table__
+relationship = NodeRelationshipSQLEntity.__table__
+node_table = NodeSQLEntity.__table__
+version_table = DocumentVersionSQLEntity.__table__
+
+_NEXT_PHASE = {
+    WorkPurgePhaseEnum.CLOSURE: WorkPurgePhaseEnum.RELATIONSHIPS,
+    WorkPurgePhaseEnum.RELATIONSHIPS: WorkPurgePhaseEnum.VERSIONS,
+    WorkPurgePhaseEnum.VERSIONS: WorkPurgePhaseEnum.NODES,
+    WorkPurgePhaseEnum.NODES: WorkPurgePhaseEnum.FINALIZE,
+}
+
+
+class WorkPurger:
+    """执行一批作品清除."""
+
+    def __init__(self, session: AsyncSession, batch_size: int | None = None):
+        self.session = session
+        self.batch_size = batch_size or settings.WORK_PURGE_BATCH_SIZE
+        self.version_store = DocumentVersionStore(session)
+        # 本批认领的作品, 失败时用于记录原因
+        self.work_id = None
+
+    async def _delete_closure(self, work_id) -> int:
+        batch = select(closure.c.ancestor_id, closure.c.descendant_id)\
+            .where(closure.c.work_id == work_id)\
+            .limit(self.batch_size)
+        result = await self.session.execute(
+            delete(closure).where(tuple_(closure.c.ancestor_id, closure.c.descendant_id).in_(batch))
+        )
+        return result.rowcount
+
+    async def _delete_relationships(self, work_id) -> int:
+        batch = select(relationship.c.id).where(relationship.c.work_id == work_id).limit(self.batch_size)
+        result = await self.session.execute(delete(relationship).where(relationship.c.id.in_(batch)))
+        return result.rowcount
+
+    async def _delete_versions(self, work_id) -> int:
+        version_ids = (await self.session.execute(
+            select(version_table.c.id)
+            .join(node_table, node_table.c.id == version_table.c.node_id)
+            .where(node_table.c.work_id == work_id)
+            .limit(self.batch_size)
+        )).scalars().all()
+        if not version_ids:
+            return 0
+        # node.now_version_id 外键为 ON DELETE SET NULL, 删除版本时自动解除引用
+        await self.version_store.release_versions(version_table.c.id.in_(version_ids))
+        result = await self.session.execute(delete(version_table).where(version_table.c.id.in_(version_ids)))
+        await self.version_store.flush()
+        return result.rowcount
+
+    async def _delete_nodes(self, work_id) -> int:
+        batch = select(node_table.c.id).where(node_table.c.work_id == work_id).limit(self.batch_size)
+        result = await self.session.execute(delete(node_table).where(node_table.c.id.in_(batch)))
+        return result.rowcount
+
+    async def _finalize(self, work_id) -> bool:
+        """删除插件映射与作品行; 若清除期间仍有节点写入 (极少见), 返回 False 以从头再清一轮."""
+        remaining = await self.session.scalar(select(node_table.c.id).where(node_table.c.work_id == work_id).limit(1))
+        if remaining is not None:
+            return False
+        await self.session.execute(
+            delete(WorkPluginMappingSQLEntity).where(WorkPluginMappingSQLEntity.work_id == work_id)
+        )
+        await self.session.execute(delete(WorkSQLEntity).where(WorkSQLEntity.id == work_id))
+        return True
+
+    async def _count_totals(self, purge: WorkPurgeSQLEntity) -> None:
+        purge.total_nodes = await self.session.scalar(
+            select(func.count()).select_from(node_table).where(node_table.c.work_id == purge.work_id)
+        )
+        purge.total_versions = await self.session.scalar(
+            select(func.count())
+            .select_from(version_table)
+            .join(node_table, node_table.c.id == version_table.c.node_id)
+            .where(node_table.c.work_id == purge.work_id)
+        )
+
+    async def step(self) -> bool:
+        """认领一个未完成的清除任务并执行一批, 提交后返回; 没有待清除的作品时返回 False.
+
+        按 update_at 认领最久未推进的任务, 多个作品轮流推进, 反复失败的任务不会一直挡在队首;
+        认领使用 FOR UPDATE SKIP LOCKED, 多个进程同时运行时互不阻塞。
+        """
+        purge: Optional[WorkPurgeSQLEntity] = (await self.session.execute(
+            select(WorkPurgeSQLEntity)
+            .where(WorkPurgeSQLEntity.finished_at.is_(None))
+            .order_by(WorkPurgeSQLEntity.update_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )).scalar_one_or_none()
+        if purge is None:
+            await self.session.rollback()
+            return False
+        self.work_id = purge.work_id
+
+        if purge.total_nodes is None:
+            await self._count_totals(purge)
+
+        phase = WorkPurgePhaseEnum(purge.phase)
+        deleted = 0
+        if phase == WorkPurgePhaseEnum.CLOSURE:
+            deleted = await self._delete_closure(purge.work_id)
+            purge.deleted_closure_rows += deleted
+        elif phase == WorkPurgePhaseEnum.RELATIONSHIPS:
+            deleted = await self._delete_relationships(purge.work_id)
+            purge.deleted_relationships += deleted
+        elif phase == WorkPurgePhaseEnum.VERSIONS:
+            deleted = await self._delete_versions(purge.work_id)
+            purge.deleted_versions += deleted
+        elif phase == WorkPurgePhaseEnum.NODES:
+            deleted = await self._delete_nodes(purge.work_id)
+            purge.deleted_nodes += deleted
+
+        now = get_now_time()
+        if phase == WorkPurgePhaseEnum.FINALIZE:
+            if await self._finalize(purge.work_id):
+                purge.phase = WorkPurgePhaseEnum.DONE.value
+                purge.finished_at = now
+            else:
+                purge.phase = WorkPurgePhaseEnum.CLOSURE.value
+        elif deleted < self.batch_size:
+            # 不足一批说明该阶段已清空
+            purge.phase = _NEXT_PHASE[phase].value
+        purge.batches += 1
+        purge.last_error = None
+        purge.update_at = now
+        await self.session.commit()
+        if purge.finished_at is not None:
+            logger.info(
+                f"[WorkPurge] work_id={purge.work_id} done: nodes={purge.deleted_nodes}, "
+                f"versions={purge.deleted_versions}, batches={purge.batches}"
+            )
+        return True
+
+
+async def _record_error(work_id, error: Exception) -> None:
+    """记录失败原因 (失败批次已回滚, 下次轮询重试)."""
+    async with job_session() as session:
+        purge = await session.get(WorkPurgeSQLEntity, work_id)
+        if purge is not None:
+            purge.last_error = str(error)[:1000]
+            purge.update_at = get_now_time()
+            await session.commit()
+
+
+class WorkPurgeWorker:
+    """应用内的后台清除循环: 有任务时逐批执行 (批间短暂让出), 空闲时等待唤醒或定时轮询."""
+
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def wake(self) -> None:
+        """登记新的清除任务后调用, 立即开始处理."""
+        self._wakeup.set()
+
+    async def _drain(self) -> None:
+        while True:
+            async with job_session() as session:
+                purger = WorkPurger(session)
+                try:
+                    if not await purger.step():
+                        return
+                except Exception as e:
+                    logger.exception(f"[WorkPurge] work_id={purger.work_id} batch failed")
+                    await session.rollback()
+                    if purger.work_id is not None:
+                        await _record_error(purger.work_id, e)
+                    return
+            await asyncio.sleep(settings.WORK_PURGE_BATCH_PAUSE)
+
+    async def run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                await self._drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("[WorkPurge] purge loop failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.WORK_PURGE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(), name="work-purge")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+work_purge_worker = WorkPurgeWorker()
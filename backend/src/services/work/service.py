@@ -1,8 +1,9 @@
 """Work Service Module."""
+from datetime import datetime
 from typing import List, Sequence, Tuple
 from uuid import UUID
 
-from sqlalchemy import and_, delete, select
+from sqlalchemy import and_, select, tuple_, update
 from sqlalchemy.engine import Result, Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -14,9 +15,11 @@ from api.routes.work.schema import (
     WorkDetailResponse,
     WorkMetaDTO,
     WorkMetaResponse,
+    WorkListPage,
     WorkMetaUpdateRequest,
     WorkPluginDetailResponse,
     WorkPluginMetaResponse,
+    WorkPurgeResponse,
 )
 from common.enums import (
     NodeTypeEnum,
@@ -24,17 +27,26 @@ from common.enums import (
     WorkStateEnum,
     WorkTypeEnum,
 )
-from common.errors import PluginNotFoundError, ResourceNotFoundError
-from common.utils.utils import get_now_time
+from common.config import settings
+from common.errors import InvalidCursorError, PluginNotFoundError, ResourceNotFoundError
+from common.utils.utils import decode_cursor, encode_cursor, get_now_time
+from infrastructure.pg.pg_client import bump_revision, fetch_projection, replica_read
 from infrastructure.pg.pg_models import (
-    DocumentVersionSQLEntity,
     NodeRelationshipSQLEntity,
     NodeSQLEntity,
     PluginSQLEntity,
     WorkPluginMappingSQLEntity,
+    WorkPurgeSQLEntity,
     WorkSQLEntity,
 )
+from services.node.autosave import autosave_buffer
+from services.node.collab import collab_hub
 
+_STATE_TO_DB = {
+    WorkStateCNEnum.UPDATING: WorkStateEnum.UPDATING.value,
+    WorkStateCNEnum.COMPLETED: WorkStateEnum.COMPLETED.value,
+}
+_STATE_TO_CN = {db: cn for cn, db in _STATE_TO_DB.items()}
 
 class WorkService:
     """作品服务类."""
@@ -93,50 +105,82 @@ class WorkService:
         )
 
     async def delete_work(self, work_id: str) -> None:
-        """删除作品."""
-        stmt = select(WorkSQLEntity).where(WorkSQLEntity.id == work_id)
-        result = await self.session.execute(stmt)
-        work = result.scalar_one_or_none()
-        
-        if not work:
+        """删除作品: 置墓碑并登记清除任务后立即返回, 数据由后台 WorkPurger 分批删除 (见 services.work.purger)."""
+        work_table = WorkSQLEntity.__table__
+        now = get_now_time()
+        work_name = (await self.session.execute(
+            update(work_table)
+            .where(work_table.c.id == work_id, work_table.c.deleted_at.is_(None))
+            .values(deleted_at=now, revision=work_table.c.revision + 1)
+            .returning(work_table.c.name)
+        )).scalar_one_or_none()
+        if work_name is None:
             raise ResourceNotFoundError(f"Work not found: {work_id}")
 
-        
-        # 1. 删除依赖的插件映射
-        await self.session.execute(
-            delete(WorkPluginMappingSQLEntity).where(WorkPluginMappingSQLEntity.work_id == work_id)
-        )
-        
-        # 2. 删除依赖的节点关系
-        await self.session.execute(
-            delete(NodeRelationshipSQLEntity).where(NodeRelationshipSQLEntity.work_id == work_id)
-        )
-        
-        # 3. 删除依赖的文档版本 (通过节点关联)
-        nodes_subquery = select(NodeSQLEntity.id).where(NodeSQLEntity.work_id == work_id)
-        await self.session.execute(
-            delete(DocumentVersionSQLEntity).where(DocumentVersionSQLEntity.node_id.in_(nodes_subquery))
-        )
-        
-        # 4. 删除依赖的节点
-        await self.session.execute(
-            delete(NodeSQLEntity).where(NodeSQLEntity.work_id == work_id)
-        )
-            
-        # 6. Delete Work
-        await self.session.delete(work)
+        self.session.add(WorkPurgeSQLEntity(work_id=work_id, work_name=work_name, requested_at=now, update_at=now))
         await self.session.commit()
+        await collab_hub.close_work(work_id, "作品已删除")
+        autosave_buffer.discard_work(work_id)
 
-    async def get_work_list(self) -> List[WorkMetaResponse]:
-        """获取作品列表."""
-        stmt = select(WorkSQLEntity).order_by(WorkSQLEntity.update_at.desc())
-        result = await self.session.execute(stmt)
-        works = result.scalars().all()
-        return [WorkMetaResponse(meta=self._to_meta_dto(w)) for w in works]
+    async def get_work_purge(self, work_id: str) -> WorkPurgeResponse:
+        """获取已删除作品的后台清除进度."""
+        purge = await self.session.get(WorkPurgeSQLEntity, work_id)
+        if purge is None:
+            raise ResourceNotFoundError(f"Work purge not found: {work_id}")
+        return WorkPurgeResponse.model_validate(purge, from_attributes=True)
+
+    @replica_read
+    async def get_work_list(
+        self,
+        cursor: str | None = None,
+        limit: int | None = None,
+        state: WorkStateCNEnum | None = None,
+        work_type: WorkTypeEnum | None = None,
+    ) -> WorkListPage:
+        """获取作品列表: 按 (update_at, id) 倒序键集分页, 可按状态/类型过滤."""
+        limit = min(limit or settings.WORK_LIST_PAGE_SIZE, settings.WORK_LIST_MAX_PAGE_SIZE)
+        work_table = WorkSQLEntity.__table__
+        stmt = select(
+            work_table.c.id,
+            work_table.c.cover_image_url,
+            work_table.c.name,
+            work_table.c.summary,
+            work_table.c.state,
+            work_table.c.work_type,
+            work_table.c.word_count,
+            work_table.c.revision,
+            work_table.c.create_at,
+            work_table.c.update_at,
+        )
+        stmt = stmt.where(work_table.c.deleted_at.is_(None))
+        if state is not None:
+            stmt = stmt.where(work_table.c.state == _STATE_TO_DB[state])
+        if work_type is not None:
+            stmt = stmt.where(work_table.c.work_type == work_type.value)
+        if cursor:
+            update_at, last_id = decode_cursor(cursor, 2)
+            try:
+                after = (datetime.fromisoformat(update_at), UUID(str(last_id)))
+            except (TypeError, ValueError) as e:
+                raise InvalidCursorError(cursor) from e
+            stmt = stmt.where(tuple_(work_table.c.update_at, work_table.c.id) < tuple_(*after))
+        # 多取一条判断是否还有下一页
+        stmt = stmt.order_by(work_table.c.update_at.desc(), work_table.c.id.desc()).limit(limit + 1)
+        works = await fetch_projection(self.session, stmt)
+
+        next_cursor = None
+        if len(works) > limit:
+            works = works[:limit]
+            next_cursor = encode_cursor(works[-1].update_at.isoformat(), works[-1].id)
+        return WorkListPage(
+            items=[WorkMetaResponse.model_construct(meta=self._to_meta_dto(w, validate=False)) for w in works],
+            next_cursor=next_cursor,
+        )
 
+    @replica_read
     async def get_work_detail(self, work_id: str) -> WorkDetailResponse:
         """获取作品详情（含目录树和关系）."""
-        stmt = select(WorkSQLEntity).where(WorkSQLEntity.id == work_id)
+        stmt = select(WorkSQLEntity).where(WorkSQLEntity.id == work_id, WorkSQLEntity.deleted_at.is_(None))
         result = await self.session.execute(stmt)
         work = result.scalar_one_or_none()
         
@@ -167,8 +211,10 @@ class WorkService:
                     id=n.id,
                     name=n.name,
                     type=NodeTypeEnum(n.node_type),
+                    word_count=n.word_count,
                     description=n.description,
-                    now_version=n.now_version
+                    now_version=n.now_version,
+                    now_version_id=n.now_version_id
                 ) for n in nodes
             ],
             relationship=[
@@ -179,14 +225,25 @@ class WorkService:
             ]
         )
     
-    async def update_work_meta(self, work_id: str, request: WorkMetaUpdateRequest) -> None:
-        """更新作品元数据."""
-        stmt = select(WorkSQLEntity).where(WorkSQLEntity.id == work_id)
+    @replica_read
+    async def get_work_revision(self, work_id: str) -> int | None:
+        """只读取作品修订号, 供条件 GET 判断 (不加载目录)."""
+        work_table = WorkSQLEntity.__table__
+        return await self.session.scalar(
+            select(work_table.c.revision).where(work_table.c.id == work_id, work_table.c.deleted_at.is_(None))
+        )
+
+    async def update_work_meta(
+        self, work_id: str, request: WorkMetaUpdateRequest, expected_revision: int | None = None
+    ) -> None:
+        """更新作品元数据; expected_revision 为 If-Match 的作品修订号."""
+        stmt = select(WorkSQLEntity).where(WorkSQLEntity.id == work_id, WorkSQLEntity.deleted_at.is_(None))
         result = await self.session.execute(stmt)
         work = result.scalar_one_or_none()
         
         if not work:
             raise ResourceNotFoundError(f"Work not found: {work_id}")
+        await bump_revision(self.session, WorkSQLEntity.__table__, work.id, expected_revision)
             
         if request.name is not None:
             work.name = request.name
@@ -204,20 +261,34 @@ class WorkService:
         work.update_at = get_now_time()
         await self.session.commit()
 
-    def _to_meta_dto(self, work: WorkSQLEntity) -> WorkMetaDTO:
-        return WorkMetaDTO(
+    def _to_meta_dto(self, work: WorkSQLEntity | Row, validate: bool = True) -> WorkMetaDTO:
+        # 列表路径下数据来自数据库, 类型已确定, 跳过 pydantic 校验直接构造
+        build = WorkMetaDTO if validate else WorkMetaDTO.model_construct
+        return build(
             id=work.id,
             cover_image_url=work.cover_image_url,
             name=work.name,
             summary=work.summary,
-            state=WorkStateCNEnum.COMPLETED if work.state == WorkStateEnum.COMPLETED.value else WorkStateCNEnum.UPDATING,           
+            state=_STATE_TO_CN.get(work.state, WorkStateCNEnum.UPDATING),
             type=WorkTypeEnum(work.work_type),
+            word_count=work.word_count,
+            revision=work.revision,
             create_at=work.create_at,
             update_at=work.update_at
         )
 
+    async def _require_work(self, work_id: str) -> None:
+        """作品存在且未被删除 (墓碑), 否则 404."""
+        work = await self.session.scalar(
+            select(WorkSQLEntity.id).where(WorkSQLEntity.id == work_id, WorkSQLEntity.deleted_at.is_(None))
+        )
+        if work is None:
+            raise ResourceNotFoundError(f"Work not found: {work_id}")
+
+    @replica_read
     async def get_work_plugins(self, work_id: str) -> List[WorkPluginMetaResponse]:
         """获取作品启用的插件列表 (包含配置)."""
+        await self._require_work(work_id)
         stmt = select(WorkPluginMappingSQLEntity).where(WorkPluginMappingSQLEntity.work_id == work_id)
         result = await self.session.execute(stmt)
         mappings = result.scalars().all()
@@ -246,6 +317,7 @@ class WorkService:
 
     async def update_work_plugin_config(self, work_id: str, plugin_id: str, request: UpdateWorkPluginRequest) -> WorkPluginDetailResponse:
         """更新作品的插件配置."""
+        await self._require_work(work_id)
         stmt = select(WorkPluginMappingSQLEntity).where(
             and_(
                 WorkPluginMappingSQLEntity.work_id == work_id,
@@ -287,6 +359,7 @@ class WorkService:
 
     async def get_work_plugin_detail(self, work_id: str, plugin_id: str) -> WorkPluginDetailResponse:
         """获取作品插件详情."""
+        await self._require_work(work_id)
         stmt = select(WorkPluginMappingSQLEntity).where(
             and_(
                 WorkPluginMappingSQLEntity.work_id == work_id,
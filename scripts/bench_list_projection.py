@@ -0,0 +1,145 @@
+"""
+基准脚本: 列表接口的投影查询 vs ORM 实体查询
+在一个事务内灌入大量数据(复用 verify_query_plans 的合成小说), 对比各列表接口:
+- 旧: select(Entity) 取整行并构建 ORM 实体;
+- 新: 服务方法中的 Core 投影查询 (fetch_projection)。
+输出平均耗时与 Python 侧内存峰值 (tracemalloc)。结束时回滚事务, 不会留下数据。
+
+用法:
+    python scripts/bench_list_projection.py [--works 5000] [--chapters 500] [--versions 40] [--memories 5000] [--iterations 5]
+"""
+import sys
+import argparse
+import asyncio
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from uuid import uuid4
+
+# Add backend/src to sys.path
+backend_src = Path(__file__).parent.parent / "backend" / "src"
+sys.path.insert(0, str(backend_src))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import desc, insert, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from common.config import settings
+from common.utils.utils import get_now_time
+from infrastructure.pg.pg_client import engine
+from infrastructure.pg.pg_models import (
+    DocumentVersionSQLEntity,
+    KnowledgeBaseSQLEntity,
+    MemorySQLEntity,
+    PluginSQLEntity,
+    WorkSQLEntity,
+)
+from plugin.kd.plugin import KDPlugin
+from plugin.memory.plugin import MemoryPlugin
+from services.node.service import NodeService
+from services.plugin.service import PluginService
+from services.work.service import WorkService
+from verify_query_plans import Fixture, seed
+
+WORK_LIST_MAX_PAGE_SIZE = settings.WORK_LIST_MAX_PAGE_SIZE
+
+BenchFunc = Callable[[AsyncSession, Fixture], Awaitable[Any]]
+
+
+async def _orm_list(session: AsyncSession, stmt) -> int:
+    result = await session.execute(stmt)
+    return len(result.scalars().all())
+
+
+CASES: Dict[str, Tuple[BenchFunc, BenchFunc]] = {
+    "get_work_list": (
+        lambda s, f: _orm_list(
+            s, select(WorkSQLEntity).order_by(WorkSQLEntity.update_at.desc()).limit(WORK_LIST_MAX_PAGE_SIZE)
+        ),
+        lambda s, f: WorkService(s).get_work_list(limit=WORK_LIST_MAX_PAGE_SIZE),
+    ),
+    "get_document_versions": (
+        lambda s, f: _orm_list(
+            s,
+            select(DocumentVersionSQLEntity)
+            .where(DocumentVersionSQLEntity.node_id == f.document_id)
+            .order_by(DocumentVersionSQLEntity.create_at.desc()),
+        ),
+        lambda s, f: NodeService(s).get_document_versions(f.document_id),
+    ),
+    "KDPlugin.get_kd_list": (
+        lambda s, f: _orm_list(s, select(KnowledgeBaseSQLEntity).order_by(desc(KnowledgeBaseSQLEntity.create_at))),
+        lambda s, f: KDPlugin(s).get_kd_list(),
+    ),
+    "MemoryPlugin.get_memory_list": (
+        lambda s, f: _orm_list(s, select(MemorySQLEntity)),
+        lambda s, f: MemoryPlugin(session=s).get_memory_list(),
+    ),
+    "PluginService.get_plugin_list": (
+        lambda s, f: _orm_list(s, select(PluginSQLEntity)),
+        lambda s, f: PluginService(s).get_plugin_list(),
+    ),
+}
+
+
+async def seed_memories(conn: AsyncConnection, count: int) -> None:
+    now = get_now_time()
+    rows = [
+        {
+            "id": uuid4(), "work_id": None, "title": f"记忆{i}", "description": None, "enabled": True,
+            "type": "long_term", "content": "长期记忆内容。" * 300, "tags": ["合成"],
+            "create_at": now, "update_at": now,
+        }
+        for i in range(count)
+    ]
+    for i in range(0, len(rows), 2000):
+        await conn.execute(insert(MemorySQLEntity.__table__), rows[i:i + 2000])
+
+
+async def _measure(conn: AsyncConnection, func: BenchFunc, fixture: Fixture, iterations: int) -> Tuple[float, float]:
+    elapsed: List[float] = []
+    peak = 0
+    for _ in range(iterations):
+        session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        tracemalloc.start()
+        start = time.perf_counter()
+        await func(session, fixture)
+        elapsed.append(time.perf_counter() - start)
+        _, current_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak = max(peak, current_peak)
+        await session.close()
+    return sum(elapsed) / len(elapsed) * 1000, peak / 1024 / 1024
+
+
+async def main(args: argparse.Namespace):
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            print(f"灌数中: works={args.works}, chapters={args.chapters}, versions={args.versions}, memories={args.memories} ...")
+            fixture = await seed(conn, args.works, args.chapters, args.versions)
+            await seed_memories(conn, args.memories)
+
+            print("=" * 84)
+            print(f"{'接口':<34}{'ORM(ms)':>10}{'投影(ms)':>10}{'ORM(MiB)':>10}{'投影(MiB)':>11}")
+            print("-" * 84)
+            for name, (legacy, current) in CASES.items():
+                legacy_ms, legacy_mib = await _measure(conn, legacy, fixture, args.iterations)
+                current_ms, current_mib = await _measure(conn, current, fixture, args.iterations)
+                print(f"{name:<34}{legacy_ms:>10.2f}{current_ms:>10.2f}{legacy_mib:>10.2f}{current_mib:>11.2f}")
+            print("=" * 84)
+            print("内存为 Python 侧分配峰值 (tracemalloc 开启时耗时会偏高, 仅用于横向对比)。")
+        finally:
+            await trans.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="列表接口投影查询基准")
+    parser.add_argument("--works", type=int, default=5000)
+    parser.add_argument("--chapters", type=int, default=500)
+    parser.add_argument("--versions", type=int, default=40)
+    parser.add_argument("--memories", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
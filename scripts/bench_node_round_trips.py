@@ -0,0 +1,180 @@
+"""
+基准脚本: 统计 NodeService 各接口的数据库往返次数与耗时
+对比旧实现(逐条查询 node / version / parent)与新的单次联合加载实现。
+
+用法:
+    python scripts/bench_node_round_trips.py <document_node_id> [iterations]
+
+注意: 写接口使用幂等参数(空更新、同内容保存、切换到当前版本), 除 update_at 外不会改变数据。
+"""
+import sys
+import asyncio
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+# Add backend/src to sys.path
+backend_src = Path(__file__).parent.parent / "backend" / "src"
+sys.path.insert(0, str(backend_src))
+
+from sqlalchemy import event, select
+
+from api.routes.node.schema import UpdateNodeDTO
+from common.utils.utils import get_now_time
+from infrastructure.pg.pg_client import async_session, engine
+from infrastructure.pg.pg_models import (
+    DocumentVersionSQLEntity,
+    NodeRelationshipSQLEntity,
+    NodeSQLEntity,
+)
+from services.node.service import NodeService
+
+_statement_count = 0
+_current_content = ""
+
+
+def _count_statement(*_args, **_kwargs):
+    global _statement_count
+    _statement_count += 1
+
+
+# --- 旧实现的查询序列 (仅用于对比) ---
+
+async def _legacy_load(session, node_id: str, version_id: str | None = None):
+    node = (await session.execute(
+        select(NodeSQLEntity).where(NodeSQLEntity.id == node_id)
+    )).scalar_one_or_none()
+    version = None
+    if version_id:
+        version = (await session.execute(
+            select(DocumentVersionSQLEntity).where(
+                DocumentVersionSQLEntity.node_id == node_id,
+                DocumentVersionSQLEntity.id == version_id,
+            )
+        )).scalar_one_or_none()
+    else:
+        if node.now_version:
+            version = (await session.execute(
+                select(DocumentVersionSQLEntity).where(
+                    DocumentVersionSQLEntity.node_id == node_id,
+                    DocumentVersionSQLEntity.version == node.now_version,
+                )
+            )).scalar_one_or_none()
+        if not version:
+            version = (await session.execute(
+                select(DocumentVersionSQLEntity)
+                .where(DocumentVersionSQLEntity.node_id == node_id)
+                .order_by(DocumentVersionSQLEntity.version.desc())
+                .limit(1)
+            )).scalar_one_or_none()
+    return node, version
+
+
+async def _legacy_parent(session, node_id: str):
+    return (await session.execute(
+        select(NodeRelationshipSQLEntity.from_node_id)
+        .where(NodeRelationshipSQLEntity.to_node_id == node_id)
+    )).scalar_one_or_none()
+
+
+async def legacy_get_node_detail(session, node_id: str, version_id: str):
+    await _legacy_load(session, node_id)
+    await _legacy_parent(session, node_id)
+
+
+async def legacy_update_node(session, node_id: str, version_id: str):
+    node = (await session.execute(
+        select(NodeSQLEntity).where(NodeSQLEntity.id == node_id)
+    )).scalar_one_or_none()
+    node.update_at = get_now_time()
+    await session.commit()
+    await session.refresh(node)
+    await _legacy_parent(session, node_id)
+    await _legacy_load(session, node_id)
+
+
+async def legacy_switch_version(session, node_id: str, version_id: str):
+    await _legacy_load(session, node_id, version_id)
+    await _legacy_parent(session, node_id)
+
+
+async def legacy_save_content(session, node_id: str, version_id: str):
+    node, version = await _legacy_load(session, node_id, version_id)
+    version.full_text = _current_content
+    await session.commit()
+    await session.refresh(version)
+    await _legacy_parent(session, node_id)
+
+
+# --- 新实现 ---
+
+async def current_get_node_detail(session, node_id: str, version_id: str):
+    await NodeService(session).get_node_detail(node_id)
+
+
+async def current_update_node(session, node_id: str, version_id: str):
+    await NodeService(session).update_node(node_id, UpdateNodeDTO(description=None))
+
+
+async def current_switch_version(session, node_id: str, version_id: str):
+    await NodeService(session).get_document_version_detail_and_switch(node_id, version_id)
+
+
+async def current_save_content(session, node_id: str, version_id: str):
+    await NodeService(session).update_document_version_content(node_id, version_id, _current_content)
+
+
+BenchFunc = Callable[..., Awaitable[None]]
+
+CASES: Dict[str, tuple[BenchFunc, BenchFunc]] = {
+    "get_node_detail": (legacy_get_node_detail, current_get_node_detail),
+    "update_node": (legacy_update_node, current_update_node),
+    "get_document_version_detail_and_switch": (legacy_switch_version, current_switch_version),
+    "update_document_version_content": (legacy_save_content, current_save_content),
+}
+
+
+async def _measure(func: BenchFunc, node_id: str, version_id: str, iterations: int) -> tuple[int, float]:
+    global _statement_count
+    round_trips: List[int] = []
+    elapsed: List[float] = []
+    for _ in range(iterations):
+        async with async_session() as session:
+            _statement_count = 0
+            start = time.perf_counter()
+            await func(session, node_id, version_id)
+            elapsed.append(time.perf_counter() - start)
+            round_trips.append(_statement_count)
+    return max(round_trips), sum(elapsed) / len(elapsed) * 1000
+
+
+async def main(node_id: str, iterations: int):
+    event.listen(engine.sync_engine, "before_cursor_execute", _count_statement)
+
+    async with async_session() as session:
+        detail = await NodeService(session).get_node_detail(node_id)
+    if not detail.now_version_id:
+        print("❌ 需要传入一个已有版本的文档节点ID")
+        return
+    version_id = str(detail.now_version_id)
+    global _current_content
+    _current_content = detail.content
+
+    print("=" * 72)
+    print(f"{'接口':<42}{'旧往返':>7}{'新往返':>7}{'旧(ms)':>8}{'新(ms)':>8}")
+    print("-" * 72)
+    for name, (legacy, current) in CASES.items():
+        legacy_trips, legacy_ms = await _measure(legacy, node_id, version_id, iterations)
+        current_trips, current_ms = await _measure(current, node_id, version_id, iterations)
+        print(f"{name:<42}{legacy_trips:>7}{current_trips:>7}{legacy_ms:>8.2f}{current_ms:>8.2f}")
+    print("=" * 72)
+    print("往返次数为执行的 SQL 语句数(不含 BEGIN/COMMIT); 耗时为单次调用平均值。")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    asyncio.run(main(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 20))
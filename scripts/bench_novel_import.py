@@ -0,0 +1,104 @@
+"""
+基准脚本: 流式导入整本小说
+生成一个含 V 卷、每卷 N 章的合成 txt 文件, 在一个事务内新建作品并用 NovelImporter 导入,
+输出进度事件数、执行的 SQL 语句数、耗时与 Python 侧内存峰值 (tracemalloc)。结束时回滚事务, 不会留下数据。
+
+用法:
+    python scripts/bench_novel_import.py [--volumes 10] [--chapters 300] [--chapter-chars 3000]
+"""
+import sys
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+# Add backend/src to sys.path
+backend_src = Path(__file__).parent.parent / "backend" / "src"
+sys.path.insert(0, str(backend_src))
+
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from common.utils.utils import get_now_time
+from infrastructure.pg.pg_client import engine
+from infrastructure.pg.pg_models import WorkSQLEntity
+from services.node.importer import NovelImporter
+
+_statement_count = 0
+
+
+def _count_statement(*_args, **_kwargs):
+    global _statement_count
+    _statement_count += 1
+
+
+def write_novel(volumes: int, chapters: int, chapter_chars: int) -> str:
+    """逐章写出合成小说, 返回临时文件路径."""
+    paragraph = "夜色如墨，长街尽头传来马蹄声。" * 4 + "\n"
+    fd, path = tempfile.mkstemp(suffix=".txt")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write("书名：基准小说\n作者：合成\n\n")
+        for v in range(volumes):
+            f.write(f"第{v + 1}卷 合成卷{v + 1}\n")
+            for c in range(chapters):
+                f.write(f"第{v * chapters + c + 1}章 合成章节\n")
+                f.write(paragraph * max(chapter_chars // len(paragraph), 1))
+    return path
+
+
+async def _new_work(conn: AsyncConnection) -> uuid.UUID:
+    now = get_now_time()
+    work_id = uuid.uuid4()
+    await conn.execute(insert(WorkSQLEntity.__table__).values(
+        id=work_id, name="导入基准作品", cover_image_url=None, summary=None,
+        work_type="novel", state="updating", create_at=now, update_at=now,
+    ))
+    return work_id
+
+
+async def main(args: argparse.Namespace):
+    path = write_novel(args.volumes, args.chapters, args.chapter_chars)
+    size_mib = os.path.getsize(path) / 1024 / 1024
+    try:
+        async with engine.connect() as conn:
+            trans = await conn.begin()
+            event.listen(conn.sync_connection, "before_cursor_execute", _count_statement)
+            try:
+                work_id = await _new_work(conn)
+                session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+                events = 0
+                last = None
+                tracemalloc.start()
+                start = time.perf_counter()
+                async for last in NovelImporter(session).run(str(work_id), path):
+                    events += 1
+                elapsed = (time.perf_counter() - start) * 1000
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                await session.close()
+
+                print("=" * 60)
+                print(f"文件 {size_mib:.1f} MiB, {args.volumes} 卷 x {args.chapters} 章")
+                print(f"结果: 卷 {last['volumes']}, 章 {last['chapters']}, 字数 {last['words']}, 编码 {last['encoding']}")
+                print(f"进度事件: {events}, SQL 语句数: {_statement_count}")
+                print(f"耗时: {elapsed:.1f} ms, Python 内存峰值: {peak / 1024 / 1024:.2f} MiB")
+                print("=" * 60)
+                print("内存为 Python 侧分配峰值 (tracemalloc 开启时耗时会偏高), 应与单批大小而非文件大小相关。")
+            finally:
+                event.remove(conn.sync_connection, "before_cursor_execute", _count_statement)
+                await trans.rollback()
+        await engine.dispose()
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="小说流式导入基准")
+    parser.add_argument("--volumes", type=int, default=10)
+    parser.add_argument("--chapters", type=int, default=300, help="每卷章节数")
+    parser.add_argument("--chapter-chars", type=int, default=3000, help="每章约字数")
+    asyncio.run(main(parser.parse_args()))
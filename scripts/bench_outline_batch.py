@@ -0,0 +1,117 @@
+"""
+基准脚本: 逐个调用 create_node/update_node vs 一次目录批量操作
+在一个事务内新建一部作品, 分别用两种方式: 新建 N 章并挂到卷下, 再把全部章节移动到另一卷。
+输出耗时与执行的 SQL 语句数。结束时回滚事务, 不会留下数据。
+
+用法:
+    python scripts/bench_outline_batch.py [--chapters 500]
+"""
+import sys
+import argparse
+import asyncio
+import time
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Tuple
+
+# Add backend/src to sys.path
+backend_src = Path(__file__).parent.parent / "backend" / "src"
+sys.path.insert(0, str(backend_src))
+
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from api.routes.node.schema import CreateNodeDTO, OutlineBatchRequest, OutlineOperation, UpdateNodeDTO
+from common.enums import NodeTypeEnum, OutlineOperationEnum
+from common.utils.utils import get_now_time
+from infrastructure.pg.pg_client import engine
+from infrastructure.pg.pg_models import WorkSQLEntity
+from services.node.service import NodeService
+
+_statement_count = 0
+
+
+def _count_statement(*_args, **_kwargs):
+    global _statement_count
+    _statement_count += 1
+
+
+async def _new_work(conn: AsyncConnection) -> uuid.UUID:
+    now = get_now_time()
+    work_id = uuid.uuid4()
+    await conn.execute(insert(WorkSQLEntity.__table__).values(
+        id=work_id, name="批量基准作品", cover_image_url=None, summary=None,
+        work_type="novel", state="updating", create_at=now, update_at=now,
+    ))
+    return work_id
+
+
+async def one_by_one(session: AsyncSession, work_id: uuid.UUID, chapters: int) -> None:
+    service = NodeService(session)
+    first = await service.create_node(str(work_id), CreateNodeDTO(name="第一卷", type=NodeTypeEnum.FOLDER))
+    second = await service.create_node(str(work_id), CreateNodeDTO(name="第二卷", type=NodeTypeEnum.FOLDER))
+    created = []
+    for i in range(chapters):
+        node = await service.create_node(
+            str(work_id), CreateNodeDTO(name=f"第{i + 1}章", type=NodeTypeEnum.DOCUMENT, parent_node_id=first.id)
+        )
+        created.append(node.id)
+    for node_id in created:
+        await service.update_node(str(node_id), UpdateNodeDTO(parent_node_id=second.id))
+
+
+async def batched(session: AsyncSession, work_id: uuid.UUID, chapters: int) -> None:
+    service = NodeService(session)
+    first, second = uuid.uuid4(), uuid.uuid4()
+    chapter_ids = [uuid.uuid4() for _ in range(chapters)]
+    create_ops = [
+        OutlineOperation(op=OutlineOperationEnum.CREATE, node_id=first, name="第一卷", type=NodeTypeEnum.FOLDER),
+        OutlineOperation(op=OutlineOperationEnum.CREATE, node_id=second, name="第二卷", type=NodeTypeEnum.FOLDER),
+    ] + [
+        OutlineOperation(op=OutlineOperationEnum.CREATE, node_id=c, name=f"第{i + 1}章", parent_node_id=first)
+        for i, c in enumerate(chapter_ids)
+    ]
+    await service.apply_outline_batch(str(work_id), OutlineBatchRequest(operations=create_ops))
+    move_ops = [OutlineOperation(op=OutlineOperationEnum.MOVE, node_id=c, parent_node_id=second) for c in chapter_ids]
+    await service.apply_outline_batch(str(work_id), OutlineBatchRequest(operations=move_ops))
+
+
+BenchFunc = Callable[[AsyncSession, uuid.UUID, int], Awaitable[None]]
+
+
+async def _measure(conn: AsyncConnection, func: BenchFunc, chapters: int) -> Tuple[int, float]:
+    global _statement_count
+    work_id = await _new_work(conn)
+    session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+    _statement_count = 0
+    start = time.perf_counter()
+    await func(session, work_id, chapters)
+    elapsed = (time.perf_counter() - start) * 1000
+    await session.close()
+    return _statement_count, elapsed
+
+
+async def main(args: argparse.Namespace):
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        event.listen(conn.sync_connection, "before_cursor_execute", _count_statement)
+        try:
+            legacy_trips, legacy_ms = await _measure(conn, one_by_one, args.chapters)
+            batch_trips, batch_ms = await _measure(conn, batched, args.chapters)
+            print("=" * 60)
+            print(f"新建 {args.chapters} 章并整体移动到另一卷")
+            print(f"{'方式':<20}{'SQL 语句数':>12}{'耗时(ms)':>12}")
+            print("-" * 60)
+            print(f"{'逐个 create/update':<20}{legacy_trips:>12}{legacy_ms:>12.1f}")
+            print(f"{'批量操作':<20}{batch_trips:>12}{batch_ms:>12.1f}")
+            print("=" * 60)
+        finally:
+            event.remove(conn.sync_connection, "before_cursor_execute", _count_statement)
+            await trans.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="目录批量操作基准")
+    parser.add_argument("--chapters", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,345 @@
+"""
+验证脚本: 查询计划回归检查
+在一个事务内灌入一部合成的大型小说(作品/目录/文档版本与 blob/检索索引/知识库/Agent), 调用各服务的只读方法,
+捕获其实际发出的 SQL, 用 EXPLAIN (ANALYZE, FORMAT JSON) 重新执行并检查计划:
+若出现对灌数表的顺序扫描且扫描行数超过阈值, 则判定为计划回归并以非 0 退出。
+结束时回滚事务, 不会留下数据。
+
+前置: 数据库已执行 `alembic upgrade head`。
+
+用法:
+    python scripts/verify_query_plans.py [--chapters 2000] [--versions 10] [--works 2000] [--threshold 1000]
+"""
+import sys
+import argparse
+import asyncio
+import json
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+from uuid import uuid4
+
+# Add backend/src to sys.path
+backend_src = Path(__file__).parent.parent / "backend" / "src"
+sys.path.insert(0, str(backend_src))
+
+from sqlalchemy import event, insert, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from common.enums import VersionStorageEnum, WorkStateCNEnum
+from common.utils.utils import get_now_time
+from core.plugin.tool_builder import _get_agent_tool_config
+from infrastructure.pg.pg_client import engine
+from infrastructure.pg.pg_models import (
+    AgentsManagerSQLEntity,
+    DocumentBlobSQLEntity,
+    DocumentVersionSQLEntity,
+    KnowledgeBaseSQLEntity,
+    KnowledgeChunkSQLEntity,
+    NodeClosureSQLEntity,
+    NodeRelationshipSQLEntity,
+    NodeSQLEntity,
+    WorkSQLEntity,
+)
+from plugin.kd.plugin import KDPlugin
+from services.node.search_index import DocumentSearchIndex
+from services.node.service import NodeService
+from services.node.version_store import content_hash
+from services.work.exporter import WorkExporter
+from services.work.service import WorkService
+
+async def _second_work_page(session: AsyncSession, state: WorkStateCNEnum) -> Any:
+    service = WorkService(session)
+    first = await service.get_work_list(state=state)
+    return await service.get_work_list(cursor=first.next_cursor, state=state)
+
+
+async def _export_entries(session: AsyncSession, work_id: str) -> int:
+    return len([entry async for entry in WorkExporter(session).entries(work_id)])
+
+
+SEEDED_TABLES = {
+    "work",
+    "node",
+    "node_relationship",
+    "node_closure",
+    "document_version",
+    "document_blob",
+    "document_search",
+    "knowledge_base",
+    "knowledge_chunk",
+    "agents_manager",
+}
+
+
+@dataclass
+class Fixture:
+    """灌数后用于构造查询参数的关键ID."""
+    work_id: str = ""
+    document_id: str = ""
+    folder_id: str = ""
+    version_id: str = ""
+    kb_id: str = ""
+    agent_name: str = ""
+
+
+@dataclass
+class PlanCase:
+    name: str
+    run: Callable[[AsyncSession, Fixture], Awaitable[Any]]
+    # 允许顺序扫描的表(如未分页的全表列表)
+    allow_seq_scan: Set[str] = field(default_factory=set)
+
+
+# 每 100 章出现一次的检索词
+SEARCH_TERM = "伏笔"
+
+CASES: List[PlanCase] = [
+    PlanCase("WorkService.get_work_list", lambda s, f: WorkService(s).get_work_list()),
+    PlanCase(
+        "WorkService.get_work_list(state, page 2)",
+        lambda s, f: _second_work_page(s, WorkStateCNEnum.UPDATING),
+    ),
+    PlanCase("WorkService.get_work_detail", lambda s, f: WorkService(s).get_work_detail(f.work_id)),
+    PlanCase("NodeService.get_node_detail", lambda s, f: NodeService(s).get_node_detail(f.document_id)),
+    PlanCase("NodeService.get_document_versions", lambda s, f: NodeService(s).get_document_versions(f.document_id)),
+    PlanCase("NodeService.get_work_outline", lambda s, f: NodeService(s).get_work_outline(f.work_id, 1)),
+    PlanCase("NodeService.get_subtree", lambda s, f: NodeService(s).get_subtree(f.folder_id)),
+    PlanCase("NodeService.get_ancestors", lambda s, f: NodeService(s).get_ancestors(f.document_id)),
+    PlanCase("NodeService.get_children(root)", lambda s, f: NodeService(s).get_children(f.work_id, depth=2)),
+    PlanCase("NodeService.get_children(folder)", lambda s, f: NodeService(s).get_children(f.work_id, f.folder_id)),
+    PlanCase("WorkExporter.entries", lambda s, f: _export_entries(s, f.work_id)),
+    PlanCase("NodeService.search_documents", lambda s, f: NodeService(s).search_documents(f.work_id, SEARCH_TERM)),
+    PlanCase("KDPlugin.get_kd_detail", lambda s, f: KDPlugin(s).get_kd_detail(f.kb_id)),
+    PlanCase("KDPlugin.search_kd", lambda s, f: KDPlugin(s).search_kd(f.work_id, "线索")),
+    PlanCase("tool_builder._get_agent_tool_config", lambda s, f: _get_agent_tool_config(s, f.agent_name)),
+]
+
+
+async def _bulk_insert(conn: AsyncConnection, entity: Any, rows: List[Dict[str, Any]], batch: int = 5000) -> None:
+    for i in range(0, len(rows), batch):
+        await conn.execute(insert(entity.__table__), rows[i:i + batch])
+
+
+async def seed(conn: AsyncConnection, works: int, chapters: int, versions: int) -> Fixture:
+    """灌入合成数据: 1 部大型小说 + 若干小作品 + 知识库 + Agent.
+
+    文档版本均为 blob 关键帧, 节点以 now_version_id 指向最新版本, 当前版本写入检索索引。
+    """
+    now = get_now_time()
+    fixture = Fixture()
+
+    work_rows = [
+        {
+            "id": uuid4(), "name": f"合成作品{i}", "cover_image_url": None, "summary": None,
+            "work_type": "novel", "state": "updating",
+            "create_at": now - timedelta(minutes=i), "update_at": now - timedelta(minutes=i),
+        }
+        for i in range(works)
+    ]
+    await _bulk_insert(conn, WorkSQLEntity, work_rows)
+    novel_id = work_rows[0]["id"]
+    fixture.work_id = str(novel_id)
+
+    # 每部作品若干节点, 主小说: 每 50 章一卷
+    node_rows: List[Dict[str, Any]] = []
+    rel_rows: List[Dict[str, Any]] = []
+    version_rows: List[Dict[str, Any]] = []
+    blob_rows: Dict[str, Dict[str, Any]] = {}
+    # 各文档当前版本 (work_id, node_id, version_id, 正文), 用于检索索引
+    current_rows: List[Tuple[Any, Any, Any, str]] = []
+
+    def _version(node: Dict[str, Any], name: str, body: str, create_at: Any) -> Dict[str, Any]:
+        blob_hash = content_hash(body)
+        blob = blob_rows.get(blob_hash)
+        if blob is None:
+            blob_rows[blob_hash] = {
+                "hash": blob_hash, "content": body, "size": len(body.encode("utf-8")),
+                "ref_count": 1, "create_at": now,
+            }
+        else:
+            blob["ref_count"] += 1
+        return {
+            "id": uuid4(), "node_id": node["id"], "version": name, "full_text": "", "word_count": len(body),
+            "storage_type": VersionStorageEnum.FULL.value, "blob_hash": blob_hash,
+            "base_version_id": None, "delta": None, "chain_depth": 0, "create_at": create_at,
+        }
+
+    def _node(work_id: Any, name: str, node_type: str, now_version: str | None = None) -> Dict[str, Any]:
+        return {
+            "id": uuid4(), "work_id": work_id, "name": name, "description": None,
+            "node_type": node_type, "now_version": now_version, "create_at": now, "update_at": now,
+        }
+
+    def _rel(work_id: Any, parent: Any, child: Any) -> Dict[str, Any]:
+        return {
+            "id": uuid4(), "work_id": work_id, "from_node_id": parent, "to_node_id": child,
+            "create_at": now, "update_at": now,
+        }
+
+    volume = None
+    for c in range(chapters):
+        if c % 50 == 0:
+            volume = _node(novel_id, f"第{c // 50 + 1}卷", "folder")
+            node_rows.append(volume)
+        chapter = _node(novel_id, f"第{c + 1}章", "document", now_version=f"v{versions}")
+        node_rows.append(chapter)
+        rel_rows.append(_rel(novel_id, volume["id"], chapter["id"]))
+        for v in range(1, versions + 1):
+            body = f"第{c + 1}章 第{v}稿 " + "正文" * 200 + (SEARCH_TERM if c % 100 == 0 else "")
+            version_rows.append(_version(chapter, f"v{v}", body, now + timedelta(seconds=v)))
+        current_rows.append((novel_id, chapter["id"], version_rows[-1]["id"], body))
+    fixture.document_id = str(node_rows[-1]["id"])
+    fixture.folder_id = str(volume["id"])
+    fixture.version_id = str(version_rows[-1]["id"])
+
+    for work in work_rows[1:]:
+        folder = _node(work["id"], "正文", "folder")
+        doc = _node(work["id"], "第1章", "document", now_version="v1")
+        node_rows.extend([folder, doc])
+        rel_rows.append(_rel(work["id"], folder["id"], doc["id"]))
+        version_rows.append(_version(doc, "v1", "正文", now))
+        current_rows.append((work["id"], doc["id"], version_rows[-1]["id"], "正文"))
+
+    await _bulk_insert(conn, NodeSQLEntity, node_rows)
+    await _bulk_insert(conn, NodeRelationshipSQLEntity, rel_rows)
+    closure_rows = [
+        {"ancestor_id": n["id"], "descendant_id": n["id"], "depth": 0, "work_id": n["work_id"]}
+        for n in node_rows
+    ] + [
+        {"ancestor_id": r["from_node_id"], "descendant_id": r["to_node_id"], "depth": 1, "work_id": r["work_id"]}
+        for r in rel_rows
+    ]
+    await _bulk_insert(conn, NodeClosureSQLEntity, closure_rows)
+    await _bulk_insert(conn, DocumentBlobSQLEntity, list(blob_rows.values()))
+    await _bulk_insert(conn, DocumentVersionSQLEntity, version_rows)
+    # 版本写入后再回填 now_version_id (两表互相引用)
+    await conn.execute(text(
+        "UPDATE node SET now_version_id = v.id FROM document_version v "
+        "WHERE v.node_id = node.id AND v.version = node.now_version"
+    ))
+
+    by_work: Dict[Any, List[Tuple[Any, Any, str]]] = {}
+    for work_id, node_id, version_id, body in current_rows:
+        by_work.setdefault(work_id, []).append((node_id, version_id, body))
+    session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+    search_index = DocumentSearchIndex(session)
+    for work_id, documents in by_work.items():
+        for i in range(0, len(documents), 1000):
+            await search_index.update_many(work_id, documents[i:i + 1000])
+    await session.commit()
+    await session.close()
+
+    # 知识库: 每部作品一个库, 每库若干知识点
+    kb_rows = [
+        {
+            "id": uuid4(), "work_id": work["id"], "title": f"{work['name']}设定集", "description": None,
+            "enabled": True, "create_at": now, "update_at": now,
+        }
+        for work in work_rows
+    ]
+    await _bulk_insert(conn, KnowledgeBaseSQLEntity, kb_rows)
+    fixture.kb_id = str(kb_rows[0]["id"])
+    chunk_rows = [
+        {
+            "id": uuid4(), "kb_id": kb["id"], "content": f"设定{i}: 人物与线索",
+            "search_keys": [], "enabled": i % 5 != 0, "create_at": now, "update_at": now,
+        }
+        for kb in kb_rows
+        for i in range(20)
+    ]
+    await _bulk_insert(conn, KnowledgeChunkSQLEntity, chunk_rows)
+
+    agent_rows = [
+        {
+            "id": uuid4(), "name": f"合成Agent{i}", "description": None, "context_size": -1,
+            "is_summary": False, "enabled": True, "broadcast": False, "sessions": [], "config": {},
+            "create_at": now, "update_at": now,
+        }
+        for i in range(works)
+    ]
+    await _bulk_insert(conn, AgentsManagerSQLEntity, agent_rows)
+    fixture.agent_name = agent_rows[-1]["name"]
+
+    await conn.execute(text("ANALYZE " + ", ".join(sorted(SEEDED_TABLES))))
+    return fixture
+
+
+def _find_seq_scans(plan: Dict[str, Any]) -> List[Tuple[str, int]]:
+    """返回计划树中所有顺序扫描的 (表名, 实际扫描行数)."""
+    found: List[Tuple[str, int]] = []
+    if plan.get("Node Type") == "Seq Scan":
+        loops = plan.get("Actual Loops", 1) or 1
+        scanned = (plan.get("Actual Rows", 0) + plan.get("Rows Removed by Filter", 0)) * loops
+        found.append((plan.get("Relation Name", "?"), int(scanned)))
+    for child in plan.get("Plans", []):
+        found.extend(_find_seq_scans(child))
+    return found
+
+
+async def check_case(conn: AsyncConnection, case: PlanCase, fixture: Fixture, threshold: int) -> List[str]:
+    captured: List[Tuple[str, Any]] = []
+
+    def _capture(_conn, _cursor, statement, parameters, _context, executemany):
+        if not executemany:
+            captured.append((statement, parameters))
+
+    event.listen(conn.sync_connection, "before_cursor_execute", _capture)
+    try:
+        session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        await case.run(session, fixture)
+        await session.close()
+    finally:
+        event.remove(conn.sync_connection, "before_cursor_execute", _capture)
+
+    problems: List[str] = []
+    for statement, parameters in captured:
+        if not statement.lstrip().upper().startswith("SELECT"):
+            continue
+        result = await conn.exec_driver_sql("EXPLAIN (ANALYZE, FORMAT JSON) " + statement, parameters)
+        raw = result.scalar()
+        plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+        for relation, scanned in _find_seq_scans(plan):
+            if relation in SEEDED_TABLES and relation not in case.allow_seq_scan and scanned > threshold:
+                first_line = " ".join(statement.split())[:120]
+                problems.append(f"Seq Scan on {relation} ({scanned} rows): {first_line}")
+    return problems
+
+
+async def main(args: argparse.Namespace) -> int:
+    failed = 0
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            print(f"灌数中: works={args.works}, chapters={args.chapters}, versions/chapter={args.versions} ...")
+            fixture = await seed(conn, args.works, args.chapters, args.versions)
+            print("=" * 60)
+            for case in CASES:
+                problems = await check_case(conn, case, fixture, args.threshold)
+                if problems:
+                    failed += 1
+                    print(f"❌ {case.name}")
+                    for p in problems:
+                        print(f"    {p}")
+                else:
+                    print(f"✅ {case.name}")
+            print("=" * 60)
+        finally:
+            await trans.rollback()
+    await engine.dispose()
+
+    if failed:
+        print(f"计划回归: {failed}/{len(CASES)} 个查询出现超过 {args.threshold} 行的顺序扫描")
+        return 1
+    print("全部查询计划通过")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN 查询计划回归检查")
+    parser.add_argument("--works", type=int, default=2000)
+    parser.add_argument("--chapters", type=int, default=2000)
+    parser.add_argument("--versions", type=int, default=10)
+    parser.add_argument("--threshold", type=int, default=1000, help="顺序扫描行数阈值")
+    sys.exit(asyncio.run(main(parser.parse_args())))